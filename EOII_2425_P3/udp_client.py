@@ -10,10 +10,26 @@
 # ---------------------------------------------------------------------------- #
 # NEEDED IMPORTS
 
+import os               # For building the path of the shared modules
 import pickle           # For serializing and deserializing Python objects
 import socket           # For network communication using sockets
+import sys              # For adding the shared modules to the import path
 from time import sleep  # For adding delays in execution
 
+# ---------------------------------------------------------------------------- #
+# SHARED MODULES (EOII_2425_common folder)
+
+COMMON_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    os.pardir,
+    "EOII_2425_common")
+
+if COMMON_PATH not in sys.path:
+    sys.path.insert(0, COMMON_PATH)
+
+import binary_codec       # Safe binary serialization of lists of numbers
+import udp_fragmentation  # Fragmentation of large messages
+
 # ---------------------------------------------------------------------------- #
 # COLOR DEFINES
 
@@ -41,6 +57,9 @@ if __name__ == '__main__':
 
     # Client status variable
     client_on = True
+
+    # ID of the next message (identifies its fragments)
+    message_id = 0
     
     # Read and send messages until the client is asked to close
     while client_on == True:
@@ -66,7 +85,13 @@ if __name__ == '__main__':
             # Send normal message to server ------------------------------------
             else:
                 print(HEADER + "Sending message to server..." + RESET)
-                udp_socket.sendto(message.encode(), server_address)
+
+                # Large messages are split into MTU-sized fragments
+                for datagram in udp_fragmentation.fragmentMessage(
+                        message_id, message.encode()):
+                    udp_socket.sendto(datagram, server_address)
+
+                message_id += 1
                 
                 # Receive a response from server -------------------------------
                 # (max data buffer size: 4096)
@@ -77,6 +102,9 @@ if __name__ == '__main__':
                 if (message).lower() == "request serialized message":
                     # Deserialize the data using (pickle.loads)
                     print(full_message + (str)(pickle.loads(data)))
+                elif (message).lower() == binary_codec.BINARY_COMMAND:
+                    # Deserialize the data using (binary_codec.decode)
+                    print(full_message + (str)(binary_codec.decode(data)))
                 else:
                     # Deserialize the data using (decode)
                     print(full_message + data.decode())
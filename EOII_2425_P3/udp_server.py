@@ -11,8 +11,24 @@
 # NEEDED IMPORTS
 
 from datetime import datetime  # For handling date and time operations
+import os      # For building the path of the shared modules
 import pickle  # For serializing and deserializing Python objects
-import socket  # For network communication using sockets
+import sys     # For adding the shared modules to the import path
+
+# ---------------------------------------------------------------------------- #
+# SHARED MODULES (EOII_2425_common folder)
+
+COMMON_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    os.pardir,
+    "EOII_2425_common")
+
+if COMMON_PATH not in sys.path:
+    sys.path.insert(0, COMMON_PATH)
+
+import binary_codec       # Safe binary serialization of lists of numbers
+import udp_fragmentation  # Reassembly of large messages
+import udp_server_core    # Reception loop shared by the UDP servers
 
 # ---------------------------------------------------------------------------- #
 # COLOR DEFINES
@@ -28,63 +44,82 @@ HEADER = BOLD + YELLOW + "(SERVER) " + RESET + YELLOW  # Header format
 if __name__ == '__main__':
     """
     This example creates a UDP socket and binds it to a specific IP address
-    and port. It then receives a message from the client and sends a response.
+    and port. It then receives messages from clients and sends responses
+    until a client asks the server to close.
     """
-    # Create a UDP socket
-    udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    # Create the UDP socket and its reception loop (see udp_server_core.py)
+    server = udp_server_core.udpServerLoop()
     
     # Get the server's IP address and port
     server_address = ('localhost', 12000)
     
     # Bind the socket to the server address and port
-    udp_socket.bind(server_address)
+    server.bind(server_address)
 
-    # Server status variable
-    server_on = True
-    
-    while server_on:
-        
-        # Receive a message from client ----------------------------------------
-        data, client_address = udp_socket.recvfrom(4096)
-        print(HEADER + "Message received from client:" + RESET, data.decode())
+    # Fragments of large messages waiting for the rest of them
+    reassembly = udp_fragmentation.reassemblyBuffer()
+
+    def handleMessage(data, client_address):
+        """
+        Called by the reception loop for each datagram from a client.
+        Returns the response to send, or None.
+        """
+        # Large messages arrive in fragments, wait for all of them
+        if udp_fragmentation.isFragment(data):
+            data = reassembly.addFragment(data, client_address)
+
+            if data is None:
+                return None
+
+        message = data.decode(errors = "replace")
+        print(HEADER + "Message received from client:" + RESET, message)
         
         # If client is closed do not send anything -----------------------------
-        if (data.decode()).lower() == "close client":
-            pass
+        if message.lower() == "close client":
+            return None
 
         # If server has been asked to close, then say goodbye ------------------
-        elif ((data.decode()).lower() == "close server" or
-              (data.decode()).lower() == "close client and server"):
+        elif (message.lower() == "close server" or
+              message.lower() == "close client and server"):
             print(HEADER + "Goodbye!" + RESET)
-            server_on = False
+            server.stop()
+            return None
 
         # Send message using (pickle.dumps) ------------------------------------
-        elif (data.decode()).lower() == "request serialized message":
+        elif message.lower() == "request serialized message":
             # Data to send (a list of numbers)
             unserialized_msg = [1, 2, 3, 4, 5]
             
             # Serialize msg using pickle.dumps()
-            serialized_msg = pickle.dumps(unserialized_msg)
-            
-            # Send a response to client
             print(HEADER + "Sending serialized message to client..." + RESET)
-            udp_socket.sendto(serialized_msg, client_address)
+            return pickle.dumps(unserialized_msg)
+
+        # Send message using (binary_codec.encode) -----------------------------
+        elif message.lower() == binary_codec.BINARY_COMMAND:
+            # Data to send (a list of numbers)
+            unserialized_msg = [1, 2, 3, 4, 5]
+            
+            # Serialize msg using binary_codec.encode() (safe, unlike pickle)
+            print(HEADER + "Sending binary serialized message to client..." + RESET)
+            return binary_codec.encode(unserialized_msg)
         
         # Send message using (encode) ------------------------------------------
         else:
-            if (data.decode()).lower() == "time":
+            if message.lower() == "time":
                 # Get the current time
                 current_time = datetime.now().time()
                 # Convert the current time to a string in the format hh:mm:ss
-                message = current_time.strftime('%H:%M:%S')       
+                response = current_time.strftime('%H:%M:%S')       
             else:
-                message = "Nothing to say"
+                response = "Nothing to say"
             
-            # Send a response to client
             print(HEADER + "Sending message to client..." + RESET)
-            udp_socket.sendto(message.encode(), client_address)
-    
-    # Close socket -------------------------------------------------------------
-    udp_socket.close()
+            return response.encode()
+
+    server.setHandler(handleMessage)
+
+    # Serve until a client asks the server to close (the socket is closed
+    # on exit) -----------------------------------------------------------------
+    server.serveForever()
 
 # end of file #
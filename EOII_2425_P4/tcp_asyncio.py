@@ -0,0 +1,430 @@
+"""
+@file     tcp_asyncio.py
+
+@author   Marcos Belda Martinez' <mbelmar@etsinf.upv.es>
+@date     October, 2024
+@section  EOII-GIIROB
+@brief    asyncio streams implementation of the TCP Server and Client (same
+          commands and framing as tcp_server_class.py), serving thousands
+          of connections on one event loop, with optional TLS.
+
+          A self-signed certificate for local tests can be created with:
+
+          openssl req -x509 -newkey rsa:2048 -nodes -days 365 \\
+              -keyout key.pem -out cert.pem \\
+              -subj "/CN=localhost" -addext "subjectAltName=DNS:localhost"
+
+          and used with --certfile cert.pem --keyfile key.pem (the clients
+          trust cert.pem, see makeClientContext()).
+"""
+
+# ---------------------------------------------------------------------------- #
+# NEEDED IMPORTS
+
+import argparse
+import asyncio
+import itertools
+import ssl
+import tcp_server_class as tcp_s
+from   tcp_framing import FRAME_HEADER, MAX_MESSAGE_SIZE, MAX_REQUEST_ID
+
+# ---------------------------------------------------------------------------- #
+# PARAMETERS
+
+REQUEST_TIMEOUT = 5  # Seconds to wait for the reply of a request
+CLOSE_TIMEOUT   = 1  # Seconds to wait for a connection to be closed
+
+# ---------------------------------------------------------------------------- #
+# CREATING STREAM CONNECTION CLASS
+
+class streamConnection:
+
+    def __init__(self, client_address):
+        """
+        Function to initialize Stream Connection Class variables
+        (state of a connection, used by the commands of tcpServerCore).
+        """
+        self.client_address = client_address
+
+        # Close the connection once the pending replies are sent
+        self.close_requested = False
+
+        # (file, size) to send after the reply, see getFileCommand()
+        self.transfer = None
+
+        ### end def __init__() ###
+
+# ---------------------------------------------------------------------------- #
+# CREATING TCP STREAM SERVER CLASS
+
+class tcpStreamServer(tcp_s.tcpServerCore):
+
+    def __init__(self, idle_timeout = tcp_s.IDLE_TIMEOUT,
+                 files_directory = None):
+        """
+        Function to initialize TCP Stream Server Class variables.
+        Commands are the ones of tcpServerCore (and "GET <file>").
+        idle_timeout is the seconds a connection may stay without
+        messages before it is closed (None for no limit).
+        """
+        super().__init__()
+
+        self.idle_timeout = idle_timeout
+        self.setFilesDirectory(files_directory)
+        self.registerCommand("get", self.getFileCommand, takes_arguments = True)
+
+        self.server = None
+
+        # Open connections (task of handleConnection() -> (reader, writer))
+        self.handlers = {}
+
+        # Set when a client sends "close server" (or on close())
+        self.stopped = None
+
+        ### end def __init__() ###
+
+    async def start(self, server_address = ("localhost", 12000),
+                    ssl_context = None, backlog = tcp_s.DEFAULT_BACKLOG):
+        """
+        Function to start listening on the running event loop.
+        Connections use TLS if ssl_context is given (see makeServerContext()).
+        """
+        self.stopped = asyncio.get_running_loop().create_future()
+
+        self.server = await asyncio.start_server(
+            self.handleConnection,
+            host    = server_address[0],
+            port    = server_address[1],
+            ssl     = ssl_context,
+            backlog = backlog)
+
+        self.server_on = True
+        self.log("Waiting for incoming connections...")
+
+        ### end def start() ###
+
+    async def serveForever(self):
+        """
+        Function to serve connections until a client sends "close server"
+        (or close() is called), then close every connection.
+        """
+        try:
+            await self.stopped
+        finally:
+            self.server_on = False
+            self.server.close()
+
+            # Wake up the connections waiting for a message, so they close
+            for reader, writer in list(self.handlers.values()):
+                reader.feed_eof()
+
+            await asyncio.gather(*self.handlers, return_exceptions = True)
+            await self.server.wait_closed()
+
+        ### end def serveForever() ###
+
+    def close(self):
+        """
+        Function to stop serveForever().
+        """
+        if not self.stopped.done():
+            self.stopped.set_result(None)
+
+        ### end def close() ###
+
+    async def handleConnection(self, reader, writer):
+        """
+        Called by the event loop for each new connection. Messages are read
+        with readexactly() (header, then message) and answered in order.
+        """
+        connection = streamConnection(writer.get_extra_info("peername"))
+        self.handlers[asyncio.current_task()] = (reader, writer)
+        self.log("Connection established from:", connection.client_address)
+
+        try:
+            while self.server_on == True:
+                header = await asyncio.wait_for(
+                    reader.readexactly(FRAME_HEADER.size),
+                    self.idle_timeout)
+
+                length, request_id = FRAME_HEADER.unpack(header)
+
+                if length > MAX_MESSAGE_SIZE:
+                    # Not a framed message (or too long), drop the client
+                    self.log("Error receiving data: message too long")
+                    break
+
+                # (a client that stops in the middle of a message is idle too)
+                data = await asyncio.wait_for(
+                    reader.readexactly(length),
+                    self.idle_timeout)
+
+                reply = self.processMessage(data, connection)
+
+                # The reply carries the request ID of its message
+                if reply is not None:
+                    writer.writelines(
+                        [FRAME_HEADER.pack(len(reply), request_id), reply])
+
+                if connection.transfer is not None:
+                    await self.sendFile(writer, connection, request_id)
+
+                if connection.close_requested == True:
+                    break
+
+                # Wait only if the client is not reading its replies
+                await writer.drain()
+
+        except asyncio.IncompleteReadError:
+            # The client has closed the connection
+            pass
+        except asyncio.TimeoutError:
+            self.log("Closing idle connection from:", connection.client_address)
+        except (OSError, ssl.SSLError) as err:
+            self.log("Error receiving data:", err)
+        finally:
+            if connection.transfer is not None:
+                connection.transfer[0].close()
+
+            writer.close()
+
+            if self.server_on == False:
+                self.close()
+
+            # (TLS waits for the client to answer the shutdown)
+            try:
+                await asyncio.wait_for(writer.wait_closed(), CLOSE_TIMEOUT)
+            except (asyncio.TimeoutError, OSError, ssl.SSLError):
+                pass
+
+            self.handlers.pop(asyncio.current_task(), None)
+
+        ### end def handleConnection() ###
+
+    async def sendFile(self, writer, connection, request_id):
+        """
+        Function to send the file of a connection as a message with the
+        same request ID. loop.sendfile() uses os.sendfile() on plain
+        connections and reads the file in chunks on TLS ones.
+        """
+        file, size = connection.transfer
+
+        try:
+            writer.write(FRAME_HEADER.pack(size, request_id))
+            # Only the size announced in the header, even if the file grows
+            await asyncio.get_running_loop().sendfile(
+                writer.transport, file, 0, size)
+        finally:
+            file.close()
+            connection.transfer = None
+
+        ### end def sendFile() ###
+
+    def getFileCommand(self, message, connection):
+        """
+        Send a file of the files directory ("GET <file>"): a "FILE <size>"
+        reply followed by the file, or an "Error: ..." reply.
+        """
+        file, size = self.openFile(message)
+
+        if file is None:
+            # size is the error reply
+            return size
+
+        connection.transfer = (file, size)
+
+        return ("FILE " + str(size)).encode()
+
+        ### end def getFileCommand() ###
+
+# ---------------------------------------------------------------------------- #
+# CREATING TCP STREAM CLIENT CLASS
+
+class tcpStreamClient:
+
+    def __init__(self, reader, writer):
+        """
+        Function to initialize TCP Stream Client Class variables
+        (see openClient()). Concurrent requests are pipelined on the
+        connection and matched with their replies by request ID.
+        """
+        self.reader = reader
+        self.writer = writer
+
+        # Outstanding requests (request ID -> future of the reply)
+        self.in_flight = {}
+        self.request_ids = itertools.count(1)
+
+        self.reply_receiver = asyncio.create_task(self.receiveReplies())
+
+        ### end def __init__() ###
+
+    async def request(self, message, timeout = REQUEST_TIMEOUT):
+        """
+        Function to send a request (str or bytes) and wait for its reply
+        (bytes). Raises asyncio.TimeoutError if it does not arrive in time.
+        """
+        if isinstance(message, str):
+            message = message.encode()
+
+        request_id = next(self.request_ids) & MAX_REQUEST_ID
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[request_id] = future
+
+        try:
+            self.writer.writelines(
+                [FRAME_HEADER.pack(len(message), request_id), message])
+            await self.writer.drain()
+
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self.in_flight.pop(request_id, None)
+
+        ### end def request() ###
+
+    async def send(self, message):
+        """
+        Function to send a message without reply (the close commands).
+        """
+        if isinstance(message, str):
+            message = message.encode()
+
+        self.writer.writelines([FRAME_HEADER.pack(len(message), 0), message])
+        await self.writer.drain()
+
+        ### end def send() ###
+
+    async def receiveReplies(self):
+        """
+        This task receives the replies and completes their requests.
+        """
+        try:
+            while True:
+                header = await self.reader.readexactly(FRAME_HEADER.size)
+                length, request_id = FRAME_HEADER.unpack(header)
+                reply = await self.reader.readexactly(length)
+
+                future = self.in_flight.get(request_id)
+
+                if (future is not None) and (not future.done()):
+                    future.set_result(reply)
+
+        except (asyncio.IncompleteReadError, OSError, ssl.SSLError) as err:
+            # Connection closed, fail every outstanding request
+            for future in self.in_flight.values():
+                if not future.done():
+                    future.set_exception(ConnectionError(str(err)))
+
+        ### end def receiveReplies() ###
+
+    async def close(self):
+        """
+        Function to close the connection.
+        """
+        self.writer.close()
+
+        try:
+            await self.writer.wait_closed()
+        except (OSError, ssl.SSLError):
+            pass
+
+        await self.reply_receiver
+
+        ### end def close() ###
+
+# ---------------------------------------------------------------------------- #
+# FUNCTIONS
+
+def makeServerContext(certfile, keyfile):
+    """
+    Function to create the TLS context of the server from its certificate
+    and private key (PEM files).
+    """
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(certfile, keyfile)
+
+    return context
+
+    ### end def makeServerContext() ###
+
+def makeClientContext(cafile):
+    """
+    Function to create the TLS context of a client that trusts the
+    certificates in cafile (e.g. the self-signed certificate of the server).
+    """
+    return ssl.create_default_context(ssl.Purpose.SERVER_AUTH, cafile = cafile)
+
+    ### end def makeClientContext() ###
+
+async def openClient(server_address, ssl_context = None):
+    """
+    Function to open a TCP Client connection on the running event loop.
+    Returns its tcpStreamClient.
+    """
+    reader, writer = await asyncio.open_connection(
+        server_address[0],
+        server_address[1],
+        ssl = ssl_context)
+
+    return tcpStreamClient(reader, writer)
+
+    ### end def openClient() ###
+
+async def main(args):
+    """
+    Function to run the server until a client sends "close server".
+    """
+    ssl_context = None
+
+    if args.certfile is not None:
+        ssl_context = makeServerContext(args.certfile, args.keyfile)
+
+    server = tcpStreamServer(
+        idle_timeout    = args.idle_timeout or None,
+        files_directory = args.files)
+
+    server.setVerbose(not args.quiet)
+
+    await server.start((args.ip, args.port), ssl_context, args.backlog)
+    await server.serveForever()
+
+    ### end def main() ###
+
+# ---------------------------------------------------------------------------- #
+# SERVER
+
+if __name__ == '__main__':
+    """
+    This example creates a TCP Server on an asyncio event loop (plain TCP,
+    or TLS with --certfile and --keyfile). It serves every client
+    connection at the same time until a client asks the server to close.
+    """
+    parser = argparse.ArgumentParser(
+        description = __doc__,
+        formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ip", default = "localhost")
+    parser.add_argument("--port", type = int, default = 12000)
+    parser.add_argument("--backlog", type = int,
+                        default = tcp_s.DEFAULT_BACKLOG,
+                        help = "connections waiting to be accepted")
+    parser.add_argument("--idle-timeout", type = float,
+                        default = tcp_s.IDLE_TIMEOUT,
+                        help = "seconds before closing an idle connection "
+                               "(no limit by default, or 0)")
+    parser.add_argument("--files", default = None,
+                        help = "folder served by 'GET <file>' "
+                               "(file transfers disabled by default)")
+    parser.add_argument("--certfile", default = None,
+                        help = "certificate of the server (enables TLS)")
+    parser.add_argument("--keyfile", default = None,
+                        help = "private key of the certificate")
+    parser.add_argument("--quiet", action = "store_true",
+                        help = "do not print every message")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(main(args))
+    except KeyboardInterrupt:
+        pass
+
+# end of file #
@@ -10,9 +10,25 @@
 # ---------------------------------------------------------------------------- #
 # NEEDED IMPORTS
 
+import os               # For building the path of the shared modules
 import pickle           # For serializing and deserializing Python objects
 import socket           # For network communication using sockets
-from time import sleep  # For adding delays in execution
+import sys              # For adding the shared modules to the import path
+import tcp_framing      # For delimiting the messages (length prefix)
+from time import perf_counter, sleep  # For timing transfers and delays
+
+# ---------------------------------------------------------------------------- #
+# SHARED MODULES (EOII_2425_common folder)
+
+COMMON_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    os.pardir,
+    "EOII_2425_common")
+
+if COMMON_PATH not in sys.path:
+    sys.path.insert(0, COMMON_PATH)
+
+import binary_codec  # Safe binary serialization of lists of numbers
 
 # ---------------------------------------------------------------------------- #
 # COLOR DEFINES
@@ -42,6 +58,12 @@ if __name__ == '__main__':
     # Client status variable
     connection_on = False
 
+    # Reception buffer of the connection (see tcp_framing.py)
+    reader = tcp_framing.frameReader()
+
+    # Reusable buffer for receiving files (see tcp_framing.receiveToFile)
+    file_buffer = bytearray(tcp_framing.FILE_CHUNK_SIZE)
+
     # Establish a connection to the server
     try:
         tcp_socket.connect(server_address)
@@ -50,6 +72,8 @@ if __name__ == '__main__':
         print(HEADER + "Available options to interact with the server:" + RESET)
         print(" - 'TIME'")
         print(" - 'REQUEST SERIALIZED MESSAGE'")
+        print(" - 'REQUEST BINARY SERIALIZED MESSAGE'")
+        print(" - 'GET <file>'")
         print(" - 'CLOSE CLIENT'")
         print(" - 'CLOSE SERVER'")
         print(" - 'CLOSE CLIENT AND SERVER'\n")
@@ -77,7 +101,7 @@ if __name__ == '__main__':
                 message.lower() == "close server" or
                 message.lower() == "close client and server"):
                 print(HEADER + "Notifying server..." + RESET)
-                tcp_socket.send(message.encode())
+                tcp_framing.sendFrame(tcp_socket, message.encode())
                 connection_on = False
 
                 if "server" in message.lower():
@@ -88,17 +112,40 @@ if __name__ == '__main__':
             # Send normal message to server ------------------------------------
             else:
                 print(HEADER + "Sending message to server..." + RESET)
-                tcp_socket.send(message.encode())
+                tcp_framing.sendFrame(tcp_socket, message.encode())
                 
                 # Receive a response from server -------------------------------
-                # (max data buffer size: 4096)
-                data = tcp_socket.recv(4096)
+                # (a whole message, whatever its size)
+                request_id, data = tcp_framing.receiveMessage(
+                    tcp_socket,
+                    reader)
                 
                 full_message = HEADER + "Message received from server: " + RESET
                 
-                if (message).lower() == "request serialized message":
+                if ((message).lower().startswith("get ") and
+                        data.startswith(b"FILE ")):
+                    # The file follows, write it directly to disk
+                    file_name = os.path.basename(message[4:].strip())
+                    start = perf_counter()
+
+                    with open(file_name, "wb") as out_file:
+                        tcp_framing.receiveToFile(
+                            tcp_socket,
+                            reader,
+                            out_file,
+                            file_buffer)
+
+                    elapsed = perf_counter() - start
+                    size = int(data.split()[1])
+                    print(full_message + data.decode())
+                    print(HEADER + "File saved as '" + file_name + "' (" +
+                          f"{size / (elapsed * 1e6):.1f}" + " MB/s)" + RESET)
+                elif (message).lower() == "request serialized message":
                     # Deserialize the data using (pickle.loads)
                     print(full_message + (str)(pickle.loads(data)))
+                elif (message).lower() == binary_codec.BINARY_COMMAND:
+                    # Deserialize the data using (binary_codec.decode)
+                    print(full_message + (str)(binary_codec.decode(data)))
                 else:
                     # Deserialize the data using (decode)
                     print(full_message + data.decode())
@@ -107,6 +154,11 @@ if __name__ == '__main__':
             # If the server does not respond within 5 seconds, a message is printed
             print(HEADER + "The server has not responded in 5 seconds" + RESET)
 
+        except ConnectionError as err:
+            # The server has closed the connection
+            print(f"{HEADER}Connection error: {err}{RESET}")
+            connection_on = False
+
     # Close socket -------------------------------------------------------------
     tcp_socket.close()
 
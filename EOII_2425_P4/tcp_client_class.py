@@ -0,0 +1,394 @@
+"""
+@file     tcp_client_class.py
+
+@author   Marcos Belda Martinez' <mbelmar@etsinf.upv.es>
+@date     October, 2024
+@section  EOII-GIIROB
+@brief    TCP Client library for automated callers: persistent connections,
+          pipelined requests matched by request ID, and a pool of them.
+"""
+
+# ---------------------------------------------------------------------------- #
+# NEEDED IMPORTS
+
+from concurrent.futures import Future, TimeoutError  # Pending replies
+import itertools  # For generating request IDs
+import socket     # For network communication using sockets
+import tcp_framing  # For delimiting the messages (length + request ID)
+import threading  # For receiving the replies in the background
+
+# ---------------------------------------------------------------------------- #
+# CLIENT PARAMETERS
+
+REQUEST_TIMEOUT = 5    # Seconds to wait for the reply of a request
+PIPELINE_WINDOW = 64   # Max requests in flight per connection
+POOL_SIZE       = 4    # Persistent connections of a pool
+
+# Commands the server does not answer
+NO_REPLY_COMMANDS = frozenset(
+    ["close client", "close server", "close client and server"])
+
+# ---------------------------------------------------------------------------- #
+# CREATING TCP CLIENT CONNECTION CLASS
+
+class tcpClientConnection:
+
+    def __init__(self, server_address, window = PIPELINE_WINDOW,
+                 timeout = REQUEST_TIMEOUT):
+        """
+        Function to initialize TCP Client Connection Class variables.
+        Requests are sent as soon as there is room in the window, without
+        waiting for previous replies, and a background thread matches the
+        replies with their requests by request ID.
+        """
+        self.server_address = server_address
+        self.timeout = timeout
+
+        # Connect (small messages must not wait for Nagle's algorithm)
+        self.tcp_socket = socket.create_connection(server_address, timeout)
+        self.tcp_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.tcp_socket.settimeout(None)
+
+        self.reader = tcp_framing.frameReader()
+        self.send_lock = threading.Lock()
+
+        # Outstanding requests (request ID -> Future of the reply)
+        self.in_flight = {}
+        self.in_flight_lock = threading.Lock()
+        self.window_slots = threading.BoundedSemaphore(window)
+        self.request_ids = itertools.count(1)
+
+        # The connection is broken once an error has been received
+        self.error = None
+
+        # Thread that receives the replies
+        self.reply_receiver = threading.Thread(
+            target = self.receiveReplies,
+            daemon = True)
+        self.reply_receiver.start()
+
+        ### end def __init__() ###
+
+    @property
+    def is_open(self):
+        """
+        True while the connection can be used.
+        """
+        return self.error is None
+
+        ### end def is_open() ###
+
+    def submit(self, message):
+        """
+        Function to send a request (str or bytes) without waiting for its
+        reply. Returns a Future of the reply (bytes), already done with
+        None for the commands the server does not answer.
+        """
+        return self.submitMany([message])[0]
+
+        ### end def submit() ###
+
+    def submitMany(self, messages):
+        """
+        Function to send several requests with a single write.
+        Returns the list of Futures of their replies.
+        Raises TimeoutError if no slot of the window is released in time
+        (the server is not answering), cancelling the requests of the call.
+        """
+        futures = []
+        frames = []
+
+        messages = [message.encode() if isinstance(message, str) else message
+                    for message in messages]
+
+        for message in messages:
+            if message[:4].lower() == b"get ":
+                # The file would be received in memory, see receiveToFile()
+                raise ValueError("file transfers need their own connection "
+                                 "(tcp_framing.receiveToFile)")
+
+        for message in messages:
+            future = Future()
+            futures.append(future)
+
+            if message.decode(errors = "replace").lower() in NO_REPLY_COMMANDS:
+                future.set_result(None)
+                frames.append(message)
+                continue
+
+            # Wait for room in the window (a reply releases a slot), sending
+            # the requests batched so far so their replies can arrive
+            if self.window_slots.acquire(blocking = False) == False:
+                self.sendBatch(frames)
+                frames = []
+
+                if self.window_slots.acquire(timeout = self.timeout) == False:
+                    for pending in futures:
+                        self.cancelRequest(pending)
+
+                    raise TimeoutError("no reply from the server, "
+                                       "the pipeline window is full")
+
+            request_id = next(self.request_ids) & tcp_framing.MAX_REQUEST_ID
+
+            with self.in_flight_lock:
+                if self.error is not None:
+                    self.window_slots.release()
+                    future.set_exception(self.error)
+                    continue
+
+                self.in_flight[request_id] = future
+                future.request_id = request_id
+
+            frames.append((request_id, message))
+
+        self.sendBatch(frames)
+
+        return futures
+
+        ### end def submitMany() ###
+
+    def sendBatch(self, frames):
+        """
+        Function to send several frames with a single write. If it fails,
+        the connection is broken and every outstanding request fails.
+        """
+        if not frames:
+            return
+
+        try:
+            with self.send_lock:
+                tcp_framing.sendFrames(self.tcp_socket, frames)
+        except OSError as error:
+            self.failRequests(error)
+
+        ### end def sendBatch() ###
+
+    def request(self, message, timeout = REQUEST_TIMEOUT):
+        """
+        Function to send a request and wait for its reply (bytes).
+        Raises TimeoutError if the reply does not arrive in time.
+        """
+        return self.waitReply(self.submit(message), timeout)
+
+        ### end def request() ###
+
+    def waitReply(self, future, timeout = REQUEST_TIMEOUT):
+        """
+        Function to wait for the reply of a request of this connection.
+        If it does not arrive in time, the request is cancelled (so it
+        does not keep its window slot) and TimeoutError is raised.
+        """
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            self.cancelRequest(future)
+            raise
+
+        ### end def waitReply() ###
+
+    def cancelRequest(self, future):
+        """
+        Function to forget an outstanding request and release its window
+        slot. A late reply is ignored.
+        """
+        request_id = getattr(future, "request_id", None)
+
+        with self.in_flight_lock:
+            cancelled = ((request_id is not None) and
+                         (self.in_flight.get(request_id) is future))
+
+            if cancelled == True:
+                del self.in_flight[request_id]
+
+        if cancelled == True:
+            self.window_slots.release()
+            future.cancel()
+
+        ### end def cancelRequest() ###
+
+    def receiveReplies(self):
+        """
+        This function runs in the reply receiver thread.
+        Replies are matched with their request by the request ID.
+        """
+        try:
+            while True:
+                request_id, reply = tcp_framing.receiveMessage(
+                    self.tcp_socket,
+                    self.reader)
+
+                with self.in_flight_lock:
+                    future = self.in_flight.pop(request_id, None)
+
+                if future is not None:
+                    self.window_slots.release()
+                    future.set_result(reply)
+
+        except (OSError, ValueError) as error:
+            # Connection closed or broken, fail every outstanding request
+            self.failRequests(error)
+
+        ### end def receiveReplies() ###
+
+    def failRequests(self, error):
+        """
+        Function to mark the connection as broken and fail every
+        outstanding request with error.
+        """
+        with self.in_flight_lock:
+            if self.error is None:
+                self.error = ConnectionError(str(error))
+
+            futures = list(self.in_flight.values())
+            self.in_flight.clear()
+
+        for future in futures:
+            self.window_slots.release()
+            future.set_exception(self.error)
+
+        ### end def failRequests() ###
+
+    def close(self):
+        """
+        Function to close the connection. Outstanding requests fail.
+        """
+        try:
+            self.tcp_socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+        self.tcp_socket.close()
+        self.reply_receiver.join()
+
+        ### end def close() ###
+
+# ---------------------------------------------------------------------------- #
+# CREATING TCP CONNECTION POOL CLASS
+
+class tcpConnectionPool:
+
+    def __init__(self, server_address, size = POOL_SIZE,
+                 window = PIPELINE_WINDOW, timeout = REQUEST_TIMEOUT):
+        """
+        Function to initialize TCP Connection Pool Class variables.
+        Up to size persistent connections are opened when needed and
+        used in turns. Broken connections are replaced.
+        """
+        self.server_address = server_address
+        self.window = window
+        self.timeout = timeout
+
+        self.connections = [None] * size
+        self.turns = itertools.cycle(range(size))
+        self.lock = threading.Lock()
+
+        ### end def __init__() ###
+
+    def getConnection(self):
+        """
+        Function to get the connection for the next request, opening
+        (or reopening) it if needed.
+        """
+        with self.lock:
+            index = next(self.turns)
+            connection = self.connections[index]
+
+            if (connection is None) or (connection.is_open == False):
+                if connection is not None:
+                    connection.close()
+
+                connection = tcpClientConnection(
+                    self.server_address,
+                    self.window,
+                    self.timeout)
+                self.connections[index] = connection
+
+        return connection
+
+        ### end def getConnection() ###
+
+    def submit(self, message):
+        """
+        Function to send a request through the pool.
+        Returns a Future of the reply (bytes).
+        """
+        return self.getConnection().submit(message)
+
+        ### end def submit() ###
+
+    def request(self, message, timeout = REQUEST_TIMEOUT):
+        """
+        Function to send a request through the pool and wait for its reply.
+        """
+        connection = self.getConnection()
+
+        return connection.waitReply(connection.submit(message), timeout)
+
+        ### end def request() ###
+
+    def map(self, messages, timeout = REQUEST_TIMEOUT):
+        """
+        Function to send every request (spread over the connections, each
+        batch in a single write) and get their replies in order.
+        """
+        messages = list(messages)
+        num_connections = len(self.connections)
+        futures = [None] * len(messages)
+        connections = [None] * len(messages)
+
+        for first in range(num_connections):
+            batch = messages[first::num_connections]
+
+            if batch:
+                connection = self.getConnection()
+                futures[first::num_connections] = connection.submitMany(batch)
+                connections[first::num_connections] = [connection] * len(batch)
+
+        try:
+            return [future.result(timeout) for future in futures]
+        except TimeoutError:
+            # Do not keep the window slots of the requests not answered
+            for connection, future in zip(connections, futures):
+                connection.cancelRequest(future)
+            raise
+
+        ### end def map() ###
+
+    def close(self):
+        """
+        Function to close every connection of the pool.
+        """
+        with self.lock:
+            for connection in self.connections:
+                if connection is not None:
+                    connection.close()
+
+            self.connections = [None] * len(self.connections)
+
+        ### end def close() ###
+
+# ---------------------------------------------------------------------------- #
+# EXAMPLE
+
+if __name__ == '__main__':
+    """
+    This example sends many requests to the TCP Server through a pool of
+    pipelined connections and prints the throughput.
+    """
+    from time import perf_counter
+
+    pool = tcpConnectionPool(("localhost", 12000))
+
+    messages = ["time", "request binary serialized message"] * 10000
+
+    start = perf_counter()
+    replies = pool.map(messages)
+    elapsed = perf_counter() - start
+
+    print(str(len(replies)) + " replies in " + f"{elapsed:.3f}" + " s (" +
+          f"{len(replies) / elapsed:.0f}" + " requests/s)")
+
+    pool.close()
+
+# end of file #
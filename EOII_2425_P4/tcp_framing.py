@@ -0,0 +1,298 @@
+"""
+@file     tcp_framing.py
+
+@author   Marcos Belda Martinez' <mbelmar@etsinf.upv.es>
+@date     October, 2024
+@section  EOII-GIIROB
+@brief    Length-prefixed framing of the messages sent over TCP, so they
+          are delimited correctly however TCP splits or joins the writes.
+          Each frame also carries a request ID, echoed in the reply, so
+          pipelined replies can be matched with their requests.
+"""
+
+# ---------------------------------------------------------------------------- #
+# NEEDED IMPORTS
+
+import struct  # For packing the frame headers
+
+# ---------------------------------------------------------------------------- #
+# FRAMING PARAMETERS
+
+# Length of the message and request ID (0 if not used), 32 bits each
+FRAME_HEADER = struct.Struct("!II")
+
+MAX_REQUEST_ID   = 0xFFFFFFFF
+MAX_FRAME_LENGTH = 0xFFFFFFFF  # Longest message (or file) a header can carry
+
+BUFFER_SIZE      = 4096              # Initial size of the reception buffer
+MAX_MESSAGE_SIZE = 64 * 1024 * 1024  # Max length accepted from the network
+MAX_BATCH_SIZE   = 64 * 1024         # Max message joined to its header
+FILE_CHUNK_SIZE  = 256 * 1024        # Reception buffer of the file transfers
+
+# ---------------------------------------------------------------------------- #
+# FUNCTIONS
+
+def appendFrame(buffer, message, request_id = 0):
+    """
+    Function to append a framed message to buffer (a bytearray), e.g. to
+    send the replies to several messages with a single write.
+    """
+    buffer += FRAME_HEADER.pack(len(message), request_id)
+    buffer += message
+
+    ### end def appendFrame() ###
+
+def sendFrame(tcp_socket, message, request_id = 0):
+    """
+    Function to send a framed message (blocking socket). Small messages are
+    joined to their header (one write), big ones are sent from a memoryview
+    (no copy).
+    """
+    header = FRAME_HEADER.pack(len(message), request_id)
+
+    if len(message) <= MAX_BATCH_SIZE:
+        tcp_socket.sendall(header + message)
+    else:
+        tcp_socket.sendall(header)
+        tcp_socket.sendall(memoryview(message))
+
+    ### end def sendFrame() ###
+
+def sendFrames(tcp_socket, messages):
+    """
+    Function to send several framed messages with a single write.
+    messages is a list of messages, or of (request ID, message) tuples.
+    """
+    buffer = bytearray()
+
+    for message in messages:
+        if isinstance(message, tuple):
+            request_id, message = message
+            appendFrame(buffer, message, request_id)
+        else:
+            appendFrame(buffer, message)
+
+    tcp_socket.sendall(memoryview(buffer))
+
+    ### end def sendFrames() ###
+
+def receiveMessage(tcp_socket, reader):
+    """
+    Function to receive the next (request ID, message) tuple (blocking
+    socket), using the frameReader of the connection. Messages already
+    read are returned without any system call.
+    Raises ConnectionError if the connection is closed.
+    """
+    message = reader.nextMessage()
+
+    while message is None:
+        if reader.readFrom(tcp_socket) == 0:
+            raise ConnectionError("The remote host has closed the connection")
+
+        message = reader.nextMessage()
+
+    return message
+
+    ### end def receiveMessage() ###
+
+def receiveToFile(tcp_socket, reader, out_file, buffer = None):
+    """
+    Function to receive the next message (blocking socket) writing it
+    directly to out_file, whatever its size. Data is received (recv_into)
+    in buffer, a reusable bytearray (one of FILE_CHUNK_SIZE by default).
+    Returns the (request ID, length) of the message.
+    Raises ConnectionError if the connection is closed.
+    """
+    header = reader.nextHeader()
+
+    while header is None:
+        if reader.readFrom(tcp_socket) == 0:
+            raise ConnectionError("The remote host has closed the connection")
+
+        header = reader.nextHeader()
+
+    request_id, length = header
+
+    # Part of the message may have been received together with the header
+    received = reader.takeBuffered(length)
+    out_file.write(received)
+    remaining = length - len(received)
+
+    if buffer is None:
+        buffer = bytearray(min(remaining, FILE_CHUNK_SIZE))
+
+    view = memoryview(buffer)
+
+    while remaining > 0:
+        nbytes = tcp_socket.recv_into(view, min(remaining, len(view)))
+
+        if nbytes == 0:
+            raise ConnectionError("The remote host has closed the connection")
+
+        out_file.write(view[:nbytes])
+        remaining -= nbytes
+
+    return (request_id, length)
+
+    ### end def receiveToFile() ###
+
+# ---------------------------------------------------------------------------- #
+# CREATING FRAME READER CLASS
+
+class frameReader:
+
+    def __init__(self, buffer_size = BUFFER_SIZE):
+        """
+        Function to initialize Frame Reader Class variables.
+        Data is received (recv_into) in a reusable buffer that only grows
+        if a message does not fit in it.
+        """
+        self.buffer = bytearray(buffer_size)
+        self.view = memoryview(self.buffer)
+
+        # Received data not processed yet: self.buffer[start:end]
+        self.start = 0
+        self.end = 0
+
+        # Bytes needed (header included) to complete the next message
+        self.needed = FRAME_HEADER.size
+
+        ### end def __init__() ###
+
+    def readFrom(self, tcp_socket):
+        """
+        Function to receive data from tcp_socket into the buffer.
+        Returns the number of bytes received (0 if the connection is
+        closed). Non-blocking sockets may raise BlockingIOError.
+        """
+        if ((self.start + self.needed > len(self.buffer)) or
+                (self.end == len(self.buffer))):
+            self.makeRoom()
+
+        nbytes = tcp_socket.recv_into(self.view[self.end:])
+        self.end += nbytes
+
+        return nbytes
+
+        ### end def readFrom() ###
+
+    def makeRoom(self):
+        """
+        Function to move the unprocessed data to the beginning of the
+        buffer, growing it if the next message does not fit.
+        """
+        pending = self.end - self.start
+
+        if (self.needed > len(self.buffer)) or (pending == len(self.buffer)):
+            # A bigger buffer is needed (a new one, the old one is exported)
+            buffer = bytearray(max(self.needed, 2 * len(self.buffer)))
+            buffer[:pending] = self.view[self.start:self.end]
+
+            self.view.release()
+            self.buffer = buffer
+            self.view = memoryview(buffer)
+
+        else:
+            # Copy first, the source and destination may overlap
+            self.buffer[:pending] = bytes(self.view[self.start:self.end])
+
+        self.start = 0
+        self.end = pending
+
+        ### end def makeRoom() ###
+
+    def nextMessage(self):
+        """
+        Function to get the next complete message, as a (request ID,
+        message) tuple, or None if it has not been completely received yet.
+        Raises ValueError if the message is longer than MAX_MESSAGE_SIZE.
+        """
+        available = self.end - self.start
+
+        if available < FRAME_HEADER.size:
+            self.needed = FRAME_HEADER.size
+            return None
+
+        length, request_id = FRAME_HEADER.unpack_from(self.buffer, self.start)
+
+        if length > MAX_MESSAGE_SIZE:
+            raise ValueError("message too long: " + str(length) + " bytes")
+
+        self.needed = FRAME_HEADER.size + length
+
+        if available < self.needed:
+            return None
+
+        first = self.start + FRAME_HEADER.size
+        message = bytes(self.view[first:first + length])
+
+        self.start = first + length
+        self.needed = FRAME_HEADER.size
+        self.resetIfEmpty()
+
+        return (request_id, message)
+
+        ### end def nextMessage() ###
+
+    def nextHeader(self):
+        """
+        Function to get the next frame header, as a (request ID, length)
+        tuple, leaving its message to be read with takeBuffered() and
+        recv_into (no size limit, see receiveToFile()).
+        Returns None if the header has not been completely received yet.
+        """
+        if self.end - self.start < FRAME_HEADER.size:
+            self.needed = FRAME_HEADER.size
+            return None
+
+        length, request_id = FRAME_HEADER.unpack_from(self.buffer, self.start)
+        self.start += FRAME_HEADER.size
+        self.resetIfEmpty()
+
+        return (request_id, length)
+
+        ### end def nextHeader() ###
+
+    def takeBuffered(self, max_bytes):
+        """
+        Function to take up to max_bytes of the data received and not
+        processed yet.
+        """
+        nbytes = min(max_bytes, self.end - self.start)
+        data = bytes(self.view[self.start:self.start + nbytes])
+
+        self.start += nbytes
+        self.resetIfEmpty()
+
+        return data
+
+        ### end def takeBuffered() ###
+
+    def resetIfEmpty(self):
+        """
+        Function to reuse the buffer from the beginning once everything
+        received has been processed.
+        """
+        if self.start == self.end:
+            self.start = 0
+            self.end = 0
+
+        ### end def resetIfEmpty() ###
+
+    def getMessages(self):
+        """
+        Function to get every complete message received, as a list of
+        (request ID, message) tuples.
+        """
+        messages = []
+        message = self.nextMessage()
+
+        while message is not None:
+            messages.append(message)
+            message = self.nextMessage()
+
+        return messages
+
+        ### end def getMessages() ###
+
+# end of file #
@@ -10,116 +10,48 @@
 # ---------------------------------------------------------------------------- #
 # NEEDED IMPORTS
 
-from datetime import datetime  # For handling date and time
-import pickle  # For serializing and deserializing Python objects
-import socket  # For network communication using sockets
-
-# ---------------------------------------------------------------------------- #
-# COLOR DEFINES
-
-YELLOW = "\033[93m"  # Define yellow color for console output
-BOLD   = "\033[1m"   # Define bold text format
-RESET  = "\033[0m"   # Define reset format for console output
-HEADER = BOLD + YELLOW + "(SERVER) " + RESET + YELLOW  # Header format
+import argparse  # For reading the command line options
+import tcp_server_class as tcp_s  # TCP Server Class (many connections)
 
 # ---------------------------------------------------------------------------- #
 # SERVER
 
 if __name__ == '__main__':
     """
-    This example creates a TCP socket and binds it to a specific IP address
-    and port. It then receives a message from the client and sends a response.
+    This example creates a TCP Server bound to a specific IP address and
+    port. It serves every client connection at the same time, answering
+    their messages, until a client asks the server to close.
     """
-    # Create a TCP socket
-    tcp_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    
-    # Set a timeout of 10 seconds
-    tcp_socket.settimeout(10)
-    
-    # Define the port and IP address of the server to which we will connect
-    server_address = ('localhost', 12000)
-
-    # Server status variable
-    server_on = True
-    connection_on = False
-
-    # Bind the socket object to the port and IP address
-    tcp_socket.bind(server_address)
-
-    # Put the server in listening mode to accept incoming connections
-    tcp_socket.listen(1)
-    
-    while server_on == True:
-        
-        print("\n" + HEADER + "Waiting for incoming connections..." + RESET)
-        
-        # Accept an incoming connection ----------------------------------------
-        try:
-            connection, client_address = tcp_socket.accept()
-            # Set a timeout of 10 seconds
-            connection.settimeout(10)
-            connection_on = True
-            print(HEADER + "Connection established from:" + RESET, client_address)
-
-        except socket.timeout:
-            print(HEADER + "Error: Time for accepts has expired" + RESET)
-
-        while connection_on == True:
-
-            # Receive a message from client ------------------------------------
-            try:
-                data = connection.recv(4096)
-                print(HEADER + "Message received from client:" + RESET, data.decode())
-            
-            except socket.timeout:
-                print(HEADER + "Error: Data reception has expired" + RESET)
-                connection_on = False
-
-            except socket.error as err:
-                print(f"{HEADER}Error receiving data: {err}{RESET}")
-                connection_on = False
-
-            if connection_on == True:
-
-                # If client is closed do not send anything ---------------------
-                if (data.decode()).lower() == "close client":
-                    connection_on = False
-
-                # If server has been asked to close, then say goodbye ----------
-                elif ((data.decode()).lower() == "close server" or
-                      (data.decode()).lower() == "close client and server"):
-                    print(HEADER + "Goodbye!" + RESET)
-                    connection_on = False
-                    server_on = False
-
-                # Send message using (pickle.dumps) ----------------------------
-                elif (data.decode()).lower() == "request serialized message":
-                    # Data to send (a list of numbers)
-                    unserialized_msg = [1, 2, 3, 4, 5]
-                    
-                    # Serialize msg using pickle.dumps()
-                    serialized_msg = pickle.dumps(unserialized_msg)
-                    
-                    # Send a response to client
-                    print(HEADER + "Sending serialized message to client..." + RESET)
-                    connection.send(serialized_msg)
-
-                # Send message using (encode) ----------------------------------
-                else:
-                    if (data.decode()).lower() == "time":
-                        # Get the current time
-                        current_time = datetime.now().time()
-                        # Convert the current time to a string in the format hh:mm:ss
-                        message = current_time.strftime('%H:%M:%S')       
-                    else:
-                        message = "Nothing to say"
-                    
-                    # Send a response to client
-                    print(HEADER + "Sending message to client..." + RESET)
-                    connection.send(message.encode())
-    
-    # Close socket -------------------------------------------------------------
-    connection.close()
-    tcp_socket.close()
+    parser = argparse.ArgumentParser(description = __doc__)
+    parser.add_argument("--ip", default = "localhost")
+    parser.add_argument("--port", type = int, default = 12000)
+    parser.add_argument("--backlog", type = int,
+                        default = tcp_s.DEFAULT_BACKLOG,
+                        help = "connections waiting to be accepted")
+    parser.add_argument("--idle-timeout", type = float,
+                        default = tcp_s.IDLE_TIMEOUT,
+                        help = "seconds before closing an idle connection "
+                               "(no limit by default, or 0)")
+    parser.add_argument("--files", default = None,
+                        help = "folder served by 'GET <file>' "
+                               "(file transfers disabled by default)")
+    parser.add_argument("--quiet", action = "store_true",
+                        help = "do not print every message")
+    args = parser.parse_args()
+
+    # Create the TCP Server
+    server = tcp_s.tcpServer(
+        server_address  = (args.ip, args.port),
+        backlog         = args.backlog,
+        idle_timeout    = args.idle_timeout or None,
+        files_directory = args.files)
+
+    server.setVerbose(not args.quiet)
+
+    # Serve connections until a client sends "close server" (or Ctrl+C)
+    try:
+        server.serveForever()
+    except KeyboardInterrupt:
+        pass
 
 # end of file #
@@ -0,0 +1,247 @@
+"""
+@file     tcp_server_benchmark.py
+
+@author   Marcos Belda Martinez' <mbelmar@etsinf.upv.es>
+@date     October, 2024
+@section  EOII-GIIROB
+@brief    Load generator comparing the selectors TCP Server (tcp_server_class)
+          with the asyncio one (tcp_asyncio, plain TCP and TLS) under many
+          concurrent connections.
+"""
+
+# ---------------------------------------------------------------------------- #
+# NEEDED IMPORTS
+
+import argparse
+import asyncio
+import multiprocessing
+import socket
+from   time import perf_counter, sleep
+import tcp_asyncio
+import tcp_server_class as tcp_s
+
+try:
+    import resource  # For raising the open files limit (unix only)
+except ImportError:
+    resource = None
+
+# ---------------------------------------------------------------------------- #
+# BENCHMARK PARAMETERS
+
+# Requests of each connection, in turns
+MESSAGES = [b"time",
+            b"request serialized message",
+            b"request binary serialized message",
+            b"hello"]
+
+# Spawn, so client processes do not share anything with the server
+CONTEXT = multiprocessing.get_context("spawn")
+
+# ---------------------------------------------------------------------------- #
+# FUNCTIONS
+
+def raiseOpenFilesLimit():
+    """
+    Function to raise the open files limit of the process to its maximum,
+    each connection is a file descriptor.
+    """
+    if resource is not None:
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    ### end def raiseOpenFilesLimit() ###
+
+def runServer(kind, server_address, certfile, keyfile):
+    """
+    This function runs in the server process.
+    kind is "selectors", "asyncio" or "asyncio+tls".
+    """
+    raiseOpenFilesLimit()
+
+    if kind == "selectors":
+        server = tcp_s.tcpServer(
+            server_address,
+            backlog      = 4096,
+            idle_timeout = None)
+        server.serveForever()
+        return
+
+    async def serve():
+        ssl_context = None
+
+        if kind == "asyncio+tls":
+            ssl_context = tcp_asyncio.makeServerContext(certfile, keyfile)
+
+        server = tcp_asyncio.tcpStreamServer(idle_timeout = None)
+        await server.start(server_address, ssl_context, backlog = 4096)
+        await server.serveForever()
+
+    asyncio.run(serve())
+
+    ### end def runServer() ###
+
+def runClients(server_address, num_connections, num_requests, pipeline,
+               cafile, results):
+    """
+    This function runs in each client process: num_connections connections
+    on one event loop, each sending num_requests requests (pipeline of
+    them in flight at once). Puts (latencies, errors, elapsed) in results.
+    """
+    raiseOpenFilesLimit()
+
+    async def runConnection(client, latencies):
+        async def requester(first):
+            for index in range(first, num_requests, pipeline):
+                start = perf_counter()
+                await client.request(MESSAGES[index % len(MESSAGES)])
+                latencies.append(perf_counter() - start)
+
+        await asyncio.gather(*(requester(first) for first in range(pipeline)))
+
+    async def run():
+        ssl_context = None
+
+        if cafile is not None:
+            ssl_context = tcp_asyncio.makeClientContext(cafile)
+
+        clients = await asyncio.gather(
+            *(tcp_asyncio.openClient(server_address, ssl_context)
+              for _ in range(num_connections)))
+
+        latencies = []
+        start = perf_counter()
+        outcomes = await asyncio.gather(
+            *(runConnection(client, latencies) for client in clients),
+            return_exceptions = True)
+        elapsed = perf_counter() - start
+
+        for client in clients:
+            await client.close()
+
+        errors = sum(1 for outcome in outcomes if outcome is not None)
+
+        return (latencies, errors, elapsed)
+
+    results.put(asyncio.run(run()))
+
+    ### end def runClients() ###
+
+def waitForServer(server_address, timeout):
+    """
+    Function to wait until the server accepts connections.
+    """
+    deadline = perf_counter() + timeout
+
+    while True:
+        try:
+            socket.create_connection(server_address, timeout = 1).close()
+            return
+        except OSError:
+            if perf_counter() > deadline:
+                raise
+            sleep(0.05)
+
+    ### end def waitForServer() ###
+
+def percentile(sorted_values, fraction):
+    """
+    Function to get a percentile of a sorted list (0 if it is empty).
+    """
+    if not sorted_values:
+        return 0.0
+
+    index = min(int(fraction * len(sorted_values)), len(sorted_values) - 1)
+
+    return sorted_values[index]
+
+    ### end def percentile() ###
+
+def runBenchmark(kind, args):
+    """
+    Function to start a server of the given kind, load it with the client
+    processes and print the results.
+    """
+    server_address = ("localhost", args.port)
+    cafile = args.certfile if kind == "asyncio+tls" else None
+
+    server = CONTEXT.Process(
+        target = runServer,
+        args   = (kind, server_address, args.certfile, args.keyfile))
+    server.start()
+    waitForServer(server_address, timeout = 5.0)
+
+    # Run the clients (the connections are split between the processes)
+    results = CONTEXT.Queue()
+    clients = [
+        CONTEXT.Process(
+            target = runClients,
+            args   = (server_address,
+                      len(range(index, args.connections, args.processes)),
+                      args.requests, args.pipeline, cafile, results))
+        for index in range(args.processes)]
+
+    for client in clients:
+        client.start()
+
+    latencies = []
+    errors = 0
+    elapsed = 0.0
+
+    for client in clients:
+        client_latencies, client_errors, client_elapsed = results.get()
+        latencies.extend(client_latencies)
+        errors += client_errors
+        elapsed = max(elapsed, client_elapsed)
+
+    for client in clients:
+        client.join()
+
+    server.terminate()
+    server.join()
+
+    # Report -------------------------------------------------------------------
+    latencies.sort()
+
+    print("server         : " + kind)
+    print("connections    : " + str(args.connections) +
+          " (" + str(errors) + " failed)")
+    print("replies        : " + str(len(latencies)))
+    print(f"throughput     : {len(latencies) / elapsed:.0f} replies/s")
+    for name, fraction in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99)):
+        print(f"latency {name}    : "
+              f"{1000.0 * percentile(latencies, fraction):.3f} ms")
+    print()
+
+    ### end def runBenchmark() ###
+
+# ---------------------------------------------------------------------------- #
+# BENCHMARK
+
+if __name__ == '__main__':
+    """
+    This example runs each server in its own process and loads it with
+    many concurrent connections from the client processes.
+    """
+    parser = argparse.ArgumentParser(description = __doc__)
+    parser.add_argument("--port", type = int, default = 12000)
+    parser.add_argument("--servers", default = "selectors,asyncio",
+                        help = "servers to compare: selectors, asyncio "
+                               "and asyncio+tls (needs --certfile)")
+    parser.add_argument("--connections", type = int, default = 1000,
+                        help = "concurrent connections")
+    parser.add_argument("--requests", type = int, default = 50,
+                        help = "requests per connection")
+    parser.add_argument("--pipeline", type = int, default = 1,
+                        help = "requests in flight per connection")
+    parser.add_argument("--processes", type = int, default = 2,
+                        help = "client processes")
+    parser.add_argument("--certfile", default = None,
+                        help = "certificate for asyncio+tls "
+                               "(see tcp_asyncio.py)")
+    parser.add_argument("--keyfile", default = None)
+    args = parser.parse_args()
+
+    for kind in args.servers.split(","):
+        runBenchmark(kind, args)
+
+# end of file #
@@ -0,0 +1,753 @@
+"""
+@file     tcp_server_class.py
+
+@author   Marcos Belda Martinez' <mbelmar@etsinf.upv.es>
+@date     October, 2024
+@section  EOII-GIIROB
+@brief    TCP Server Class code implementation. A single thread serves many
+          simultaneous connections with non-blocking sockets and selectors.
+"""
+
+# ---------------------------------------------------------------------------- #
+# NEEDED IMPORTS
+
+from datetime import datetime  # For handling date and time
+import heapq      # For keeping the idle deadlines of the connections sorted
+import itertools  # For ordering connections with the same deadline
+import os         # For building the path of the shared modules
+import pickle     # For serializing and deserializing Python objects
+import selectors  # For waiting on many sockets at once (epoll on linux)
+import socket     # For network communication using sockets
+import sys        # For adding the shared modules to the import path
+from time import monotonic  # For the idle deadlines of the connections
+from tcp_framing import (  # Length-prefixed messages
+    appendFrame, frameReader, FILE_CHUNK_SIZE, FRAME_HEADER, MAX_FRAME_LENGTH)
+
+# ---------------------------------------------------------------------------- #
+# SHARED MODULES (EOII_2425_common folder)
+
+COMMON_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    os.pardir,
+    "EOII_2425_common")
+
+if COMMON_PATH not in sys.path:
+    sys.path.insert(0, COMMON_PATH)
+
+import binary_codec  # Safe binary serialization of lists of numbers
+
+# ---------------------------------------------------------------------------- #
+# COLOR DEFINES
+
+YELLOW = "\033[93m"  # Define yellow color for console output
+BOLD   = "\033[1m"   # Define bold text format
+RESET  = "\033[0m"   # Define reset format for console output
+HEADER = BOLD + YELLOW + "(SERVER) " + RESET + YELLOW  # Header format
+
+# ---------------------------------------------------------------------------- #
+# SERVER PARAMETERS
+
+DEFAULT_BACKLOG = 128  # Connections waiting to be accepted
+# Seconds without traffic before closing a connection. None (no limit) by
+# default: the pooled clients keep their connections open between bursts.
+IDLE_TIMEOUT    = None
+
+# ---------------------------------------------------------------------------- #
+# CREATING FILE TRANSFER CLASS
+
+class fileTransfer:
+
+    def __init__(self, file, size):
+        """
+        Function to initialize File Transfer Class variables
+        (file being sent to a connection, see getFileCommand()).
+        """
+        self.file = file
+        self.offset = 0
+        self.remaining = size
+
+        # os.sendfile() is not available everywhere (nor for every file)
+        self.use_sendfile = hasattr(os, "sendfile")
+
+        ### end def __init__() ###
+
+# ---------------------------------------------------------------------------- #
+# CREATING TCP CONNECTION CLASS
+
+class tcpConnection:
+
+    def __init__(self, connection_socket, client_address):
+        """
+        Function to initialize TCP Connection Class variables
+        (state of a connection of the server).
+        """
+        self.socket = connection_socket
+        self.client_address = client_address
+
+        # Received data, split into messages (see tcp_framing.py)
+        self.reader = frameReader()
+
+        # Replies not sent yet (the kernel send buffer was full)
+        self.outgoing = bytearray()
+
+        # File being sent after the replies (see fileTransfer), the next
+        # messages are not read until it has been completely sent
+        self.transfer = None
+
+        # Events the selector is waiting for
+        self.events = selectors.EVENT_READ
+
+        # Close the connection once the pending replies are sent
+        self.close_requested = False
+
+        # Time (monotonic) at which the connection is closed if idle
+        self.deadline = None
+
+        ### end def __init__() ###
+
+# ---------------------------------------------------------------------------- #
+# CREATING TCP SERVER CORE CLASS
+
+# Commands of the TCP Server, without any socket.
+
+class tcpServerCore:
+
+    def __init__(self):
+        """
+        Function to initialize TCP Server Core Class variables.
+        """
+        # Control parameters
+        self.server_on = False
+        self.verbose = False
+
+        # Folder served by "GET <file>" (None: file transfers disabled)
+        self.files_directory = None
+
+        # Responses serialized only once
+        self.serialized_response = pickle.dumps([1, 2, 3, 4, 5])
+        self.binary_response = binary_codec.encode([1, 2, 3, 4, 5])
+
+        # Commands table (normalized command -> handler), see registerCommand()
+        self.commands = {}
+
+        # Commands followed by arguments ("GET <file>"), matched by first word
+        self.argument_commands = {}
+        self.registerCommand("close client", self.closeClientCommand)
+        self.registerCommand("close server", self.closeServerCommand)
+        self.registerCommand(
+            "close client and server",
+            self.closeServerCommand)
+        self.registerCommand(
+            "request serialized message",
+            self.serializedMessageCommand)
+        self.registerCommand(
+            binary_codec.BINARY_COMMAND,
+            self.binaryMessageCommand)
+        self.registerCommand("time", self.timeCommand)
+
+        ### end def __init__() ###
+
+    def setVerbose(self, enabled):
+        """
+        Function to enable or disable printing every message and reply.
+        """
+        self.verbose = enabled
+
+        ### end def setVerbose() ###
+
+    def setFilesDirectory(self, files_directory):
+        """
+        Function to set the folder served by "GET <file>"
+        (None to disable file transfers).
+        """
+        if files_directory is not None:
+            files_directory = os.path.realpath(files_directory)
+
+        self.files_directory = files_directory
+
+        ### end def setFilesDirectory() ###
+
+    def openFile(self, message):
+        """
+        Function to open the file asked by a "GET <file>" message.
+        Returns a (file, size) tuple, or (None, error reply) if it can not
+        be sent. Paths outside the files directory are rejected.
+        """
+        if self.files_directory is None:
+            return (None, b"Error: file transfers are disabled")
+
+        name = message.partition(" ")[2].strip()
+        path = os.path.realpath(os.path.join(self.files_directory, name))
+
+        if ((name == "") or
+                (os.path.commonpath([self.files_directory, path]) !=
+                 self.files_directory)):
+            return (None, b"Error: invalid file name")
+
+        try:
+            file = open(path, "rb")
+        except OSError:
+            return (None, b"Error: file not found")
+
+        size = os.fstat(file.fileno()).st_size
+
+        if size > MAX_FRAME_LENGTH:
+            # Its length does not fit in the frame header
+            file.close()
+            return (None, b"Error: file too large")
+
+        self.log("Sending file to client:", name)
+
+        return (file, size)
+
+        ### end def openFile() ###
+
+    def log(self, text, *values):
+        """
+        Function to print a server message (only in verbose mode).
+        """
+        if self.verbose == True:
+            print(HEADER + text + RESET, *values)
+
+        ### end def log() ###
+
+    def registerCommand(self, command, handler, takes_arguments = False):
+        """
+        Function to register (or replace) the handler of a command.
+        The handler is called as handler(message, connection) and must
+        return the encoded reply, or None if nothing has to be sent.
+        Commands that take arguments are matched by the first word of the
+        message, the rest only by the whole message.
+        """
+        if takes_arguments == True:
+            self.argument_commands[command.lower()] = handler
+        else:
+            self.commands[command.lower()] = handler
+
+        ### end def registerCommand() ###
+
+    def processMessage(self, data, connection):
+        """
+        Function to process a message (bytes) from a client connection.
+        Returns the encoded reply, or None if nothing has to be sent.
+        """
+        message = data.decode(errors = "replace")
+        self.log("Message received from client:", message)
+
+        # Look for the command handler, the whole message or its first word
+        # for commands with arguments (unknown messages get a default answer)
+        handler = self.commands.get(message.lower())
+
+        if handler is None:
+            command = message.partition(" ")[0]
+            handler = self.argument_commands.get(
+                command.lower(),
+                self.unknownCommand)
+
+        return handler(message, connection)
+
+        ### end def processMessage() ###
+
+    def closeClientCommand(self, message, connection):
+        """
+        If client is closed do not send anything.
+        """
+        connection.close_requested = True
+
+        return None
+
+        ### end def closeClientCommand() ###
+
+    def closeServerCommand(self, message, connection):
+        """
+        If server has been asked to close, then say goodbye.
+        """
+        self.log("Goodbye!")
+        connection.close_requested = True
+        self.server_on = False
+
+        return None
+
+        ### end def closeServerCommand() ###
+
+    def serializedMessageCommand(self, message, connection):
+        """
+        Send message using (pickle.dumps), serialized only once.
+        """
+        self.log("Sending serialized message to client...")
+
+        return self.serialized_response
+
+        ### end def serializedMessageCommand() ###
+
+    def binaryMessageCommand(self, message, connection):
+        """
+        Send message using (binary_codec.encode), serialized only once.
+        """
+        self.log("Sending binary serialized message to client...")
+
+        return self.binary_response
+
+        ### end def binaryMessageCommand() ###
+
+    def timeCommand(self, message, connection):
+        """
+        Send the current time using (encode).
+        """
+        self.log("Sending message to client...")
+
+        # Get the current time
+        current_time = datetime.now().time()
+        # Convert the current time to a string in the format hh:mm:ss
+        return current_time.strftime('%H:%M:%S').encode()
+
+        ### end def timeCommand() ###
+
+    def unknownCommand(self, message, connection):
+        """
+        Answer to any message that is not a registered command.
+        """
+        self.log("Sending message to client...")
+
+        return b"Nothing to say"
+
+        ### end def unknownCommand() ###
+
+# ---------------------------------------------------------------------------- #
+# CREATING TCP SERVER CLASS
+
+class tcpServer(tcpServerCore):
+
+    def __init__(self, server_address = ("localhost", 12000),
+                 backlog = DEFAULT_BACKLOG, idle_timeout = IDLE_TIMEOUT,
+                 files_directory = None):
+        """
+        Function to initialize TCP Server Class variables.
+        backlog is the number of connections the kernel keeps waiting
+        to be accepted, and idle_timeout the seconds a connection may
+        stay without traffic before it is closed (None for no limit).
+        files_directory is the folder served by "GET <file>" (None to
+        disable file transfers).
+        """
+        super().__init__()
+
+        self.server_address = server_address
+        self.backlog = backlog
+        self.idle_timeout = idle_timeout
+
+        self.setFilesDirectory(files_directory)
+        self.registerCommand("get", self.getFileCommand, takes_arguments = True)
+
+        # Timer heap of (deadline, order, connection) entries. Traffic only
+        # moves connection.deadline forward, the entry is pushed again with
+        # the new deadline when it reaches the top of the heap.
+        self.deadlines = []
+        self.deadline_order = itertools.count()
+        self.idle_connections_closed = 0
+
+        # Listening socket (non-blocking, the selector decides when to accept)
+        self.tcp_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.tcp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.tcp_socket.setblocking(False)
+
+        # Open connections (socket -> tcpConnection)
+        self.connections = {}
+
+        # Socket pair used by shutdown() to wake up the selector
+        self.wakeup_recv, self.wakeup_send = socket.socketpair()
+        self.wakeup_recv.setblocking(False)
+
+        # Selector waiting for connections, messages or wake up requests
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.tcp_socket, selectors.EVENT_READ, None)
+        self.selector.register(self.wakeup_recv, selectors.EVENT_READ, None)
+
+        ### end def __init__() ###
+
+    def serveForever(self):
+        """
+        Function to serve connections until a client sends "close server"
+        (or shutdown() is called). The thread sleeps inside the selector
+        while there is nothing to do.
+        """
+        # Bind the socket and put it in listening mode
+        self.tcp_socket.bind(self.server_address)
+        self.tcp_socket.listen(self.backlog)
+
+        self.server_on = True
+        self.log("Waiting for incoming connections...")
+
+        try:
+            while self.server_on == True:
+                # Sleep until there is an event or the next idle deadline
+                events_list = self.selector.select(self.nextTimeout())
+
+                for key, events in events_list:
+
+                    if key.fileobj is self.tcp_socket:
+                        self.acceptConnections()
+
+                    elif key.fileobj is self.wakeup_recv:
+                        # shutdown() has been called
+                        self.server_on = False
+
+                    else:
+                        connection = key.data
+
+                        if events & selectors.EVENT_READ:
+                            self.readConnection(connection)
+
+                        if ((events & selectors.EVENT_WRITE) and
+                                (connection.socket in self.connections)):
+                            self.writeConnection(connection)
+
+                    if self.server_on == False:
+                        break
+
+                self.closeIdleConnections()
+        finally:
+            self.closeSockets()
+
+        ### end def serveForever() ###
+
+    def acceptConnections(self):
+        """
+        Function to accept every pending connection.
+        """
+        while True:
+            try:
+                connection_socket, client_address = self.tcp_socket.accept()
+            except BlockingIOError:
+                break
+            except ConnectionAbortedError:
+                # The client gave up before being accepted
+                continue
+            except OSError as err:
+                # e.g. too many open files, the rest are accepted later
+                self.log("Error accepting connection:", err)
+                break
+
+            connection_socket.setblocking(False)
+
+            connection = tcpConnection(connection_socket, client_address)
+            self.connections[connection_socket] = connection
+            self.selector.register(
+                connection_socket,
+                selectors.EVENT_READ,
+                connection)
+
+            if self.idle_timeout is not None:
+                connection.deadline = monotonic() + self.idle_timeout
+                order = next(self.deadline_order)
+                heapq.heappush(
+                    self.deadlines,
+                    (connection.deadline, order, connection))
+
+            self.log("Connection established from:", client_address)
+
+        ### end def acceptConnections() ###
+
+    def readConnection(self, connection):
+        """
+        Function to read the messages received by a connection and send
+        all their replies together.
+        """
+        try:
+            nbytes = connection.reader.readFrom(connection.socket)
+        except BlockingIOError:
+            return
+        except OSError as err:
+            self.log("Error receiving data:", err)
+            self.closeConnection(connection)
+            return
+
+        if nbytes == 0:
+            # The client has closed the connection
+            self.closeConnection(connection)
+            return
+
+        self.touchConnection(connection)
+        self.processMessages(connection)
+
+        ### end def readConnection() ###
+
+    def processMessages(self, connection):
+        """
+        Function to process the messages received by a connection and send
+        all their replies together. A file transfer stops the processing,
+        the next messages are processed once the file has been sent.
+        """
+        file_requested = True
+
+        while file_requested == True:
+            file_requested = False
+
+            while True:
+                try:
+                    message = connection.reader.nextMessage()
+                except ValueError as err:
+                    # Not a framed message (or too long), drop the client
+                    self.log("Error receiving data:", err)
+                    self.closeConnection(connection)
+                    return
+
+                if message is None:
+                    break
+
+                request_id, data = message
+                reply = self.processMessage(data, connection)
+
+                # The reply carries the request ID of its message
+                if reply is not None:
+                    appendFrame(connection.outgoing, reply, request_id)
+
+                if connection.transfer is not None:
+                    # The file follows as a message with the same request ID
+                    connection.outgoing += FRAME_HEADER.pack(
+                        connection.transfer.remaining,
+                        request_id)
+                    file_requested = True
+                    break
+
+                if ((connection.close_requested == True) or
+                        (self.server_on == False)):
+                    break
+
+            self.writeConnection(connection, process_pending = False)
+
+            # Go on if the file has already been sent
+            if ((connection.transfer is not None) or
+                    (connection.socket not in self.connections) or
+                    (self.server_on == False)):
+                break
+
+        ### end def processMessages() ###
+
+    def writeConnection(self, connection, process_pending = True):
+        """
+        Function to send the pending replies (and file) of a connection.
+        If the kernel send buffer is full, the rest is sent when the
+        selector reports the connection as writable. Once a file has been
+        sent, the messages received meanwhile are processed (unless
+        process_pending is False, processMessages() does it then).
+        """
+        file_sent = False
+
+        try:
+            if connection.outgoing:
+                nbytes = connection.socket.send(connection.outgoing)
+                del connection.outgoing[:nbytes]
+                self.touchConnection(connection)
+
+            if (not connection.outgoing) and (connection.transfer is not None):
+                self.sendFile(connection)
+                file_sent = connection.transfer is None
+
+        except BlockingIOError:
+            pass
+        except OSError as err:
+            self.log("Error sending data:", err)
+            self.closeConnection(connection)
+            return
+
+        if (file_sent == True) and (process_pending == True):
+            self.processMessages(connection)
+            return
+
+        if connection.transfer is not None:
+            # Only wait until the connection is writable (stop reading)
+            self.setEvents(connection, selectors.EVENT_WRITE)
+
+        elif connection.outgoing:
+            # Wait until the connection is writable
+            self.setEvents(
+                connection,
+                selectors.EVENT_READ | selectors.EVENT_WRITE)
+
+        elif connection.close_requested == True:
+            self.closeConnection(connection)
+
+        else:
+            self.setEvents(connection, selectors.EVENT_READ)
+
+        ### end def writeConnection() ###
+
+    def setEvents(self, connection, events):
+        """
+        Function to change the events the selector waits for on a
+        connection (only if they are different).
+        """
+        if connection.events != events:
+            connection.events = events
+            self.selector.modify(connection.socket, events, connection)
+
+        ### end def setEvents() ###
+
+    def sendFile(self, connection):
+        """
+        Function to send the file of a connection with os.sendfile()
+        (from the page cache to the socket, no copies in user space), or
+        read in chunks if it is not supported. socket.sendfile() is not
+        used because it does not support non-blocking sockets.
+        """
+        transfer = connection.transfer
+
+        while transfer.remaining > 0:
+            if transfer.use_sendfile == True:
+                try:
+                    nbytes = os.sendfile(
+                        connection.socket.fileno(),
+                        transfer.file.fileno(),
+                        transfer.offset,
+                        transfer.remaining)
+                except BlockingIOError:
+                    raise
+                except OSError:
+                    # Not supported for this file or socket, read it instead
+                    transfer.use_sendfile = False
+                    transfer.file.seek(transfer.offset)
+                    continue
+            else:
+                # Read a chunk, it is sent (maybe partially) as a reply
+                chunk = transfer.file.read(
+                    min(transfer.remaining, FILE_CHUNK_SIZE))
+
+                if not chunk:
+                    raise OSError("The file has been truncated")
+
+                connection.outgoing += chunk
+                nbytes = len(chunk)
+
+            if nbytes == 0:
+                raise OSError("The file has been truncated")
+
+            transfer.offset += nbytes
+            transfer.remaining -= nbytes
+            self.touchConnection(connection)
+
+            if connection.outgoing:
+                nbytes = connection.socket.send(connection.outgoing)
+                del connection.outgoing[:nbytes]
+
+                if connection.outgoing:
+                    # Wait until the connection is writable
+                    break
+
+        if (transfer.remaining == 0) and (not connection.outgoing):
+            self.log("File sent to:", connection.client_address)
+            transfer.file.close()
+            connection.transfer = None
+
+        ### end def sendFile() ###
+
+    def getFileCommand(self, message, connection):
+        """
+        Send a file of the files directory ("GET <file>"): a "FILE <size>"
+        reply followed by the file, or an "Error: ..." reply.
+        """
+        file, size = self.openFile(message)
+
+        if file is None:
+            # size is the error reply
+            return size
+
+        connection.transfer = fileTransfer(file, size)
+
+        return ("FILE " + str(size)).encode()
+
+        ### end def getFileCommand() ###
+
+    def touchConnection(self, connection):
+        """
+        Function to move forward the idle deadline of a connection with
+        traffic (O(1), its heap entry is updated when it expires).
+        """
+        if connection.deadline is not None:
+            connection.deadline = monotonic() + self.idle_timeout
+
+        ### end def touchConnection() ###
+
+    def nextTimeout(self):
+        """
+        Function to get the seconds until the next idle deadline,
+        or None if there is none.
+        """
+        if not self.deadlines:
+            return None
+
+        return max(self.deadlines[0][0] - monotonic(), 0)
+
+        ### end def nextTimeout() ###
+
+    def closeIdleConnections(self):
+        """
+        Function to close the connections whose idle deadline has passed.
+        Only the expired entries of the heap are visited, O(log n) each.
+        """
+        now = monotonic()
+
+        while self.deadlines and (self.deadlines[0][0] <= now):
+            deadline, order, connection = heapq.heappop(self.deadlines)
+
+            if connection.socket not in self.connections:
+                # Already closed
+                continue
+
+            if connection.deadline > now:
+                # There was traffic, wait until the new deadline
+                heapq.heappush(
+                    self.deadlines,
+                    (connection.deadline, order, connection))
+                continue
+
+            self.log("Closing idle connection from:", connection.client_address)
+            self.idle_connections_closed += 1
+            self.closeConnection(connection)
+
+        ### end def closeIdleConnections() ###
+
+    def closeConnection(self, connection):
+        """
+        Function to close a connection.
+        """
+        if self.connections.pop(connection.socket, None) is not None:
+            self.selector.unregister(connection.socket)
+            connection.socket.close()
+
+            if connection.transfer is not None:
+                connection.transfer.file.close()
+                connection.transfer = None
+
+        ### end def closeConnection() ###
+
+    def closeSockets(self):
+        """
+        Function to close every connection and socket of the server.
+        """
+        for connection in list(self.connections.values()):
+            self.closeConnection(connection)
+
+        self.deadlines.clear()
+
+        self.selector.close()
+        self.tcp_socket.close()
+        self.wakeup_recv.close()
+        self.wakeup_send.close()
+
+        ### end def closeSockets() ###
+
+    def shutdown(self):
+        """
+        Function to stop serveForever() from another thread.
+        """
+        self.server_on = False
+
+        try:
+            self.wakeup_send.send(b"\0")
+        except OSError:
+            # The server has already finished and closed the sockets
+            pass
+
+        ### end def shutdown() ###
+
+# end of file #
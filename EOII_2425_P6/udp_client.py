@@ -5,13 +5,32 @@
 @date     November, 2024
 @section  EOII-GIIROB
 @brief    UDP Client Code Implementation (sending messages in a loop).
+          With --reliable, lost messages are detected and sent again
+          (see EOII_2425_common/udp_reliability.py).
 """
 
 # ---------------------------------------------------------------------------- #
 # NEEDED IMPORTS
 
+import argparse         # Import argparse for reading the command line options
+import os               # Import os for building the path of the shared modules
+import select           # Import select for waiting for ACKs with a timeout
 import socket           # Import socket for UDP communication
-from time import sleep  # Import sleep for timing control
+import sys              # Import sys for adding the shared modules to the path
+from time import monotonic, sleep  # Import time functions for timing control
+
+# ---------------------------------------------------------------------------- #
+# SHARED MODULES (EOII_2425_common folder)
+
+COMMON_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    os.pardir,
+    "EOII_2425_common")
+
+if COMMON_PATH not in sys.path:
+    sys.path.insert(0, COMMON_PATH)
+
+import udp_reliability  # Sequence numbers, SACK, RTO and send window
 
 # ---------------------------------------------------------------------------- #
 # COLOR DEFINES
@@ -21,6 +40,105 @@ BOLD   = "\033[1m"   # Define bold text format
 RESET  = "\033[0m"   # Define reset format for console output
 HEADER = BOLD + PURPLE + "(CLIENT) " + RESET + PURPLE  # Header format
 
+# ---------------------------------------------------------------------------- #
+# CLIENT PARAMETERS
+
+STATISTICS_PERIOD = 1.0  # Seconds between statistics (reliable mode)
+
+# ---------------------------------------------------------------------------- #
+# FUNCTIONS
+
+def nextValue(variable):
+    """
+    Function to get the next value of the variable to be sent (0 to 100).
+    """
+    if variable < 100:
+        return variable + 1  # Increment variable
+    else:
+        return 0  # Reset variable to 0
+
+    ### end def nextValue() ###
+
+def printStatistics(sender):
+    """
+    Function to print the statistics of the reliable sender.
+    """
+    srtt = sender.rtt.srtt
+
+    print(HEADER + "Sent: " + RESET + str(sender.datagrams_sent) +
+          HEADER + " Acknowledged: " + RESET + str(sender.acknowledged) +
+          HEADER + " Retransmitted: " + RESET + str(sender.retransmissions) +
+          HEADER + " In flight: " + RESET + str(len(sender.in_flight)) +
+          HEADER + " SRTT: " + RESET +
+          ("-" if srtt is None else f"{1000 * srtt:.2f} ms") +
+          HEADER + " RTO: " + RESET + f"{1000 * sender.rtt.rto:.0f} ms")
+
+    ### end def printStatistics() ###
+
+def sendReliably(udp_socket, server_address, period, window, verbose):
+    """
+    Function to send the variable every period seconds until Ctrl+C,
+    keeping each message until it is acknowledged (up to window of them)
+    and sending it again if it is lost.
+    """
+    sender = udp_reliability.reliableSender(udp_socket, server_address, window)
+    udp_socket.setblocking(False)
+
+    variable = 0
+    next_send = monotonic()
+    next_statistics = next_send + STATISTICS_PERIOD
+
+    try:
+        while True:
+            now = monotonic()
+
+            # Send the next value (if the window is not full) ------------------
+            if (now >= next_send) and (sender.can_send == True):
+                if verbose == True:
+                    print(HEADER + "Sending message to server: " + RESET +
+                          str(variable))
+
+                sender.send(str(variable).encode())
+                variable = nextValue(variable)
+
+                # Keep the rate, but do not send a burst after a stall
+                next_send = max(next_send + period, now - period)
+
+            # Print the statistics ---------------------------------------------
+            if now >= next_statistics:
+                printStatistics(sender)
+                next_statistics += STATISTICS_PERIOD
+
+            # Wait for ACKs until something has to be done ---------------------
+            deadlines = [next_statistics]
+
+            if sender.can_send == True:
+                deadlines.append(next_send)
+
+            if sender.nextDeadline() is not None:
+                deadlines.append(sender.nextDeadline())
+
+            timeout = max(min(deadlines) - monotonic(), 0)
+            ready, _, _ = select.select([udp_socket], [], [], timeout)
+
+            # Process every ACK received ---------------------------------------
+            while ready:
+                try:
+                    ack, _ = udp_socket.recvfrom(4096)
+                except (BlockingIOError, ConnectionRefusedError):
+                    break
+
+                if udp_reliability.isAck(ack):
+                    sender.handleAck(ack)
+
+            # Send again the messages whose ACK has not arrived in time --------
+            sender.retransmitExpired()
+
+    except KeyboardInterrupt:
+        printStatistics(sender)
+
+    ### end def sendReliably() ###
+
 # ---------------------------------------------------------------------------- #
 # CLIENT
 
@@ -29,38 +147,63 @@ if __name__ == '__main__':
     This example creates a UDP socket and
     uses it to send a message to the server.
     """
+    parser = argparse.ArgumentParser(description = __doc__)
+    parser.add_argument("--ip", default = "localhost")
+    parser.add_argument("--port", type = int, default = 2999)
+    parser.add_argument("--rate", type = float, default = 2.0,
+                        help = "messages per second")
+    parser.add_argument("--reliable", action = "store_true",
+                        help = "detect and recover lost messages (needs a "
+                               "receiver that sends ACKs, e.g. "
+                               "udp_reliable_server.py)")
+    parser.add_argument("--window", type = int,
+                        default = udp_reliability.SEND_WINDOW,
+                        help = "messages in flight (reliable mode), at least "
+                               "the rate times the RTO to keep the rate "
+                               "while a lost message is recovered")
+    parser.add_argument("--quiet", action = "store_true",
+                        help = "do not print every message")
+    args = parser.parse_args()
+
+    # The receiver only keeps the messages that fit in its window
+    if not 1 <= args.window <= udp_reliability.RECEIVE_WINDOW:
+        parser.error("--window must be between 1 and " +
+                     str(udp_reliability.RECEIVE_WINDOW))
+
     # Create a UDP socket
     udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    
+
     # Get the server's IP address and port
-    server_address = ('localhost', 2999)
-    
+    server_address = (args.ip, args.port)
+
     # Set a timeout of 5 seconds
     udp_socket.settimeout(5)
 
+    if args.reliable == True:
+        sendReliably(udp_socket, server_address, 1.0 / args.rate,
+                     args.window, not args.quiet)
+        client_on = False
+    else:
+        client_on = True
+
     # Initialize the value of the variable to be sent to the server
     variable = 0
 
-    # Client status variable
-    client_on = True
-    
     # Loop to send messages until the client is closed
     while client_on == True:
-        
+
         # Send the current variable value as a message to the server
-        print(HEADER + "Sending message to server: " + RESET + str(variable))  
+        if not args.quiet:
+            print(HEADER + "Sending message to server: " + RESET + str(variable))
         udp_socket.sendto(str(variable).encode(), server_address)
-        
+
         # Update the variable value for the next message
-        if variable < 100:
-            variable += 1  # Increment variable
-        else:
-            variable = 0  # Reset variable to 0
+        variable = nextValue(variable)
 
-        # Pause for 0.5 seconds before sending the next message
-        sleep(0.500)
+        # Pause (0.5 seconds by default) before sending the next message
+        sleep(1.0 / args.rate)
 
     # Close the UDP socket when done
     udp_socket.close()
 
-# end of file #
\ No newline at end of file
+# end of file #
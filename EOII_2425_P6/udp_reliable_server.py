@@ -0,0 +1,149 @@
+"""
+@file     udp_reliable_server.py
+
+@author   Marcos Belda Martinez' <mbelmar@etsinf.upv.es>
+@date     November, 2024
+@section  EOII-GIIROB
+@brief    UDP Server that receives the messages of udp_client.py: the ones
+          sent with --reliable are acknowledged (SACK) and delivered once
+          and in order, plain ones are only printed.
+"""
+
+# ---------------------------------------------------------------------------- #
+# NEEDED IMPORTS
+
+import argparse  # Import argparse for reading the command line options
+from   collections import OrderedDict  # Receivers, least recently used first
+import os        # Import os for building the path of the shared modules
+import sys       # Import sys for adding the shared modules to the path
+
+# ---------------------------------------------------------------------------- #
+# SHARED MODULES (EOII_2425_common folder)
+
+COMMON_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    os.pardir,
+    "EOII_2425_common")
+
+if COMMON_PATH not in sys.path:
+    sys.path.insert(0, COMMON_PATH)
+
+import udp_reliability  # Sequence numbers, SACK, RTO and send window
+import udp_server_core  # Reception loop shared by the UDP servers
+
+# ---------------------------------------------------------------------------- #
+# COLOR DEFINES
+
+GREEN  = "\033[92m"  # Define green color for console output
+BOLD   = "\033[1m"   # Define bold text format
+RESET  = "\033[0m"   # Define reset format for console output
+HEADER = BOLD + GREEN + "(SERVER) " + RESET + GREEN  # Header format
+
+# ---------------------------------------------------------------------------- #
+# SERVER PARAMETERS
+
+MAX_CLIENTS = 10000  # Max client receivers kept (least recently used evicted)
+
+# ---------------------------------------------------------------------------- #
+# CREATING RELIABLE SERVER CLASS
+
+class reliableServer:
+
+    def __init__(self, verbose = True, max_clients = MAX_CLIENTS):
+        """
+        Function to initialize Reliable Server Class variables.
+        Up to max_clients receivers are kept, a client evicted starts
+        again as a new one.
+        """
+        self.verbose = verbose
+        self.max_clients = max_clients
+
+        # One receiver per client (client_address -> reliableReceiver),
+        # least recently used first
+        self.receivers = OrderedDict()
+
+        # Messages received without reliability
+        self.plain_messages = 0
+
+        self.server = udp_server_core.udpServerLoop(self.onDatagram)
+
+        ### end def __init__() ###
+
+    def onDatagram(self, data, client_address):
+        """
+        Callback for each datagram received. Returns the ACK of the
+        reliable ones (None for the plain ones).
+        """
+        if not udp_reliability.isData(data):
+            self.plain_messages += 1
+            self.printMessage(data, client_address)
+            return None
+
+        receiver = self.receivers.get(client_address)
+
+        if receiver is None:
+            if len(self.receivers) >= self.max_clients:
+                self.receivers.popitem(last = False)
+
+            receiver = udp_reliability.reliableReceiver()
+            self.receivers[client_address] = receiver
+        else:
+            self.receivers.move_to_end(client_address)
+
+        payloads, ack = receiver.handleData(data)
+
+        for payload in payloads:
+            self.printMessage(payload, client_address)
+
+        return ack
+
+        ### end def onDatagram() ###
+
+    def printMessage(self, message, client_address):
+        """
+        Function to print a message received (if verbose).
+        """
+        if self.verbose == True:
+            print(HEADER + "Message received from " + str(client_address) +
+                  ": " + RESET + message.decode(errors = "replace"))
+
+        ### end def printMessage() ###
+
+    def printStatistics(self):
+        """
+        Function to print the messages received from each client.
+        """
+        for client_address, receiver in self.receivers.items():
+            print(HEADER + str(client_address) + ": " + RESET +
+                  str(receiver.delivered) + " delivered, " +
+                  str(receiver.duplicates) + " duplicates")
+
+        print(HEADER + "Plain messages: " + RESET + str(self.plain_messages))
+
+        ### end def printStatistics() ###
+
+# ---------------------------------------------------------------------------- #
+# SERVER
+
+if __name__ == '__main__':
+    """
+    This example creates a UDP Server that receives the messages of
+    udp_client.py until Ctrl+C is pressed.
+    """
+    parser = argparse.ArgumentParser(description = __doc__)
+    parser.add_argument("--ip", default = "localhost")
+    parser.add_argument("--port", type = int, default = 2999)
+    parser.add_argument("--quiet", action = "store_true",
+                        help = "do not print every message")
+    args = parser.parse_args()
+
+    server = reliableServer(verbose = not args.quiet)
+    server.server.bind((args.ip, args.port))
+    print(HEADER + "Listening on port (" + str(args.port) + ")")
+
+    try:
+        server.server.serveForever()
+    except KeyboardInterrupt:
+        server.printStatistics()
+
+# end of file #
@@ -0,0 +1,132 @@
+"""
+@file     exercise2_udp_sink.py
+
+@author   Marcos Belda Martinez' <mbelmar@etsinf.upv.es>
+@date     November, 2024
+@section  EOII-GIIROB
+@brief    UDP sinks of the sensors data forwarded by exercise2_sub.py
+          (one port per sensor), built on the shared UDP reception loop.
+"""
+
+# ---------------------------------------------------------------------------- #
+# NEEDED IMPORTS
+
+import os         # Import os for building the path of the shared modules
+import sys        # Import sys for adding the shared modules to the path
+import threading  # Import threading for concurrent execution
+
+# ---------------------------------------------------------------------------- #
+# SHARED MODULES (EOII_2425_common folder)
+
+COMMON_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    os.pardir,
+    "EOII_2425_common")
+
+if COMMON_PATH not in sys.path:
+    sys.path.insert(0, COMMON_PATH)
+
+import udp_server_core  # Reception loop shared by the UDP servers
+
+# ---------------------------------------------------------------------------- #
+# COLOR DEFINES
+
+GREEN  = "\033[92m"  # Define green color for console output
+BOLD   = "\033[1m"   # Define bold text format
+RESET  = "\033[0m"   # Define reset format for console output
+HEADER = BOLD + GREEN + "(UDP SINK) " + RESET + GREEN  # Header format
+
+# ---------------------------------------------------------------------------- #
+# PARAMETERS FOR UDP CONNECTION (same as exercise2_sub.py)
+
+SERVER_IP_ADDRESS = "localhost"  # IP address of the UDP sinks
+PORTS = {  # Define ports for each sensor
+    "sensor0": 3000,
+    "sensor1": 3001,
+    "sensor2": 3002
+}
+
+# ---------------------------------------------------------------------------- #
+# SINK OBJECT CLASS
+
+class Sink(threading.Thread):
+
+    def __init__(self, name):
+        """
+        Initialize the Sink object with a name and bind its UDP socket.
+        """
+        super().__init__(daemon = True)  # Call the parent class constructor
+        self.name = name  # Store the sensor's name
+
+        # Number of readings received
+        self.readings = 0
+
+        # Create the UDP socket and its reception loop
+        self.server = udp_server_core.udpServerLoop(self.on_datagram)
+        self.server.bind((SERVER_IP_ADDRESS, PORTS[self.name]))
+        print(HEADER + self.name + RESET +
+              " - Listening on port (" + str(PORTS[self.name]) + ")")
+
+        ### end def __init__() ###
+
+    def on_datagram(self, data, client_address):
+        """
+        Callback for each datagram received (nothing is answered).
+        """
+        self.readings += 1
+        print(HEADER + self.name + RESET + " - Reading received via UDP: " +
+              data.decode(errors = "replace"))
+
+        return None
+
+        ### end def on_datagram() ###
+
+    def run(self):
+        """
+        The main loop for the sink thread (sleeps while there is no data).
+        """
+        self.server.serveForever()
+
+        ### end def run() ###
+
+    def stop(self):
+        """
+        Stop the sink and close its socket.
+        """
+        self.server.stop()
+
+        ### end def stop() ###
+
+# ---------------------------------------------------------------------------- #
+# MAIN FUNCTION
+
+if __name__ == '__main__':
+    """
+    Main entry point for the program. Receives the readings that
+    exercise2_sub.py forwards via UDP until Ctrl+C is pressed.
+    """
+
+    # CREATING SINK THREADS
+
+    sinks = [Sink(name) for name in PORTS]
+
+    # STARTING SINK THREADS
+
+    for sink in sinks:
+        sink.start()  # Start each sink thread
+
+    # WAIT UNTIL CTRL+C
+
+    try:
+        for sink in sinks:
+            sink.join()  # Wait for each sink to finish
+    except KeyboardInterrupt:
+        for sink in sinks:
+            sink.stop()
+
+        for sink in sinks:
+            sink.join()
+            print(HEADER + sink.name + RESET + " - " +
+                  str(sink.readings) + " readings received")
+
+# end of file #
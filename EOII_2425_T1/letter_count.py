@@ -0,0 +1,81 @@
+"""
+@file     letter_count.py
+
+@author   Marcos Belda Martinez' <mbelmar@etsinf.upv.es>
+@date     October, 2024
+@section  EOII-GIIROB
+@brief    Letters, vowels and consonants counting functions
+          for using with UDP Server Class.
+"""
+
+# ---------------------------------------------------------------------------- #
+# NEEDED IMPORTS
+
+import string
+
+# ---------------------------------------------------------------------------- #
+# LOOKUP TABLES
+
+VOWELS = "aeiouAEIOU"  # Characters counted as vowels
+
+# Byte values deleted by bytes.translate() to keep only letters or vowels
+NON_LETTERS = bytes(
+    value for value in range(256)
+    if chr(value) not in string.ascii_letters)
+
+NON_VOWELS = bytes(
+    value for value in range(256)
+    if chr(value) not in VOWELS)
+
+# ---------------------------------------------------------------------------- #
+# FUNCTIONS
+
+def countLetters(raw_data):
+    """
+    Function to count letters, vowels and consonants of a message (bytes).
+    ASCII messages are counted over the raw bytes with bytes.translate(),
+    so no Python code runs per character. Other messages are decoded and
+    counted with str.isalpha() (accented letters count as consonants,
+    as in countLettersLoop()).
+    Returns a (letters, vowels, consonants) tuple.
+    """
+    if raw_data.isascii():
+        # Delete every byte that is not a letter (or a vowel) and measure
+        num_letters = len(raw_data.translate(None, NON_LETTERS))
+        num_vowels  = len(raw_data.translate(None, NON_VOWELS))
+
+    else:
+        text = raw_data.decode(errors = "replace")
+        num_letters = sum(map(str.isalpha, text))
+        num_vowels  = sum(map(text.count, VOWELS))
+
+    return (num_letters, num_vowels, num_letters - num_vowels)
+
+    ### end def countLetters() ###
+
+def countLettersLoop(text):
+    """
+    Function to count letters, vowels and consonants of a message (str)
+    walking each character (reference implementation).
+    Returns a (letters, vowels, consonants) tuple.
+    """
+    # Initialize counters
+    num_letters    = 0
+    num_vowels     = 0
+    num_consonants = 0
+
+    # Iterate through each character in the text
+    for char in text:
+        if char.isalpha():  # Check if it is a letter
+            num_letters += 1
+
+            if char in VOWELS:  # Check if it is a vowel
+                num_vowels += 1
+            else:  # If not, then it is a consonant
+                num_consonants += 1
+
+    return (num_letters, num_vowels, num_consonants)
+
+    ### end def countLettersLoop() ###
+
+# end of file #
@@ -0,0 +1,60 @@
+"""
+@file     letter_count_benchmark.py
+
+@author   Marcos Belda Martinez' <mbelmar@etsinf.upv.es>
+@date     October, 2024
+@section  EOII-GIIROB
+@brief    Microbenchmark comparing the letters, vowels and consonants
+          counting functions with 4 KB and 64 KB messages.
+"""
+
+# ---------------------------------------------------------------------------- #
+# NEEDED IMPORTS
+
+import timeit
+from   letter_count import countLetters, countLettersLoop
+
+# ---------------------------------------------------------------------------- #
+# BENCHMARK PARAMETERS
+
+MESSAGE_SIZES = (4 * 1024, 64 * 1024)  # Message sizes in bytes
+REPETITIONS   = 5                      # Timing repetitions (best is kept)
+SAMPLE_TEXT   = "The quick brown fox jumps over the lazy dog 0123456789. "
+
+# ---------------------------------------------------------------------------- #
+# FUNCTIONS
+
+def bestTime(function, argument, number):
+    """
+    Function to get the best time (in microseconds) of a single call.
+    """
+    timer = timeit.Timer(lambda: function(argument))
+    return min(timer.repeat(REPETITIONS, number)) / number * 1e6
+
+    ### end def bestTime() ###
+
+# ---------------------------------------------------------------------------- #
+# BENCHMARK
+
+if __name__ == '__main__':
+    """
+    Time both counting functions with messages of each size and check
+    that they give the same result.
+    """
+    print("size (bytes)   loop (us)   countLetters (us)   speedup")
+
+    for size in MESSAGE_SIZES:
+        text = (SAMPLE_TEXT * (size // len(SAMPLE_TEXT) + 1))[:size]
+        raw_data = text.encode()
+
+        # Both implementations must agree
+        assert countLetters(raw_data) == countLettersLoop(text)
+
+        number = max(1, 4096 * 100 // size)
+        loop_time = bestTime(countLettersLoop, text, number)
+        fast_time = bestTime(countLetters, raw_data, number)
+
+        print(f"{size:>12}   {loop_time:>9.1f}   {fast_time:>17.1f}"
+              f"   {loop_time / fast_time:>6.1f}x")
+
+# end of file #
@@ -0,0 +1,241 @@
+"""
+@file     message_sinks.py
+
+@author   Marcos Belda Martinez' <mbelmar@etsinf.upv.es>
+@date     October, 2024
+@section  EOII-GIIROB
+@brief    Destinations (sinks) of the client messages processed by the
+          UDP Server Class: window queue, stdout, file, rotating log or null.
+"""
+
+# ---------------------------------------------------------------------------- #
+# NEEDED IMPORTS
+
+import logging
+from   logging.handlers import RotatingFileHandler
+import queue
+import sys
+
+# ---------------------------------------------------------------------------- #
+# CREATING QUEUE SINK CLASS
+
+class queueSink:
+
+    # The messages are used, so the server has to build them
+    discards_messages = False
+
+    def __init__(self, max_size, message_queue = None):
+        """
+        Function to initialize Queue Sink Class variables.
+        Messages are kept in a bounded queue until a front-end (e.g. the UDP
+        Server Window) gets them. message_queue replaces the default
+        queue.Queue (e.g. with a multiprocessing queue).
+        """
+        if message_queue is None:
+            message_queue = queue.Queue(maxsize = max_size)
+
+        self.messages = message_queue
+        self.dropped_messages = 0
+
+        ### end def __init__() ###
+
+    def write(self, message):
+        """
+        Function to queue a message. If the queue is full the message
+        is dropped and counted in dropped_messages.
+        """
+        try:
+            self.messages.put_nowait(message)
+        except queue.Full:
+            # The front-end can not keep up, do not stall the reception
+            self.dropped_messages += 1
+
+        ### end def write() ###
+
+    def getMessages(self, max_messages):
+        """
+        Function to get (without blocking) up to max_messages messages.
+        """
+        messages = []
+
+        try:
+            while len(messages) < max_messages:
+                messages.append(self.messages.get_nowait())
+        except queue.Empty:
+            pass
+
+        return messages
+
+        ### end def getMessages() ###
+
+    @property
+    def pending_messages(self):
+        """
+        Messages waiting in the queue (approximate).
+        """
+        try:
+            return self.messages.qsize()
+        except NotImplementedError:
+            # multiprocessing queues on macOS
+            return 0
+
+        ### end def pending_messages() ###
+
+    def close(self):
+        """
+        Nothing to close.
+        """
+        pass
+
+        ### end def close() ###
+
+# ---------------------------------------------------------------------------- #
+# CREATING STREAM SINK CLASS
+
+class streamSink:
+
+    # The messages are used, so the server has to build them
+    discards_messages = False
+
+    # Messages are written at once, nothing waits
+    pending_messages = 0
+
+    def __init__(self, stream = None):
+        """
+        Function to initialize Stream Sink Class variables.
+        Messages are written, one per line, to stream (stdout by default).
+        """
+        if stream is None:
+            stream = sys.stdout
+
+        self.stream = stream
+        self.dropped_messages = 0
+
+        ### end def __init__() ###
+
+    def write(self, message):
+        """
+        Function to write a message (buffered by the stream).
+        """
+        self.stream.write(message + "\n")
+
+        ### end def write() ###
+
+    def close(self):
+        """
+        Function to flush the stream (it is not closed, e.g. stdout).
+        """
+        self.stream.flush()
+
+        ### end def close() ###
+
+# ---------------------------------------------------------------------------- #
+# CREATING FILE SINK CLASS
+
+class fileSink(streamSink):
+
+    def __init__(self, file_path):
+        """
+        Function to initialize File Sink Class variables.
+        Messages are appended, one per line, to the file.
+        """
+        super().__init__(open(file_path, "a", encoding = "utf-8"))
+
+        ### end def __init__() ###
+
+    def close(self):
+        """
+        Function to close the file.
+        """
+        self.stream.close()
+
+        ### end def close() ###
+
+# ---------------------------------------------------------------------------- #
+# CREATING ROTATING FILE SINK CLASS
+
+class rotatingFileSink:
+
+    # The messages are used, so the server has to build them
+    discards_messages = False
+
+    # Messages are written at once, nothing waits
+    pending_messages = 0
+
+    def __init__(self, file_path, max_bytes, backup_count):
+        """
+        Function to initialize Rotating File Sink Class variables.
+        When the file reaches max_bytes it is renamed (file_path.1, ...) and
+        a new one is started, keeping at most backup_count old files.
+        """
+        self.handler = RotatingFileHandler(
+            file_path,
+            maxBytes    = max_bytes,
+            backupCount = backup_count,
+            encoding    = "utf-8")
+
+        self.handler.setFormatter(logging.Formatter("%(message)s"))
+
+        # Own logger, not propagated to the root logger
+        self.logger = logging.getLogger("udp_server.sink." + file_path)
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        self.logger.addHandler(self.handler)
+
+        self.dropped_messages = 0
+
+        ### end def __init__() ###
+
+    def write(self, message):
+        """
+        Function to write a message to the log.
+        """
+        self.logger.info(message)
+
+        ### end def write() ###
+
+    def close(self):
+        """
+        Function to close the log file.
+        """
+        self.logger.removeHandler(self.handler)
+        self.handler.close()
+
+        ### end def close() ###
+
+# ---------------------------------------------------------------------------- #
+# CREATING NULL SINK CLASS
+
+class nullSink:
+
+    # Messages are discarded, so the server does not need to build them
+    discards_messages = True
+
+    # Messages are discarded at once, nothing waits
+    pending_messages = 0
+
+    def __init__(self):
+        """
+        Function to initialize Null Sink Class variables.
+        """
+        self.dropped_messages = 0
+
+        ### end def __init__() ###
+
+    def write(self, message):
+        """
+        Function to discard a message.
+        """
+        pass
+
+        ### end def write() ###
+
+    def close(self):
+        """
+        Nothing to close.
+        """
+        pass
+
+        ### end def close() ###
+
+# end of file #
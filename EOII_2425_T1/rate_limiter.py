@@ -0,0 +1,95 @@
+"""
+@file     rate_limiter.py
+
+@author   Marcos Belda Martinez' <mbelmar@etsinf.upv.es>
+@date     October, 2024
+@section  EOII-GIIROB
+@brief    Per-client rate limiting (token buckets) for the UDP Server Class,
+          so a noisy client can not starve the rest of them.
+"""
+
+# ---------------------------------------------------------------------------- #
+# NEEDED IMPORTS
+
+from   collections import OrderedDict
+from   time import monotonic
+
+# ---------------------------------------------------------------------------- #
+# RATE LIMITER PARAMETERS
+
+MAX_CLIENTS = 10000  # Max client buckets kept (least recently used evicted)
+
+# Fields of each bucket (a list, updated in place)
+TOKENS      = 0
+LAST_REFILL = 1
+
+# ---------------------------------------------------------------------------- #
+# CREATING RATE LIMITER CLASS
+
+class rateLimiter:
+
+    def __init__(self, rate, burst = None, max_clients = MAX_CLIENTS):
+        """
+        Function to initialize Rate Limiter Class variables.
+        Each client address gets a bucket of burst tokens (rate by default,
+        at least 1), refilled at rate tokens per second. Every request takes
+        a token and requests without tokens are dropped.
+        Raises ValueError if rate is not positive or burst is less than 1
+        (no request would ever be allowed).
+        """
+        if burst is None:
+            burst = max(rate, 1.0)
+
+        if rate <= 0:
+            raise ValueError("rate must be greater than 0")
+
+        if burst < 1:
+            raise ValueError("burst must be at least 1")
+
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.max_clients = max_clients
+
+        # Buckets by client address, least recently used first
+        self.buckets = OrderedDict()
+
+        # Requests dropped
+        self.dropped_requests = 0
+
+        ### end def __init__() ###
+
+    def allow(self, client_address):
+        """
+        Function to check if a request of client_address can be processed.
+        Returns False (and counts the drop) if its bucket is empty.
+        """
+        now = monotonic()
+        bucket = self.buckets.get(client_address)
+
+        if bucket is None:
+            # New client, starts with a full bucket
+            if len(self.buckets) >= self.max_clients:
+                self.buckets.popitem(last = False)
+
+            bucket = [self.burst, now]
+            self.buckets[client_address] = bucket
+
+        else:
+            self.buckets.move_to_end(client_address)
+
+            # Refill with the tokens earned since the last request
+            tokens = bucket[TOKENS] + (now - bucket[LAST_REFILL]) * self.rate
+            bucket[TOKENS] = min(self.burst, tokens)
+            bucket[LAST_REFILL] = now
+
+        if bucket[TOKENS] >= 1.0:
+            bucket[TOKENS] -= 1.0
+            return True
+
+        self.dropped_requests += 1
+
+        return False
+
+        ### end def allow() ###
+
+# end of file #
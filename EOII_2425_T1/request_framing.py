@@ -0,0 +1,52 @@
+"""
+@file     request_framing.py
+
+@author   Marcos Belda Martinez' <mbelmar@etsinf.upv.es>
+@date     October, 2024
+@section  EOII-GIIROB
+@brief    Optional request ID framing shared by the UDP Server and Client
+          Classes, used to match pipelined requests with their replies.
+"""
+
+# ---------------------------------------------------------------------------- #
+# NEEDED IMPORTS
+
+import struct
+
+# ---------------------------------------------------------------------------- #
+# FRAME FORMAT
+
+# Header: marker byte + request ID (unsigned 32 bits, network byte order).
+# The marker (SOH control character) never starts a message typed by a user,
+# so messages without header are still answered as before.
+FRAME_MARKER = 0x01
+FRAME_HEADER = struct.Struct("!BI")
+
+MAX_REQUEST_ID = 0xFFFFFFFF  # Request IDs wrap around after this value
+
+# ---------------------------------------------------------------------------- #
+# FUNCTIONS
+
+def packFrame(request_id, payload):
+    """
+    Function to add the request ID header to a payload (bytes).
+    """
+    return FRAME_HEADER.pack(FRAME_MARKER, request_id) + payload
+
+    ### end def packFrame() ###
+
+def unpackFrame(datagram):
+    """
+    Function to split a datagram (bytes) into request ID and payload.
+    Returns (None, datagram) if the datagram has no request ID header.
+    """
+    if ((len(datagram) >= FRAME_HEADER.size) and
+        (datagram[0] == FRAME_MARKER)):
+        marker, request_id = FRAME_HEADER.unpack_from(datagram)
+        return (request_id, datagram[FRAME_HEADER.size:])
+
+    return (None, datagram)
+
+    ### end def unpackFrame() ###
+
+# end of file #
@@ -0,0 +1,64 @@
+"""
+@file     scrollback_text.py
+
+@author   Marcos Belda Martinez' <mbelmar@etsinf.upv.es>
+@date     October, 2024
+@section  EOII-GIIROB
+@brief    Text box with a bounded scrollback
+          for using with tkinter UDP Server and Client Windows.
+"""
+
+# ---------------------------------------------------------------------------- #
+# NEEDED IMPORTS
+
+import tkinter as tk
+
+# ---------------------------------------------------------------------------- #
+# SCROLLBACK PARAMETERS
+
+MAX_SCROLLBACK_LINES = 1000  # Default number of lines kept on the text box
+TRIM_CHUNK_LINES     = 100   # Extra lines allowed before trimming in bulk
+
+# ---------------------------------------------------------------------------- #
+# CREATING SCROLLBACK TEXT CLASS
+
+class scrollbackText(tk.Text):
+
+    def __init__(self, master, max_lines = MAX_SCROLLBACK_LINES, **kwargs):
+        """
+        Function to initialize Scrollback Text Class variables.
+        The super() method is used to call the constructor of the parent class.
+        """
+        super().__init__(master, **kwargs) # Also: tk.Text.__init__(self, ...)
+
+        # Max number of lines kept (oldest ones are discarded)
+        self.max_lines = max_lines
+
+        # Number of lines currently inserted in the text box
+        self.line_count = 0
+
+        ### end def __init__() ###
+
+    def appendText(self, text):
+        """
+        Function to append text (one or more lines) at the end of the text
+        box. When the text box exceeds max_lines by TRIM_CHUNK_LINES, the
+        oldest lines are deleted in a single operation, so the cost of each
+        insertion does not grow with the uptime.
+        """
+        self.line_count += text.count("\n") + 1
+
+        self.insert(tk.END, text + "\n")
+
+        # Trim the oldest lines in bulk ----------------------------------------
+        if self.line_count > self.max_lines + TRIM_CHUNK_LINES:
+            excess = self.line_count - self.max_lines
+            self.delete("1.0", str(excess + 1) + ".0")
+            self.line_count -= excess
+
+        # Adjust scrollbar position to always show the last text
+        self.yview_moveto(1.0)
+
+        ### end def appendText() ###
+
+# end of file #
@@ -0,0 +1,141 @@
+"""
+@file     server_statistics.py
+
+@author   Marcos Belda Martinez' <mbelmar@etsinf.upv.es>
+@date     October, 2024
+@section  EOII-GIIROB
+@brief    Statistics of the UDP Server Class (per-command counts and handler
+          time histogram) and the helpers used to show them on the
+          UDP Server Window.
+"""
+
+# ---------------------------------------------------------------------------- #
+# NEEDED IMPORTS
+
+from   time import monotonic
+
+# ---------------------------------------------------------------------------- #
+# STATISTICS PARAMETERS
+
+# Bucket i of the handler time histogram counts the requests handled in less
+# than 2**i microseconds (the last bucket counts all the slower ones)
+HISTOGRAM_BUCKETS = 16
+
+# ---------------------------------------------------------------------------- #
+# CREATING SERVER STATISTICS CLASS
+
+class serverStatistics:
+
+    def __init__(self):
+        """
+        Function to initialize Server Statistics Class variables.
+        Only the server thread writes the counters and other threads just
+        read them, so no lock is needed (a read can be one request old).
+        """
+        # Requests of each command (normalized command -> count)
+        self.command_counts = {}
+
+        # Handler time histogram (see HISTOGRAM_BUCKETS)
+        self.handler_times = [0] * HISTOGRAM_BUCKETS
+
+        ### end def __init__() ###
+
+    def recordRequest(self, command, elapsed_ns):
+        """
+        Function to count a request of command, handled in elapsed_ns
+        nanoseconds.
+        """
+        command_counts = self.command_counts
+        command_counts[command] = command_counts.get(command, 0) + 1
+
+        bucket = (elapsed_ns // 1000).bit_length()
+        self.handler_times[min(bucket, HISTOGRAM_BUCKETS - 1)] += 1
+
+        ### end def recordRequest() ###
+
+    def getCommandCounts(self):
+        """
+        Function to get a copy of the per-command counts. The copy is made
+        by the interpreter in a single step, so it is consistent even if
+        the server thread adds a command meanwhile.
+        """
+        return dict(self.command_counts)
+
+        ### end def getCommandCounts() ###
+
+    def getHandlerTimes(self):
+        """
+        Function to get a copy of the handler time histogram.
+        """
+        return list(self.handler_times)
+
+        ### end def getHandlerTimes() ###
+
+# ---------------------------------------------------------------------------- #
+# CREATING RATE METER CLASS
+
+class rateMeter:
+
+    def __init__(self):
+        """
+        Function to initialize Rate Meter Class variables.
+        """
+        self.last_total = None
+        self.last_time = None
+
+        ### end def __init__() ###
+
+    def update(self, total):
+        """
+        Function to get the rate (per second) of a growing total since
+        the previous call (0 on the first call).
+        """
+        now = monotonic()
+        rate = 0.0
+
+        if self.last_time is not None and now > self.last_time:
+            rate = (total - self.last_total) / (now - self.last_time)
+
+        self.last_total = total
+        self.last_time = now
+
+        return rate
+
+        ### end def update() ###
+
+# ---------------------------------------------------------------------------- #
+# FUNCTIONS
+
+def histogramPercentile(histogram, fraction):
+    """
+    Function to get the upper bound (in microseconds) of the histogram
+    bucket holding a percentile (fraction between 0 and 1).
+    Returns None if the histogram is empty.
+    """
+    total = sum(histogram)
+
+    if total == 0:
+        return None
+
+    threshold = fraction * total
+    accumulated = 0
+
+    for bucket, count in enumerate(histogram):
+        accumulated += count
+
+        if accumulated >= threshold:
+            break
+
+    return 1 << bucket
+
+    ### end def histogramPercentile() ###
+
+def mergeHistograms(histograms):
+    """
+    Function to add up several histograms (e.g. one per worker).
+    """
+    return [sum(counts) for counts in zip(*histograms)]
+
+    ### end def mergeHistograms() ###
+
+# end of file #
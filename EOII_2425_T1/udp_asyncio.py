@@ -0,0 +1,302 @@
+"""
+@file     udp_asyncio.py
+
+@author   Marcos Belda Martinez' <mbelmar@etsinf.upv.es>
+@date     October, 2024
+@section  EOII-GIIROB
+@brief    asyncio implementation of the UDP Server and Client (same commands),
+          so one process can host many server ports and client sessions
+          on a single event loop, without a thread per socket.
+"""
+
+# ---------------------------------------------------------------------------- #
+# NEEDED IMPORTS
+
+import argparse
+import asyncio
+import itertools
+from   request_framing import MAX_REQUEST_ID, packFrame, unpackFrame
+import udp_client_class as udp_c
+import udp_server_class as udp_s
+# (EOII_2425_common, already added to sys.path by udp_server_class)
+from   udp_fragmentation import (FRAGMENT_SIZE, fragmentMessage, isFragment,
+                                 reassemblyBuffer)
+
+# ---------------------------------------------------------------------------- #
+# CREATING UDP SERVER PROTOCOL CLASS
+
+class udpServerProtocol(udp_s.udpServerCore, asyncio.DatagramProtocol):
+
+    def __init__(self, sink = None, ui_queue_size = udp_s.UI_QUEUE_SIZE):
+        """
+        Function to initialize UDP Server Protocol Class variables.
+        Commands, caches and sinks are the ones of udpServerCore.
+        """
+        udp_s.udpServerCore.__init__(self, sink, ui_queue_size)
+
+        self.transport = None
+
+        # Set when the transport is closed
+        self.closed = asyncio.get_running_loop().create_future()
+
+        ### end def __init__() ###
+
+    def connection_made(self, transport):
+        """
+        Called by the event loop when the socket is bound.
+        """
+        self.transport = transport
+        self.server_on = True
+
+        ### end def connection_made() ###
+
+    def datagram_received(self, data, client_address):
+        """
+        Called by the event loop for each datagram from a client.
+        """
+        self.datagrams_received += 1
+        self.bytes_received += len(data)
+
+        reply = self.handleDatagram(data, client_address)
+
+        if reply is not None:
+            for datagram in self.fragmentReply(reply):
+                self.transport.sendto(datagram, client_address)
+
+        # A client has sent "end"
+        if self.server_on == False:
+            self.transport.close()
+
+        ### end def datagram_received() ###
+
+    def error_received(self, error):
+        """
+        ICMP errors caused by a previous reply are ignored.
+        """
+        pass
+
+        ### end def error_received() ###
+
+    def connection_lost(self, error):
+        """
+        Called by the event loop when the transport is closed.
+        """
+        self.server_on = False
+
+        if self.closed.done() == False:
+            self.closed.set_result(None)
+
+        ### end def connection_lost() ###
+
+    def close(self):
+        """
+        Function to close the server.
+        """
+        self.transport.close()
+
+        ### end def close() ###
+
+# ---------------------------------------------------------------------------- #
+# CREATING UDP CLIENT PROTOCOL CLASS
+
+class udpClientProtocol(asyncio.DatagramProtocol):
+
+    def __init__(self):
+        """
+        Function to initialize UDP Client Protocol Class variables.
+        Every request is sent with a request ID, so any number of them
+        can be awaited at the same time.
+        """
+        self.transport = None
+        self.request_ids = itertools.count(1)
+
+        # Outstanding requests (request ID -> future of the raw reply)
+        self.in_flight = {}
+
+        # Large messages, split into fragments (see udp_fragmentation.py)
+        self.reassembly = reassemblyBuffer()
+        self.message_ids = itertools.count()
+
+        ### end def __init__() ###
+
+    def connection_made(self, transport):
+        """
+        Called by the event loop when the socket is ready.
+        """
+        self.transport = transport
+
+        ### end def connection_made() ###
+
+    def datagram_received(self, data, server_address):
+        """
+        Called by the event loop for each reply from the server.
+        """
+        # Fragments are kept until the whole reply has arrived
+        if isFragment(data):
+            data = self.reassembly.addFragment(data, server_address)
+
+            if data is None:
+                return
+
+        request_id, payload = unpackFrame(data)
+        reply = self.in_flight.pop(request_id, None)
+
+        # Late replies of expired requests are ignored
+        if (reply is not None) and (reply.done() == False):
+            reply.set_result(payload)
+
+        ### end def datagram_received() ###
+
+    def error_received(self, error):
+        """
+        Called by the event loop on ICMP errors (e.g. port unreachable).
+        """
+        for reply in self.in_flight.values():
+            if reply.done() == False:
+                reply.set_exception(error)
+
+        self.in_flight.clear()
+
+        ### end def error_received() ###
+
+    async def request(self, message, timeout = udp_c.REQUEST_TIMEOUT):
+        """
+        Function to send a message and wait for its (decoded) reply.
+        Raises asyncio.TimeoutError if the server does not respond
+        within timeout seconds. "end" does not wait for any reply.
+        """
+        if message.lower() == "end":
+            self.sendData(packFrame(0, message.encode()))
+            return None
+
+        request_id = next(self.request_ids) & MAX_REQUEST_ID
+        reply = asyncio.get_running_loop().create_future()
+        self.in_flight[request_id] = reply
+
+        self.sendData(packFrame(request_id, message.encode()))
+
+        try:
+            raw_data = await asyncio.wait_for(reply, timeout)
+        finally:
+            self.in_flight.pop(request_id, None)
+
+        return udp_c.decodeReply(message, raw_data)
+
+        ### end def request() ###
+
+    def sendData(self, data):
+        """
+        Function to send data (bytes) to the server, split into fragments
+        if it does not fit in a datagram.
+        """
+        for datagram in fragmentMessage(next(self.message_ids), data,
+                                        FRAGMENT_SIZE):
+            self.transport.sendto(datagram)
+
+        ### end def sendData() ###
+
+    def close(self):
+        """
+        Function to close the client.
+        """
+        self.transport.close()
+
+        ### end def close() ###
+
+# ---------------------------------------------------------------------------- #
+# FUNCTIONS
+
+async def startServer(server_port, server_IP_address = "localhost",
+                      sink = None):
+    """
+    Function to start a UDP Server on the running event loop.
+    Returns its udpServerProtocol.
+    """
+    loop = asyncio.get_running_loop()
+
+    transport, protocol = await loop.create_datagram_endpoint(
+        lambda: udpServerProtocol(sink),
+        local_addr = (server_IP_address, server_port))
+
+    return protocol
+
+    ### end def startServer() ###
+
+async def openClient(server_IP_address, server_port):
+    """
+    Function to open a UDP Client session on the running event loop.
+    Returns its udpClientProtocol.
+    """
+    loop = asyncio.get_running_loop()
+
+    transport, protocol = await loop.create_datagram_endpoint(
+        udpClientProtocol,
+        remote_addr = (server_IP_address, server_port))
+
+    return protocol
+
+    ### end def openClient() ###
+
+async def runSession(client, messages):
+    """
+    Function to send the messages of a client session (all at once)
+    and print their replies.
+    """
+    replies = await asyncio.gather(
+        *(client.request(message) for message in messages),
+        return_exceptions = True)
+
+    for message, reply in zip(messages, replies):
+        if isinstance(reply, asyncio.TimeoutError):
+            reply = "The server has not responded in 5 seconds"
+
+        print(message + " -> " + str(reply))
+
+    ### end def runSession() ###
+
+async def main(args):
+    """
+    Function to start the servers and the client sessions on one event loop.
+    """
+    ports = range(args.port, args.port + args.servers)
+    servers = [await startServer(port) for port in ports]
+
+    # Each session talks to one of the servers
+    clients = [await openClient("localhost", ports[index % len(ports)])
+               for index in range(args.sessions)]
+
+    messages = ["time",
+                "request serialized message",
+                "request binary serialized message",
+                "request json serialized message",
+                "hello"]
+
+    await asyncio.gather(*(runSession(client, messages) for client in clients))
+
+    for client in clients:
+        client.close()
+
+    for server in servers:
+        server.close()
+        await server.closed
+
+    ### end def main() ###
+
+# ---------------------------------------------------------------------------- #
+# EXAMPLE
+
+if __name__ == '__main__':
+    """
+    This example hosts several UDP Servers (consecutive ports) and client
+    sessions in a single thread, and prints the replies of each session.
+    """
+    parser = argparse.ArgumentParser(description = __doc__)
+    parser.add_argument("--port", type = int, default = 12000,
+                        help = "port of the first server")
+    parser.add_argument("--servers", type = int, default = 4)
+    parser.add_argument("--sessions", type = int, default = 8)
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
+
+# end of file #
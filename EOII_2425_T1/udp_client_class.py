@@ -11,13 +11,83 @@
 # ---------------------------------------------------------------------------- #
 # NEEDED IMPORTS
 
+from   collections import OrderedDict
+import itertools
 import json
+import os
 import pickle
+import queue
+from   request_framing import MAX_REQUEST_ID, packFrame, unpackFrame
+import select
 import socket
 from   styles  import BUTTON_BG_COLOR
+import sys
 import threading
-from   time    import sleep
-import tkinter as tk
+from   time    import monotonic
+
+# ---------------------------------------------------------------------------- #
+# SHARED MODULES (EOII_2425_common folder)
+
+COMMON_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    os.pardir,
+    "EOII_2425_common")
+
+if COMMON_PATH not in sys.path:
+    sys.path.insert(0, COMMON_PATH)
+
+import binary_codec
+from   udp_fragmentation import (FRAGMENT_SIZE, fragmentMessage, isFragment,
+                                 reassemblyBuffer)
+
+# ---------------------------------------------------------------------------- #
+# REQUEST PARAMETERS
+
+BUFFER_SIZE     = 4096  # Max data buffer size of a datagram
+REQUEST_TIMEOUT = 5     # Seconds to wait for the reply of a request
+
+# ---------------------------------------------------------------------------- #
+# FUNCTIONS
+
+def decodeReply(message, raw_data):
+    """
+    Function to deserialize the reply (raw_data) to a message.
+    """
+    # Case 1: waiting for a (pickle) type message ------------------------------
+
+    if message.lower() == "request serialized message":
+        # Deserialize the data using (pickle.loads)
+        data = str(pickle.loads(raw_data))
+
+    # Case 2: waiting for a (binary) type message ------------------------------
+
+    elif message.lower() == binary_codec.BINARY_COMMAND:
+        # Deserialize the data using (binary_codec.decode)
+        data = str(binary_codec.decode(raw_data))
+
+    # Case 3: waiting for a (json) type message --------------------------------
+
+    elif message.lower() == "request json serialized message":
+        # Deserialize the data using (json.loads)
+        jsonData = json.loads(raw_data)
+
+        # Obtener la temperatura y la hora del mensaje
+        temperature = str(jsonData["temperature"])
+        timestamp = str(jsonData["timestamp"])
+
+        # Imprimir los datos recibidos
+        data = ("{Temperature: " + temperature +
+                "°C, Time: " + timestamp + "}")
+
+    # Case 4: waiting for a (normal) type message ------------------------------
+
+    else:
+        # Deserialize the data using (decode)
+        data = raw_data.decode()
+
+    return data
+
+    ### end def decodeReply() ###
 
 # ---------------------------------------------------------------------------- #
 # CREATING UDP CLIENT CLASS
@@ -33,11 +103,9 @@ class udpClient(threading.Thread):
             
         # Control parameters
         self.client_on = True
-        self.message2send = False
-        self.message2recv = False
 
-        # Variable to store the message
-        self.clientMessage = ""
+        # Messages waiting to be sent (None is the shutdown sentinel)
+        self.outbound_messages = queue.Queue()
 
         # UDP Client Window elements needed in the class
         self.message_button = message_button
@@ -52,7 +120,31 @@ class udpClient(threading.Thread):
         self.udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
 
         # Set a timeout of 5 seconds
-        self.udp_socket.settimeout(5)
+        self.udp_socket.settimeout(REQUEST_TIMEOUT)
+
+        # Large messages, split into fragments (see udp_fragmentation.py)
+        self.reassembly = reassemblyBuffer()
+        self.fragment_size = FRAGMENT_SIZE
+        self.message_ids = itertools.count()
+
+        # Pipelined mode (see setPipelineWindow()) -----------------------------
+
+        # Max outstanding requests (1 = stop-and-wait, no request IDs)
+        self.pipeline_window = 1
+
+        # Outstanding requests (request ID -> (message, deadline)), in the
+        # order they were sent, so the oldest deadline is always the first
+        self.in_flight = OrderedDict()
+        self.in_flight_lock = threading.Lock()
+        self.window_slots = None
+        self.request_ids = itertools.count(1)
+
+        # Thread that receives the pipelined replies
+        self.reply_receiver = threading.Thread(target = self.receiveReplies)
+
+        # Socket pair used to wake up a thread waiting for replies
+        self.wakeup_recv, self.wakeup_send = socket.socketpair()
+        self.wakeup_recv.setblocking(False)
         
         ### end def __init__() ###
     
@@ -65,40 +157,61 @@ class udpClient(threading.Thread):
         self.server_port = new_port
             
         ### end def setServerAddress() ###
+
+    def setFragmentSize(self, new_size):
+        """
+        Function to set the max size of the datagrams sent. Bigger messages
+        are split into fragments (see udp_fragmentation.py).
+        """
+        self.fragment_size = new_size
+
+        ### end def setFragmentSize() ###
+
+    def setPipelineWindow(self, new_window):
+        """
+        Function to set the max number of outstanding requests. With a
+        window bigger than 1 messages are sent with a request ID, without
+        waiting for previous replies, and replies are matched by their ID
+        (they can arrive out of order). Must be called before start().
+        """
+        self.pipeline_window = new_window
+        self.window_slots = threading.BoundedSemaphore(new_window)
+
+        ### end def setPipelineWindow() ###
     
-    def recieveMessage(self):
+    def recieveMessage(self, message):
         """
-        Function to recieve a message from server.
+        Function to recieve the reply to a message from server.
+        Returns None if closeClient() is called while waiting.
         """
-        try:
-            raw_data, server_adress = self.udp_socket.recvfrom(4096)
-            
-            # Case 1: waiting for a (pickle) type message ----------------------
+        deadline = monotonic() + REQUEST_TIMEOUT
+        raw_data = None
 
-            if (self.clientMessage).lower() == "request serialized message":
-                # Deserialize the data using (pickle.loads)
-                data = str(pickle.loads(raw_data))
-            
-            # Case 2: waiting for a (json) type message ------------------------
+        try:
+            # Wait for the reply (every fragment of it), the timeout
+            # or a wake up request
+            while raw_data is None:
+                ready, _, _ = select.select(
+                    [self.udp_socket, self.wakeup_recv], [], [],
+                    max(0.0, deadline - monotonic()))
 
-            elif ((self.clientMessage).lower() == 
-                  "request json serialized message"):
-                # Deserialize the data using (json.loads)
-                jsonData = json.loads(raw_data)
+                if self.udp_socket in ready:
+                    raw_data, server_adress = self.udp_socket.recvfrom(
+                        BUFFER_SIZE)
 
-                # Obtener la temperatura y la hora del mensaje
-                temperature = str(jsonData["temperature"])
-                timestamp = str(jsonData["timestamp"])
+                    if isFragment(raw_data):
+                        raw_data = self.reassembly.addFragment(
+                            raw_data,
+                            server_adress)
 
-                # Imprimir los datos recibidos
-                data = ("{Temperature: " + temperature +
-                        "°C, Time: " + timestamp + "}")
+                elif self.wakeup_recv in ready:
+                    # The client is being closed
+                    return None
 
-            # Case 3: waiting for a (normal) type message ----------------------
+                else:
+                    raise socket.timeout
 
-            else:
-                # Deserialize the data using (decode)
-                data = raw_data.decode()
+            data = decodeReply(message, raw_data)
 
         except (socket.timeout, ConnectionResetError) as error:
             # If the server does not respond within 5
@@ -114,79 +227,251 @@ class udpClient(threading.Thread):
 
         ### end def recieveMessage() ###
 
+    def sendPipelinedMessage(self, message):
+        """
+        Function to send a message with a request ID as soon as there
+        is room in the window of outstanding requests.
+        """
+        # Wait for a free slot (a reply or a timeout releases it)
+        while self.window_slots.acquire(timeout = 0.1) == False:
+            if self.client_on == False:
+                return
+
+        if message.lower() == "end":
+            # No reply is expected
+            self.window_slots.release()
+            request_id = 0
+        else:
+            request_id = next(self.request_ids) & MAX_REQUEST_ID
+            with self.in_flight_lock:
+                was_empty = not self.in_flight
+                self.in_flight[request_id] = (
+                    message,
+                    monotonic() + REQUEST_TIMEOUT)
+
+            # The reply receiver has no deadline to wait for, wake it up
+            if was_empty == True:
+                self.wakeup_send.send(b"\0")
+
+        # Send message to server with its request ID
+        self.sendData(packFrame(request_id, message.encode()))
+
+        if message.lower() == "end":
+            self.clientWindow.quit()
+            self.client_on = False
+
+        ### end def sendPipelinedMessage() ###
+
+    def sendData(self, data):
+        """
+        Function to send data (bytes) to server, split into fragments
+        if it does not fit in a datagram.
+        """
+        for datagram in fragmentMessage(next(self.message_ids), data,
+                                        self.fragment_size):
+            self.udp_socket.sendto(
+                datagram,
+                (self.server_IP_address, self.server_port))
+
+        ### end def sendData() ###
+
+    def sendAndWait(self, message):
+        """
+        Function to send a message and wait for its reply (stop-and-wait).
+        """
+        # Send message to server
+        self.sendData(message.encode())
+
+        if message.lower() == "end":
+            self.clientWindow.quit()
+            self.client_on = False
+
+        else:
+            # Recieve confirmation answer from server
+            data = self.recieveMessage(message)
+
+            # Check if client has been powered off during the timeout
+            if (data is not None) and (self.client_on == True):
+                self.showServerMessage(data)
+
+                # Restore normal appearance of message button
+                self.message_button.config(
+                    bg = BUTTON_BG_COLOR,
+                    state = "normal",
+                    text = "Send message")
+
+        ### end def sendAndWait() ###
+
+    def expireRequests(self):
+        """
+        Function to remove the outstanding requests whose timeout has expired.
+        Returns the seconds until the next deadline (None if there are no
+        outstanding requests).
+        """
+        expired = []
+        next_timeout = None
+
+        with self.in_flight_lock:
+            now = monotonic()
+
+            while self.in_flight:
+                request_id, (message, deadline) = next(
+                    iter(self.in_flight.items()))
+
+                if deadline > now:
+                    next_timeout = deadline - now
+                    break
+
+                self.in_flight.popitem(last = False)
+                expired.append(request_id)
+
+        for request_id in expired:
+            self.window_slots.release()
+            self.showServerMessage(
+                "[#" + str(request_id) + "] The server has not responded in " +
+                str(REQUEST_TIMEOUT) + " seconds")
+
+        return next_timeout
+
+        ### end def expireRequests() ###
+
+    def receiveReplies(self):
+        """
+        This function runs in the reply receiver thread (pipelined mode).
+        Replies are matched with their request by the request ID.
+        """
+        while self.client_on == True:
+
+            # Wait for a reply, the next deadline or a wake up request
+            timeout = self.expireRequests()
+            ready, _, _ = select.select(
+                [self.udp_socket, self.wakeup_recv], [], [], timeout)
+
+            if self.wakeup_recv in ready:
+                # Consume the wake up requests
+                self.wakeup_recv.recv(64)
+
+            if (self.udp_socket not in ready) or (self.client_on == False):
+                continue
+
+            try:
+                raw_data, server_adress = self.udp_socket.recvfrom(BUFFER_SIZE)
+            except ConnectionError:
+                # ICMP error (e.g. port unreachable) caused by a request,
+                # the request itself expires when its timeout is reached
+                self.showServerMessage("Connection error: The remote"
+                                       " host has closed the connection.")
+                continue
+
+            # Fragments are kept until the whole reply has arrived
+            if isFragment(raw_data):
+                raw_data = self.reassembly.addFragment(raw_data, server_adress)
+
+                if raw_data is None:
+                    continue
+
+            request_id, payload = unpackFrame(raw_data)
+
+            with self.in_flight_lock:
+                request = self.in_flight.pop(request_id, None)
+
+            if request is None:
+                # Late reply of an expired request (or not a framed reply)
+                continue
+
+            self.window_slots.release()
+
+            message, deadline = request
+            self.showServerMessage(
+                "[#" + str(request_id) + "] " +
+                decodeReply(message, payload))
+
+        ### end def receiveReplies() ###
+
+    def showServerMessage(self, data):
+        """
+        Function to show a server message on output_text.
+        """
+        # Check if client has been powered off
+        if self.client_on == True:
+            self.output_text.appendText(data)
+
+        ### end def showServerMessage() ###
+
     def sendMessage(self, message):
         """
         Function to send a message to server.
+        The message is queued and sent by the client thread.
         """
-        self.clientMessage = message
-        self.message2send = True
-
-        if message.lower() != "end":
-            self.message2recv = True
+        self.outbound_messages.put(message)
                 
         ### end def sendMessage() ###
 
     def run(self):
         """
         This functions runs automatically when the thread is started.
+        The thread sleeps in the queue of messages until a message is
+        sent or closeClient() puts the shutdown sentinel.
         """
-        while self.client_on == True:
-            
-            if self.message2send == True:
+        if self.pipeline_window > 1:
+            self.reply_receiver.start()
+
+        try:
+            while self.client_on == True:
+
+                message = self.outbound_messages.get()
+
+                if (message is None) or (self.client_on == False):
+                    # Shutdown sentinel
+                    break
 
                 if ((self.server_IP_address != None) and
                     (self.server_port != None)):
-                    
-                    # Send message to server
-                    self.udp_socket.sendto(
-                        self.clientMessage.encode(),
-                        (self.server_IP_address, self.server_port))
-                    
-                    self.message2send = False
-
-                    if (self.clientMessage).lower() == "end":
-                        self.clientWindow.quit()
-                        self.client_on = False
-
-                    elif self.message2recv == True:
-
-                        # Recieve confirmation answer from server
-                        data = self.recieveMessage()
-
-                        self.message2recv = False
-
-                        # Check if client has been powered
-                        # off during the timeout
-                        if self.client_on == True:
-                            self.output_text.insert(tk.END, data + "\n")
-                            # Adjust scrollbar position to
-                            # always show the last text
-                            self.output_text.yview_moveto(1.0)
-
-                            # Restore normal appearance of message button
-                            self.message_button.config(
-                                bg = BUTTON_BG_COLOR,
-                                state = "normal",
-                                text = "Send message")                       
-                
-            # Necessary wait to free the CPU
-            sleep(0.001)
+
+                    if self.pipeline_window > 1:
+                        self.sendPipelinedMessage(message)
+                    else:
+                        self.sendAndWait(message)
+        finally:
+            # Wait for the reply receiver (pipelined mode)
+            if self.reply_receiver.is_alive() == True:
+                self.wakeup_send.send(b"\0")
+                self.reply_receiver.join()
+
+            self.closeSockets()
 
         ### end def run() ###
 
+    def closeSockets(self):
+        """
+        Function to close every socket of the client.
+        """
+        self.udp_socket.close()
+        self.wakeup_recv.close()
+        self.wakeup_send.close()
+
+        ### end def closeSockets() ###
+
     def closeClient(self):
         """
         Function to close the client socket.
+        The thread is woken up immediately, even if a reply is being expected.
         """
         # Turn off the client
         self.client_on = False
 
-        # Wait if a socket message is being expected
-        while self.message2recv == True:
-            sleep(0.001)
+        if self.ident is None:
+            # The thread has never been started, close sockets here
+            self.closeSockets()
 
-        # Close socket
-        self.udp_socket.close()
+        else:
+            # Wake up the client thread (it closes the sockets on exit)
+            self.outbound_messages.put(None)
+            try:
+                self.wakeup_send.send(b"\0")
+            except OSError:
+                # The thread has already finished and closed the sockets
+                pass
             
         ### end def closeClient() ###
         
@@ -11,11 +11,22 @@
 # NEEDED IMPORTS
 
 import ipaddress
+from   scrollback_text import scrollbackText
 from   styles  import *
 from   tkinter import messagebox
 import tkinter as tk
 import udp_client_class as udp_c
 
+# ---------------------------------------------------------------------------- #
+# SERVER MESSAGES PARAMETERS
+
+MAX_SCROLLBACK_LINES = 5000  # Max server messages kept on output_text
+
+# Max outstanding requests. With 1 the client waits for each reply before
+# sending the next message (stop-and-wait), with more the requests are
+# pipelined and replies are shown with their request ID, e.g.: [#3]
+PIPELINE_WINDOW = 1
+
 # ---------------------------------------------------------------------------- #
 # FUNCTIONS
 
@@ -219,12 +230,14 @@ def sendMessage_clicked(msg_entry):
     message = msg_entry.get()
 
     if checkMessageEntry() == True:
-        message_button.config(
-                bg = "LIGHT GRAY",
-                state = "disabled",
-                text = "Sending...")
-
-        window.update() # Ask for repaint function 
+        # Pipelined mode does not wait for the reply to send again
+        if PIPELINE_WINDOW == 1:
+            message_button.config(
+                    bg = "LIGHT GRAY",
+                    state = "disabled",
+                    text = "Sending...")
+
+            window.update() # Ask for repaint function 
         
         # Send message to server
         client.sendMessage(str(message))
@@ -540,7 +553,7 @@ if __name__ == "__main__":
         bg   = FRAME_BG_COLOR,
         fg   = LABEL_FG_COLOR,
         font = TEXT_BOLD_FONT,
-        text = ' > "Request JSON serialized message"'
+        text = ' > "Request binary serialized message"'
         ).grid(
             column = 0,
             row    = 4,
@@ -551,7 +564,7 @@ if __name__ == "__main__":
         bg   = FRAME_BG_COLOR,
         fg   = LABEL_FG_COLOR,
         font = TEXT_FONT,
-        text = "       Server will send back a JSON document\n"
+        text = "       Same array, in a compact and safe binary format\n"
         ).grid(
             column = 0,
             row    = 5,
@@ -562,7 +575,7 @@ if __name__ == "__main__":
         bg   = FRAME_BG_COLOR,
         fg   = LABEL_FG_COLOR,
         font = TEXT_BOLD_FONT,
-        text = ' > "End"'
+        text = ' > "Request JSON serialized message"'
         ).grid(
             column = 0,
             row    = 6,
@@ -573,10 +586,32 @@ if __name__ == "__main__":
         bg   = FRAME_BG_COLOR,
         fg   = LABEL_FG_COLOR,
         font = TEXT_FONT,
-        text = "       Closes server and client\n"
+        text = "       Server will send back a JSON document\n"
         ).grid(
             column = 0,
             row    = 7,
+            sticky = 'W')
+    
+    tk.Label(
+        commandInfo_frame,
+        bg   = FRAME_BG_COLOR,
+        fg   = LABEL_FG_COLOR,
+        font = TEXT_BOLD_FONT,
+        text = ' > "End"'
+        ).grid(
+            column = 0,
+            row    = 8,
+            sticky = 'W')
+    
+    tk.Label(
+        commandInfo_frame,
+        bg   = FRAME_BG_COLOR,
+        fg   = LABEL_FG_COLOR,
+        font = TEXT_FONT,
+        text = "       Closes server and client\n"
+        ).grid(
+            column = 0,
+            row    = 9,
             sticky = 'w')
 
     #-----------------------------------------------------#
@@ -612,11 +647,12 @@ if __name__ == "__main__":
         pady       = 5,
         sticky     = "EW")
 
-    # Create a text box that accepts multiple lines
-    output_text = tk.Text(
+    # Create a text box that accepts multiple lines (bounded scrollback)
+    output_text = scrollbackText(
         output_frame,
-        height = 10,
-        width  = 65)
+        height    = 10,
+        max_lines = MAX_SCROLLBACK_LINES,
+        width     = 65)
 
     output_text.grid(
         column     = 0,
@@ -639,6 +675,7 @@ if __name__ == "__main__":
     # CREATE UDP CLIENT
 
     client = udp_c.udpClient(message_button, output_text, window)
+    client.setPipelineWindow(PIPELINE_WINDOW)
 
     # ------------------------------------------------------------------------ #
     # START UDP CLIENT
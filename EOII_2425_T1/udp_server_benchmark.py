@@ -0,0 +1,255 @@
+"""
+@file     udp_server_benchmark.py
+
+@author   Marcos Belda Martinez' <mbelmar@etsinf.upv.es>
+@date     October, 2024
+@section  EOII-GIIROB
+@brief    Headless load generator and latency benchmark for the UDP Server
+          Class (no tkinter window is needed).
+"""
+
+# ---------------------------------------------------------------------------- #
+# NEEDED IMPORTS
+
+import argparse
+from   collections import OrderedDict
+from   message_sinks import nullSink
+import multiprocessing
+import random
+from   request_framing import packFrame, unpackFrame
+import select
+import socket
+from   time    import perf_counter
+import udp_server_class as udp_s
+import udp_server_pool  as udp_sp
+
+# ---------------------------------------------------------------------------- #
+# BENCHMARK PARAMETERS
+
+# Messages of each kind of the mix ("text" is built with --payload-size)
+MESSAGES = {
+    "time"   : b"time",
+    "pickle" : b"request serialized message",
+    "binary" : b"request binary serialized message",
+    "json"   : b"request json serialized message"
+}
+
+# Spawn, so client processes do not share anything with the server thread
+CONTEXT = multiprocessing.get_context("spawn")
+
+# ---------------------------------------------------------------------------- #
+# FUNCTIONS
+
+def parseMix(mix, payload_size):
+    """
+    Function to get the messages and weights of a mix like "time:2,text:1".
+    """
+    messages = []
+    weights = []
+
+    for item in mix.split(","):
+        kind, _, weight = item.partition(":")
+
+        if kind == "text":
+            # Free text, answered with "Nothing to say"
+            messages.append(b"a" * payload_size)
+        else:
+            messages.append(MESSAGES[kind])
+
+        weights.append(float(weight) if weight else 1.0)
+
+    return (messages, weights)
+
+    ### end def parseMix() ###
+
+def runClient(server_address, num_requests, messages, weights, window,
+              timeout, seed, results):
+    """
+    Function executed by each client process. It keeps up to window
+    requests in flight (request ID framing) and measures the latency
+    of each reply.
+    """
+    udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    udp_socket.setblocking(False)
+
+    # Messages of this client, drawn from the mix
+    requests = random.Random(seed).choices(
+        messages,
+        weights = weights,
+        k = num_requests)
+
+    # Outstanding requests (request ID -> send time), oldest first
+    in_flight = OrderedDict()
+    latencies = []
+    lost = 0
+    next_id = 0
+
+    start = perf_counter()
+
+    while (next_id < num_requests) or in_flight:
+
+        # Send while there is room in the window -------------------------------
+        while (len(in_flight) < window) and (next_id < num_requests):
+            try:
+                udp_socket.sendto(
+                    packFrame(next_id, requests[next_id]),
+                    server_address)
+            except BlockingIOError:
+                break
+
+            in_flight[next_id] = perf_counter()
+            next_id += 1
+
+        # Wait for replies until the oldest request expires --------------------
+        oldest = next(iter(in_flight.values()), perf_counter())
+        wait = max(0.0, oldest + timeout - perf_counter())
+        ready, _, _ = select.select([udp_socket], [], [], wait)
+
+        if ready:
+            while True:
+                try:
+                    raw_data, address = udp_socket.recvfrom(udp_s.BUFFER_SIZE)
+                except (BlockingIOError, ConnectionError):
+                    break
+
+                request_id, payload = unpackFrame(raw_data)
+                sent = in_flight.pop(request_id, None)
+
+                if sent is not None:
+                    latencies.append(perf_counter() - sent)
+
+        # Requests without reply after the timeout are lost --------------------
+        now = perf_counter()
+        while in_flight and (next(iter(in_flight.values())) + timeout < now):
+            in_flight.popitem(last = False)
+            lost += 1
+
+    results.put((latencies, lost, perf_counter() - start))
+    udp_socket.close()
+
+    ### end def runClient() ###
+
+def waitForServer(server_address, timeout):
+    """
+    Function to wait until the server answers a "time" message.
+    """
+    udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    udp_socket.settimeout(0.1)
+
+    start = perf_counter()
+
+    while perf_counter() - start < timeout:
+        try:
+            udp_socket.sendto(MESSAGES["time"], server_address)
+            udp_socket.recvfrom(udp_s.BUFFER_SIZE)
+            break
+        except (socket.timeout, ConnectionError):
+            pass
+
+    udp_socket.close()
+
+    ### end def waitForServer() ###
+
+def percentile(sorted_values, fraction):
+    """
+    Function to get a percentile (fraction between 0 and 1) of a sorted list.
+    """
+    if not sorted_values:
+        return float("nan")
+
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+    ### end def percentile() ###
+
+# ---------------------------------------------------------------------------- #
+# BENCHMARK
+
+if __name__ == '__main__':
+    """
+    Start a UDP Server (unless --host is given), run the client processes
+    and print throughput, latency percentiles and loss rate.
+    """
+    parser = argparse.ArgumentParser(description = __doc__)
+    parser.add_argument("--host", default = None,
+                        help = "benchmark a running server instead of "
+                               "starting one on localhost")
+    parser.add_argument("--port", type = int, default = 12000)
+    parser.add_argument("--workers", type = int, default = 1,
+                        help = "server worker processes (SO_REUSEPORT)")
+    parser.add_argument("--clients", type = int, default = 4,
+                        help = "concurrent client processes")
+    parser.add_argument("--requests", type = int, default = 10000,
+                        help = "requests sent by each client")
+    parser.add_argument("--window", type = int, default = 16,
+                        help = "requests in flight per client")
+    parser.add_argument("--mix", default = "time:1,pickle:1,json:1,text:1",
+                        help = "message mix, e.g. time:2,text:1")
+    parser.add_argument("--payload-size", type = int, default = 64,
+                        help = "size in bytes of the text messages")
+    parser.add_argument("--timeout", type = float, default = 1.0,
+                        help = "seconds before a request is counted as lost")
+    args = parser.parse_args()
+
+    messages, weights = parseMix(args.mix, args.payload_size)
+
+    # Start the server under test ----------------------------------------------
+    server = None
+
+    if args.host is None:
+        # Client messages are discarded (they are not part of the benchmark)
+        if args.workers == 1:
+            server = udp_s.udpServer(sink = nullSink())
+        else:
+            server = udp_sp.udpServerPool(
+                num_workers = args.workers,
+                sink        = nullSink())
+
+        server.setServerPort(args.port)
+        server.start()
+
+    server_address = (args.host or "localhost", args.port)
+    waitForServer(server_address, timeout = 5.0)
+
+    # Run the clients ----------------------------------------------------------
+    results = CONTEXT.Queue()
+    clients = [
+        CONTEXT.Process(
+            target = runClient,
+            args   = (server_address, args.requests, messages, weights,
+                      args.window, args.timeout, seed, results))
+        for seed in range(args.clients)]
+
+    for client in clients:
+        client.start()
+
+    latencies = []
+    lost = 0
+    elapsed = 0.0
+
+    for client in clients:
+        client_latencies, client_lost, client_elapsed = results.get()
+        latencies.extend(client_latencies)
+        lost += client_lost
+        elapsed = max(elapsed, client_elapsed)
+
+    for client in clients:
+        client.join()
+
+    if server is not None:
+        server.closeClient()
+        server.join()
+
+    # Report -------------------------------------------------------------------
+    latencies.sort()
+    sent = args.clients * args.requests
+
+    print("requests sent  : " + str(sent))
+    print("replies        : " + str(len(latencies)))
+    print(f"loss rate      : {100.0 * lost / sent:.2f} %")
+    print(f"throughput     : {len(latencies) / elapsed:.0f} replies/s")
+    for name, fraction in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99)):
+        print(f"latency {name}    : "
+              f"{1000.0 * percentile(latencies, fraction):.3f} ms")
+
+# end of file #
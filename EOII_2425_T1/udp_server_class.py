@@ -5,92 +5,264 @@
 @date     October, 2024
 @section  EOII-GIIROB
 @brief    UDP Server Class code implementation
-          for using with tkinter UDP Server Window.
+          for using with tkinter UDP Server Window
+          or headless (see udp_server_daemon.py).
 """
 
 # ---------------------------------------------------------------------------- #
 # NEEDED IMPORTS
 
 from   datetime import datetime
+import itertools
 import json
+from   letter_count import countLetters
+from   message_sinks import queueSink
+import os
 import pickle
-import socket
+from   rate_limiter  import MAX_CLIENTS, rateLimiter
+from   request_framing import packFrame, unpackFrame
+from   server_statistics import serverStatistics
+import sys
 import threading
-from   time    import sleep
-import tkinter as tk
+from   time    import monotonic, perf_counter_ns, time
 
 # ---------------------------------------------------------------------------- #
-# CREATING UDP CLIENT CLASS
+# SHARED MODULES (EOII_2425_common folder)
 
-class udpServer(threading.Thread):
-    
-    def __init__(self, checkbuttons, output_text, serverWindow):
+COMMON_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    os.pardir,
+    "EOII_2425_common")
+
+if COMMON_PATH not in sys.path:
+    sys.path.insert(0, COMMON_PATH)
+
+import binary_codec
+from   udp_fragmentation import (FRAGMENT_SIZE, fragmentMessage, isFragment,
+                                 reassemblyBuffer)
+from   udp_server_core import BUFFER_SIZE, RECV_BUFFER_SIZE, udpServerLoop
+
+# ---------------------------------------------------------------------------- #
+# RECEPTION PARAMETERS
+
+UI_QUEUE_SIZE    = 1000     # Max client messages waiting to be displayed
+
+# ---------------------------------------------------------------------------- #
+# CREATING CACHED RESPONSE CLASS
+
+class cachedResponse:
+
+    def __init__(self, build_response):
         """
-        Function to initialize UDP Server Class variables.
-        The super() method is used to call the constructor of the parent class.
+        Function to initialize Cached Response Class variables.
+        build_response() returns the encoded response for the current second.
+        """
+        self.build_response = build_response
+        self.response = None
+
+        # Monotonic time when the response has to be built again
+        self.expiration = 0.0
+
+        ### end def __init__() ###
+
+    def get(self):
+        """
+        Function to get the response. It is only built again when the
+        wall clock second changes, checked with a cheap monotonic clock.
+        """
+        now = monotonic()
+
+        if now >= self.expiration:
+            self.response = self.build_response()
+            # Valid until the beginning of the next second
+            self.expiration = now + 1.0 - (time() % 1.0)
+
+        return self.response
+
+        ### end def get() ###
+
+# ---------------------------------------------------------------------------- #
+# CREATING UDP SERVER CORE CLASS
+
+# Commands, caches, statistics and client messages of the UDP Server, without
+# any socket. Shared by the threaded udpServer and the asyncio implementation.
+
+class udpServerCore:
+
+    def __init__(self, sink = None, ui_queue_size = UI_QUEUE_SIZE):
+        """
+        Function to initialize UDP Server Core Class variables.
+        Client messages are written to sink (see message_sinks.py), by
+        default a bounded queue read by the UDP Server Window.
         """
-        super().__init__() # Also: threading.Thread.__init__(self)
-            
         # Control parameters
         self.server_on = False
-        self.recievingMessage = False
+        self.end_requested = threading.Event()
 
-        
-        # UDP Server Window elements needed in the class
-        self.checkbuttons = checkbuttons
-        self.output_text = output_text
-        self.serverWindow = serverWindow
+        # Display mode of client messages
+        # ("normal", "uppercase", "lowercase" or "count")
+        self.display_mode = "normal"
 
-        # UDP Socket variables
-        self.server_IP_address = "localhost"
-        self.server_port = None
+        # Destination of client messages. The default one is a bounded queue
+        # for the UDP Server Window (tkinter widgets are only touched by the
+        # window thread).
+        if sink is None:
+            sink = queueSink(ui_queue_size)
 
-        # Create a UDP socket
-        self.udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sink = sink
+
+        # Reception statistics
+        self.datagrams_received = 0
+        self.bytes_received = 0
+
+        # Large messages, split into fragments (see udp_fragmentation.py)
+        self.reassembly = reassemblyBuffer()
+        self.fragment_size = FRAGMENT_SIZE
+        self.message_ids = itertools.count()
+
+        # Per-command counts and handler times
+        self.server_statistics = serverStatistics()
+
+        # Per-client token buckets (disabled until setRateLimit() is called)
+        self.rate_limiter = None
+
+        # Responses built once (constant) or once per second (time based)
+        self.serialized_response = pickle.dumps([1, 2, 3, 4, 5])
+        self.binary_response = binary_codec.encode([1, 2, 3, 4, 5])
+        self.json_response = cachedResponse(self.buildJsonResponse)
+        self.time_response = cachedResponse(self.buildTimeResponse)
+
+        # Commands table (normalized command -> handler), see registerCommand()
+        self.commands = {}
+        self.registerCommand("end", self.endCommand)
+        self.registerCommand(
+            "request serialized message",
+            self.serializedMessageCommand)
+        self.registerCommand(
+            binary_codec.BINARY_COMMAND,
+            self.binaryMessageCommand)
+        self.registerCommand(
+            "request json serialized message",
+            self.jsonMessageCommand)
+        self.registerCommand("time", self.timeCommand)
 
-        # Set a timeout of 1 seconds
-        self.udp_socket.settimeout(1)
-        
         ### end def __init__() ###
-    
-    def setServerPort(self, new_port):
+
+    def setDisplayMode(self, new_mode):
         """
-        Function to set a new server port.
+        Function to set how client messages are displayed
+        ("normal", "uppercase", "lowercase" or "count").
         """
-        self.server_port = new_port
-            
-        ### end def setServerPort() ###
+        self.display_mode = new_mode
+
+        ### end def setDisplayMode() ###
 
-    def showClientMessage(self, data):
+    def setFragmentSize(self, new_size):
         """
-        Show client message on output_text
-        (depending on checkbuttons values).
+        Function to set the max size of the reply datagrams. Bigger replies
+        are split into fragments (see udp_fragmentation.py).
+        """
+        self.fragment_size = new_size
+
+        ### end def setFragmentSize() ###
+
+    def setRateLimit(self, rate, burst = None, max_clients = MAX_CLIENTS):
         """
-        if self.checkbuttons["check_uppercase"].get() == True:
+        Function to limit each client address to rate requests per second,
+        with bursts of up to burst requests (see rate_limiter.py).
+        Excess requests are dropped without answer. A rate of 0 or None
+        disables the limit. Raises ValueError for a negative rate or a
+        burst less than 1.
+        """
+        if rate:
+            self.rate_limiter = rateLimiter(rate, burst, max_clients)
+        else:
+            self.rate_limiter = None
+
+        ### end def setRateLimit() ###
+
+    @property
+    def rate_limited_requests(self):
+        """
+        Client requests dropped by the rate limiter.
+        """
+        if self.rate_limiter is None:
+            return 0
+
+        return self.rate_limiter.dropped_requests
+
+        ### end def rate_limited_requests() ###
+
+    @property
+    def dropped_messages(self):
+        """
+        Client messages dropped by the sink (e.g. the window queue is full).
+        """
+        return self.sink.dropped_messages
+
+        ### end def dropped_messages() ###
+
+    def getClientMessages(self, max_messages):
+        """
+        Function to get (without blocking) up to max_messages client messages
+        waiting to be displayed. Called periodically by the UDP Server Window
+        (only available with the default queue sink).
+        """
+        return self.sink.getMessages(max_messages)
+
+        ### end def getClientMessages() ###
+
+    def getWorkerStatistics(self):
+        """
+        Function to get the reception statistics of each worker, as a list
+        of (datagrams, bytes, dropped messages, rate limited requests)
+        tuples. This server is a single worker.
+        """
+        return [(self.datagrams_received,
+                 self.bytes_received,
+                 self.dropped_messages,
+                 self.rate_limited_requests)]
+
+        ### end def getWorkerStatistics() ###
+
+    def getServerStatistics(self):
+        """
+        Function to get the statistics shown on the UDP Server Window, as a
+        dictionary with the totals of datagrams and bytes received, the
+        queue depths, the per-command counts and the handler time histogram
+        (see server_statistics.py). It only reads counters, so it can be
+        called from any thread.
+        """
+        return {
+            "datagrams"       : self.datagrams_received,
+            "bytes"           : self.bytes_received,
+            "pending_messages": self.sink.pending_messages,
+            "pending_replies" : 0,
+            "rate_limited"    : self.rate_limited_requests,
+            "commands"        : self.server_statistics.getCommandCounts(),
+            "handler_times"   : self.server_statistics.getHandlerTimes()
+        }
+
+        ### end def getServerStatistics() ###
+
+    def showClientMessage(self, data, raw_data):
+        """
+        Write client message to the sink, e.g. to be shown on the UDP Server
+        Window (depending on display mode).
+        raw_data is the undecoded message, used by the counting mode.
+        """
+        display_mode = self.display_mode
+
+        if display_mode == "uppercase":
             message = data.upper()
 
-        elif self.checkbuttons["check_lowercase"].get() == True:
+        elif display_mode == "lowercase":
             message = data.lower()
 
-        elif self.checkbuttons["check_count"].get() == True:
-            # Initialize counters
-            num_letters    = 0
-            num_vowels     = 0
-            num_consonants = 0
-
-            # Define vowels
-            vowels = "aeiouAEIOU"
-
-            # Iterate through each character in the text
-            for char in data:
-                if char.isalpha():  # Check if it is a letter
-                    num_letters += 1
-                    
-                    if char in vowels:  # Check if it is a vowel
-                        num_vowels += 1
-                    else:  # If not, then it is a consonant
-                        num_consonants += 1
-            
+        elif display_mode == "count":
+            # Count over the raw bytes (no Python work per character)
+            num_letters, num_vowels, num_consonants = countLetters(raw_data)
+
             message = ("Letters: "      + str(num_letters) +
                        ", Vowels: "     + str(num_vowels)  +
                        ", Consonants: " + str(num_consonants))
@@ -98,106 +270,271 @@ class udpServer(threading.Thread):
         else:
             message = data
 
-        self.output_text.insert(tk.END, message + "\n")
-        # Adjust scrollbar position to always show the last text
-        self.output_text.yview_moveto(1.0)
+        self.sink.write(message)
               
         ### end def showClientMessage() ###
-    
+
+    def handleDatagram(self, datagram, client_address):
+        """
+        Function to handle a datagram (bytes) from client, independently
+        of how it has been received. Pipelined clients add a request ID
+        that is echoed in the reply.
+        Returns the encoded reply, or None if nothing has to be sent.
+        The datagrams are counted by the reception loop.
+        """
+        # Fragments are kept until the whole message has arrived (the
+        # reassembly buffer bounds what a flood of fragments can store)
+        if isFragment(datagram):
+            datagram = self.reassembly.addFragment(datagram, client_address)
+
+            if datagram is None:
+                return None
+
+        # Drop requests of clients over their rate, once per message (not
+        # per fragment), before processing them
+        if (self.rate_limiter is not None
+                and self.rate_limiter.allow(client_address) == False):
+            return None
+
+        request_id, data = unpackFrame(datagram)
+
+        reply = self.processMessage(data, client_address)
+
+        if (reply is not None) and (request_id is not None):
+            reply = packFrame(request_id, reply)
+
+        return reply
+
+        ### end def handleDatagram() ###
+
+    def fragmentReply(self, reply):
+        """
+        Function to split a reply into the datagrams to be sent (only
+        one, without header, if it fits in fragment_size bytes).
+        """
+        return fragmentMessage(next(self.message_ids), reply,
+                               self.fragment_size)
+
+        ### end def fragmentReply() ###
+
+    def processMessage(self, data, client_address):
+        """
+        Function to process a message from client.
+        The message is decoded once and dispatched through the commands
+        table. Returns the encoded reply, or None if nothing has to be sent.
+        """
+        start = perf_counter_ns()
+
+        message = data.decode(errors = "replace")
+
+        # Do not build messages that the sink discards
+        if self.sink.discards_messages == False:
+            self.showClientMessage(message, data)
+
+        # Look for the command handler (unknown messages get a default answer)
+        command = message.lower()
+        handler = self.commands.get(command)
+
+        if handler is None:
+            command = "unknown"
+            handler = self.unknownCommand
+
+        reply = handler(message, client_address)
+
+        self.server_statistics.recordRequest(
+            command,
+            perf_counter_ns() - start)
+
+        return reply
+
+        ### end def processMessage() ###
+
+    def registerCommand(self, command, handler):
+        """
+        Function to register (or replace) the handler of a command.
+        The handler is called as handler(message, client_address) and must
+        return the encoded reply, or None if nothing has to be sent.
+        """
+        self.commands[command.lower()] = handler
+
+        ### end def registerCommand() ###
+
+    def endCommand(self, message, client_address):
+        """
+        If server has been asked to close, then say goodbye.
+        """
+        self.server_on = False
+        # The UDP Server Window closes itself when it sees this event
+        self.end_requested.set()
+
+        return None
+
+        ### end def endCommand() ###
+
+    def serializedMessageCommand(self, message, client_address):
+        """
+        Send message using (pickle.dumps), serialized only once.
+        """
+        return self.serialized_response
+
+        ### end def serializedMessageCommand() ###
+
+    def binaryMessageCommand(self, message, client_address):
+        """
+        Send message using (binary_codec.encode), serialized only once.
+        Safe to decode, unlike pickle.
+        """
+        return self.binary_response
+
+        ### end def binaryMessageCommand() ###
+
+    def jsonMessageCommand(self, message, client_address):
+        """
+        Send message using (json.dumps), cached for the current second.
+        """
+        return self.json_response.get()
+
+        ### end def jsonMessageCommand() ###
+
+    def timeCommand(self, message, client_address):
+        """
+        Send the current time using (encode), cached for the current second.
+        """
+        return self.time_response.get()
+
+        ### end def timeCommand() ###
+
+    def buildJsonResponse(self):
+        """
+        Function to build the (json) response of the current second.
+        """
+        # Create the message in JSON format
+        unserialized_msg = {
+            "temperature": 22,
+            "timestamp": (datetime.now()
+                          .strftime("%Y-%m-%d %H:%M:%S"))
+        }
+
+        # Serialize msg using json.dumps()
+        return json.dumps(unserialized_msg).encode()
+
+        ### end def buildJsonResponse() ###
+
+    def buildTimeResponse(self):
+        """
+        Function to build the (time) response of the current second.
+        """
+        # Get the current time
+        current_time = datetime.now().time()
+        # Convert the current time to a string in the format hh:mm:ss
+        return current_time.strftime('%H:%M:%S').encode()
+
+        ### end def buildTimeResponse() ###
+
+    def unknownCommand(self, message, client_address):
+        """
+        Answer to any message that is not a registered command.
+        """
+        return b"Nothing to say"
+
+        ### end def unknownCommand() ###
+
+# ---------------------------------------------------------------------------- #
+# CREATING UDP SERVER CLASS
+
+# Reception loop (socket, selector, batches) shared with every UDP Server of
+# the project, see EOII_2425_common/udp_server_core.py.
+
+class udpServer(threading.Thread, udpServerCore, udpServerLoop):
+
+    def __init__(self, sink = None, ui_queue_size = UI_QUEUE_SIZE):
+        """
+        Function to initialize UDP Server Class variables.
+        The constructors of every parent class are called.
+        Client messages are written to sink (see message_sinks.py), by
+        default a bounded queue read by the UDP Server Window.
+        """
+        threading.Thread.__init__(self)
+        udpServerCore.__init__(self, sink, ui_queue_size)
+        udpServerLoop.__init__(self, self.handleRequest)
+
+        # UDP Socket variables
+        self.server_IP_address = "localhost"
+        self.server_port = None
+
+        ### end def __init__() ###
+
+    def setServerPort(self, new_port):
+        """
+        Function to set a new server port.
+        """
+        self.server_port = new_port
+            
+        ### end def setServerPort() ###
+
+    def setServerIPAddress(self, new_IP_address):
+        """
+        Function to set the IP address the server is bound to.
+        """
+        self.server_IP_address = new_IP_address
+
+        ### end def setServerIPAddress() ###
+
+    def getServerStatistics(self):
+        """
+        Function to get the statistics of the server (see
+        udpServerCore.getServerStatistics()), with the replies waiting
+        for the socket to be writable.
+        """
+        statistics = super().getServerStatistics()
+        statistics["pending_replies"] = len(self.pending_replies)
+
+        return statistics
+
+        ### end def getServerStatistics() ###
+
+    def handleRequest(self, datagram, client_address):
+        """
+        Handler of the reception loop: the reply of a datagram, or the
+        fragments of the reply if it is too large for a single datagram.
+        """
+        reply = self.handleDatagram(datagram, client_address)
+
+        if (reply is None) or (len(reply) <= self.fragment_size):
+            return reply
+
+        # Large reply, sent in several fragments
+        return list(self.fragmentReply(reply))
+
+        ### end def handleRequest() ###
+
     def run(self):
         """
         This functions runs automatically when the thread is started.
+        The thread sleeps inside the selector until a datagram arrives
+        or closeClient() wakes it up, so no CPU is used while idle.
         """
         # Bind the socket to the server address and port
-        self.udp_socket.bind((self.server_IP_address, self.server_port))
+        self.bind((self.server_IP_address, self.server_port))
 
-        # Server status variable
-        self.server_on = True
+        self.serveForever()
 
-        while self.server_on == True:
-            
-            # Receive a message from client ------------------------------------
-            self.recievingMessage = True
-            try:
-                data, client_address = self.udp_socket.recvfrom(4096)
-                self.showClientMessage(data.decode())
-
-            except (socket.timeout, RuntimeError):
-                # socket.timeout: when the timeout period expires
-                # RuntimeError: when main thread is not in main loop
-                data = None
-            
-            self.recievingMessage = False
-            
-            if data != None:
-                    
-                # If server has been asked to close, then say goodbye ----------
-                if (data.decode()).lower() == "end":
-                    self.server_on = False
-                    self.serverWindow.quit()
-
-                # Send message using (pickle.dumps) ----------------------------
-                elif (data.decode()).lower() == "request serialized message":
-                    # Data to send (a list of numbers)
-                    unserialized_msg = [1, 2, 3, 4, 5]
-                    
-                    # Serialize msg using pickle.dumps()
-                    serialized_msg = pickle.dumps(unserialized_msg)
-                    
-                    # Send a response to client
-                    self.udp_socket.sendto(serialized_msg, client_address)
-                
-                # Send message using (json.dumps) ------------------------------
-                elif ((data.decode()).lower() ==
-                      "request json serialized message"):
-                    # Create the message in JSON format
-                    unserialized_msg = {
-                        "temperature": 22,
-                        "timestamp": (datetime.now()
-                                      .strftime("%Y-%m-%d %H:%M:%S"))
-                    }
-                    
-                    # Serialize msg using json.dumps()
-                    serialized_msg = json.dumps(unserialized_msg)
-                    
-                    # Send a response to client
-                    self.udp_socket.sendto(
-                        serialized_msg.encode(), 
-                        client_address)
-                
-                # Send message using (encode) ----------------------------------
-                else:
-                    if (data.decode()).lower() == "time":
-                        # Get the current time
-                        current_time = datetime.now().time()
-                        # Convert the current time to a
-                        # string in the format hh:mm:ss
-                        message = current_time.strftime('%H:%M:%S')       
-                    else:
-                        message = "Nothing to say"
-                    
-                    # Send a response to client
-                    self.udp_socket.sendto(message.encode(), client_address)
-                
-            # Necessary wait to free the CPU
-            sleep(0.001)
-        
         ### end def run() ###
 
     def closeClient(self):
         """
-        Function to close the client socket.
+        Function to close the server socket.
+        The thread is woken up immediately, no timeout has to expire.
         """
-        # Turn off the server
-        self.server_on = False
+        if self.ident is None:
+            # The thread has never been started, close sockets here
+            self.server_on = False
+            self.closeSockets()
 
-        # Wait if a socket message is being expected
-        while self.recievingMessage == True:
-            sleep(0.001)
+        else:
+            # Wake up the selector (the thread closes the sockets on exit)
+            self.stop()
 
-        # Close socket
-        self.udp_socket.close()
-            
         ### end def closeClient() ###
-        
-# end of file #
\ No newline at end of file
+
+# end of file #
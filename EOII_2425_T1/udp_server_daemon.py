@@ -0,0 +1,144 @@
+"""
+@file     udp_server_daemon.py
+
+@author   Marcos Belda Martinez' <mbelmar@etsinf.upv.es>
+@date     October, 2024
+@section  EOII-GIIROB
+@brief    Headless UDP Server (no tkinter), configured from the command line.
+"""
+
+# ---------------------------------------------------------------------------- #
+# NEEDED IMPORTS
+
+import argparse
+import message_sinks
+import signal
+import threading
+import udp_server_class as udp_s
+import udp_server_pool  as udp_sp
+
+# ---------------------------------------------------------------------------- #
+# DAEMON PARAMETERS
+
+POLL_INTERVAL = 0.5  # Seconds between checks of the stop conditions
+
+# ---------------------------------------------------------------------------- #
+# FUNCTIONS
+
+def createSink(args):
+    """
+    Function to create the sink of client messages selected with --sink.
+    """
+    if args.sink == "stdout":
+        sink = message_sinks.streamSink()
+
+    elif args.sink == "file":
+        sink = message_sinks.fileSink(args.log_file)
+
+    elif args.sink == "rotating":
+        sink = message_sinks.rotatingFileSink(
+            args.log_file,
+            max_bytes    = args.max_bytes,
+            backup_count = args.backup_count)
+
+    else: # args.sink == "null"
+        sink = message_sinks.nullSink()
+
+    return sink
+
+    ### end def createSink() ###
+
+# ---------------------------------------------------------------------------- #
+# SERVER
+
+if __name__ == '__main__':
+    """
+    Run a UDP Server (a thread, or a pool of worker processes) until a
+    client sends "end" or the process receives SIGINT or SIGTERM.
+    """
+    parser = argparse.ArgumentParser(description = __doc__)
+    parser.add_argument("--ip", default = "localhost",
+                        help = "IP address the server is bound to")
+    parser.add_argument("--port", type = int, default = 12000)
+    parser.add_argument("--mode", default = "normal",
+                        choices = ("normal", "uppercase", "lowercase", "count"),
+                        help = "how client messages are written")
+    parser.add_argument("--sink", default = "stdout",
+                        choices = ("stdout", "file", "rotating", "null"),
+                        help = "destination of client messages")
+    parser.add_argument("--log-file", default = "udp_server.log",
+                        help = "file used by the file and rotating sinks")
+    parser.add_argument("--max-bytes", type = int, default = 10 * 1024 * 1024,
+                        help = "size of each rotating log file")
+    parser.add_argument("--backup-count", type = int, default = 5,
+                        help = "old rotating log files kept")
+    parser.add_argument("--workers", type = int, default = 1,
+                        help = "worker processes (SO_REUSEPORT)")
+    parser.add_argument("--rcvbuf", type = int,
+                        default = udp_s.RECV_BUFFER_SIZE,
+                        help = "kernel receive buffer size (SO_RCVBUF)")
+    parser.add_argument("--rate-limit", type = float, default = 0,
+                        help = "requests per second of each client "
+                               "(0 means no limit)")
+    parser.add_argument("--burst", type = float, default = None,
+                        help = "max burst of requests of each client")
+    args = parser.parse_args()
+
+    if not (1 <= args.workers <= udp_sp.MAX_WORKERS):
+        parser.error("--workers must be between 1 and " +
+                     str(udp_sp.MAX_WORKERS))
+
+    if (args.workers > 1) and (udp_sp.REUSEPORT_AVAILABLE == False):
+        parser.error("--workers > 1 needs SO_REUSEPORT, "
+                     "not available on this platform")
+
+    sink = createSink(args)
+
+    # Create UDP Server --------------------------------------------------------
+    if args.workers == 1:
+        server = udp_s.udpServer(sink = sink)
+    else:
+        server = udp_sp.udpServerPool(num_workers = args.workers, sink = sink)
+
+    server.setReceiveBufferSize(args.rcvbuf)
+    server.setDisplayMode(args.mode)
+
+    try:
+        server.setRateLimit(args.rate_limit, args.burst)
+    except ValueError as err:
+        parser.error(str(err))
+
+    server.setServerIPAddress(args.ip)
+    server.setServerPort(args.port)
+
+    # Stop on SIGINT (Ctrl+C) or SIGTERM (e.g. docker stop). The handler
+    # only sets a local event: setting the multiprocessing Event of the pool
+    # from a handler that interrupts a wait() on it hangs the process.
+    signal_received = threading.Event()
+
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(
+            signal_number,
+            lambda signum, frame: signal_received.set())
+
+    # Start UDP Server and wait until it is asked to finish --------------------
+    server.start()
+
+    while ((not signal_received.is_set()) and
+           (not server.end_requested.wait(POLL_INTERVAL))):
+        pass
+
+    server.end_requested.set()
+
+    server.closeClient()
+
+    if server.is_alive() == True:
+        server.join()
+
+    sink.close()
+
+    if server.rate_limited_requests > 0:
+        print("Requests dropped by the rate limit: " +
+              str(server.rate_limited_requests))
+
+# end of file #
@@ -0,0 +1,454 @@
+"""
+@file     udp_server_pool.py
+
+@author   Marcos Belda Martinez' <mbelmar@etsinf.upv.es>
+@date     October, 2024
+@section  EOII-GIIROB
+@brief    Multi-process UDP Server implementation. Every worker process
+          binds the same port with SO_REUSEPORT and the kernel balances
+          the datagrams between them.
+"""
+
+# ---------------------------------------------------------------------------- #
+# NEEDED IMPORTS
+
+from   message_sinks import nullSink, queueSink
+import multiprocessing
+import queue
+from   server_statistics import HISTOGRAM_BUCKETS, mergeHistograms
+import socket
+import threading
+import udp_server_class as udp_s
+
+# ---------------------------------------------------------------------------- #
+# POOL PARAMETERS
+
+MAX_WORKERS = 64  # Max number of worker processes
+
+FORWARD_TIMEOUT = 0.5  # Seconds the forwarder waits before checking its stop
+
+# Statistics of each worker
+# (datagrams, bytes, dropped messages, rate limited requests)
+STATISTICS_FIELDS = 4
+
+# SO_REUSEPORT is not available on every platform (e.g. Windows)
+REUSEPORT_AVAILABLE = hasattr(socket, "SO_REUSEPORT")
+
+# Spawn (not fork) so workers do not inherit the tkinter state of the window
+CONTEXT = multiprocessing.get_context("spawn")
+
+# ---------------------------------------------------------------------------- #
+# CREATING UDP SERVER WORKER CLASS
+
+class udpServerWorker(udp_s.udpServer):
+
+    def __init__(self, index, shared_mode, ui_queue, end_requested,
+                 statistics, handler_times, command_names, command_counts,
+                 stop_connection, discard_messages = False):
+        """
+        Function to initialize UDP Server Worker Class variables.
+        It is created inside the worker process, the arguments are
+        the objects shared with the pool. If discard_messages is True
+        (the sink of the pool discards them), client messages are not
+        even built.
+        """
+        # Shared display mode, needed before the parent sets its default
+        self.shared_mode = shared_mode
+
+        # Client messages are queued for the pool (or discarded here)
+        if discard_messages == True:
+            sink = nullSink()
+        else:
+            sink = queueSink(0, message_queue = ui_queue)
+
+        super().__init__(sink = sink)
+
+        # Objects shared with the pool (replace the ones of a single server)
+        self.index = index
+        self.end_requested = end_requested
+        self.statistics = statistics
+        self.handler_times = handler_times
+        self.command_names = command_names
+        self.command_counts = command_counts
+
+        # Several workers can bind the same address and port
+        self.udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+
+        # The pool wakes up the worker through this pipe (see closeClient())
+        self.addWakeupSource(stop_connection)
+
+        # Statistics are published once per batch of datagrams
+        self.addBatchHook(self.publishStatistics)
+
+        ### end def __init__() ###
+
+    @property
+    def display_mode(self):
+        """
+        Display mode shared by every worker of the pool.
+        """
+        return self.shared_mode.value.decode()
+
+        ### end def display_mode() ###
+
+    @display_mode.setter
+    def display_mode(self, new_mode):
+        """
+        The display mode is only set by the pool.
+        """
+        pass
+
+        ### end def display_mode() ###
+
+    def publishStatistics(self):
+        """
+        Function to publish the statistics of this worker to the pool.
+        """
+        first = STATISTICS_FIELDS * self.index
+        self.statistics[first]     = self.datagrams_received
+        self.statistics[first + 1] = self.bytes_received
+        self.statistics[first + 2] = self.dropped_messages
+        self.statistics[first + 3] = self.rate_limited_requests
+
+        first = HISTOGRAM_BUCKETS * self.index
+        self.handler_times[first:first + HISTOGRAM_BUCKETS] = (
+            self.server_statistics.handler_times)
+
+        counts = self.server_statistics.command_counts
+        first = len(self.command_names) * self.index
+        self.command_counts[first:first + len(self.command_names)] = [
+            counts.get(command, 0) for command in self.command_names]
+
+        ### end def publishStatistics() ###
+
+# ---------------------------------------------------------------------------- #
+# WORKER PROCESS FUNCTION
+
+def runWorker(index, server_IP_address, server_port, shared_mode, ui_queue,
+              end_requested, statistics, handler_times, command_names,
+              command_counts, stop_connection, rate_limit, recv_buffer_size,
+              discard_messages):
+    """
+    Function executed by each worker process.
+    rate_limit is None or the (rate, burst, max_clients) of setRateLimit().
+    """
+    # Do not wait at exit for messages the window will not read anymore
+    ui_queue.cancel_join_thread()
+
+    worker = udpServerWorker(
+        index,
+        shared_mode,
+        ui_queue,
+        end_requested,
+        statistics,
+        handler_times,
+        command_names,
+        command_counts,
+        stop_connection,
+        discard_messages)
+
+    worker.setServerIPAddress(server_IP_address)
+    worker.setServerPort(server_port)
+    worker.setReceiveBufferSize(recv_buffer_size)
+
+    # Each worker keeps its own buckets. The kernel sends the datagrams of
+    # a client address always to the same worker, so the limit is per client.
+    if rate_limit is not None:
+        worker.setRateLimit(*rate_limit)
+
+    # Run the reception loop in the main thread of this process
+    worker.run()
+
+    ### end def runWorker() ###
+
+# ---------------------------------------------------------------------------- #
+# CREATING UDP SERVER POOL CLASS
+
+class udpServerPool:
+
+    def __init__(self, num_workers, sink = None,
+                 ui_queue_size = udp_s.UI_QUEUE_SIZE):
+        """
+        Function to initialize UDP Server Pool Class variables.
+        It offers the same interface as udpServer to the UDP Server Window.
+        If a sink is given (see message_sinks.py), a thread of this process
+        writes to it the client messages queued by the workers.
+        """
+        self.num_workers = num_workers
+        self.server_IP_address = "localhost"
+        self.server_port = None
+
+        # Objects shared with the workers
+        self.shared_mode = CONTEXT.RawArray('c', 16)
+        self.shared_mode.value = b"normal"
+        self.ui_queue = CONTEXT.Queue(maxsize = ui_queue_size)
+        self.end_requested = CONTEXT.Event()
+
+        # Statistics of each worker (see STATISTICS_FIELDS)
+        self.statistics = CONTEXT.RawArray(
+            'Q',
+            STATISTICS_FIELDS * num_workers)
+
+        # Handler time histogram of each worker (see server_statistics.py)
+        self.handler_times = CONTEXT.RawArray(
+            'Q',
+            HISTOGRAM_BUCKETS * num_workers)
+
+        # Requests of each command of each worker, in the order of
+        # command_names (the registered commands, then "unknown")
+        self.command_names = (
+            list(udp_s.udpServerCore(sink = nullSink()).commands) +
+            ["unknown"])
+        self.command_counts = CONTEXT.RawArray(
+            'Q',
+            len(self.command_names) * num_workers)
+
+        # Rate limit of the workers, see setRateLimit()
+        self.rate_limit = None
+
+        # Kernel receive buffer of each worker socket (SO_RCVBUF)
+        self.recv_buffer_size = udp_s.RECV_BUFFER_SIZE
+
+        # Worker processes and the pipes used to stop them
+        self.workers = []
+        self.stop_connections = []
+
+        # Thread that moves the queued client messages to the sink (not
+        # needed if the sink discards them, the workers do not queue them)
+        self.sink = sink
+        self.discard_messages = (sink is not None) and sink.discards_messages
+        self.forwarder = threading.Thread(target = self.forwardMessages)
+        self.forwarder_stop = threading.Event()
+
+        ### end def __init__() ###
+
+    def setServerPort(self, new_port):
+        """
+        Function to set a new server port.
+        """
+        self.server_port = new_port
+
+        ### end def setServerPort() ###
+
+    def setServerIPAddress(self, new_IP_address):
+        """
+        Function to set the IP address the workers are bound to.
+        """
+        self.server_IP_address = new_IP_address
+
+        ### end def setServerIPAddress() ###
+
+    def setDisplayMode(self, new_mode):
+        """
+        Function to set how client messages are displayed
+        ("normal", "uppercase", "lowercase" or "count").
+        """
+        self.shared_mode.value = new_mode.encode()
+
+        ### end def setDisplayMode() ###
+
+    def setReceiveBufferSize(self, new_size):
+        """
+        Function to set the kernel receive buffer size (SO_RCVBUF) of the
+        socket of each worker. It must be called before start().
+        """
+        self.recv_buffer_size = new_size
+
+        ### end def setReceiveBufferSize() ###
+
+    def setRateLimit(self, rate, burst = None,
+                     max_clients = udp_s.MAX_CLIENTS):
+        """
+        Function to limit each client address to rate requests per second
+        (see udpServer.setRateLimit()). Must be called before start().
+        Raises ValueError for invalid parameters (here, not in the workers).
+        """
+        if rate:
+            udp_s.rateLimiter(rate, burst, max_clients)
+            self.rate_limit = (rate, burst, max_clients)
+        else:
+            self.rate_limit = None
+
+        ### end def setRateLimit() ###
+
+    @property
+    def rate_limited_requests(self):
+        """
+        Total of client requests dropped by the rate limiters of the workers.
+        """
+        return sum(self.statistics[3::STATISTICS_FIELDS])
+
+        ### end def rate_limited_requests() ###
+
+    @property
+    def dropped_messages(self):
+        """
+        Total of client messages dropped by the workers.
+        """
+        return sum(self.statistics[2::STATISTICS_FIELDS])
+
+        ### end def dropped_messages() ###
+
+    def getClientMessages(self, max_messages):
+        """
+        Function to get (without blocking) up to max_messages client messages
+        waiting to be displayed. Called periodically by the UDP Server Window.
+        """
+        messages = []
+
+        try:
+            while len(messages) < max_messages:
+                messages.append(self.ui_queue.get_nowait())
+        except queue.Empty:
+            pass
+
+        return messages
+
+        ### end def getClientMessages() ###
+
+    def getWorkerStatistics(self):
+        """
+        Function to get the reception statistics of each worker, as a list
+        of (datagrams, bytes, dropped messages, rate limited requests)
+        tuples.
+        """
+        statistics = list(self.statistics)
+
+        return [tuple(statistics[first:first + STATISTICS_FIELDS])
+                for first in range(0, len(statistics), STATISTICS_FIELDS)]
+
+        ### end def getWorkerStatistics() ###
+
+    def getServerStatistics(self):
+        """
+        Function to get the statistics of the whole pool (see
+        udpServer.getServerStatistics()).
+        """
+        statistics = list(self.statistics)
+        handler_times = list(self.handler_times)
+        command_counts = list(self.command_counts)
+        num_commands = len(self.command_names)
+
+        # Add up the counts of every worker (only the commands received)
+        commands = {}
+
+        for first, command in enumerate(self.command_names):
+            count = sum(command_counts[first::num_commands])
+
+            if count > 0:
+                commands[command] = count
+
+        try:
+            pending_messages = self.ui_queue.qsize()
+        except NotImplementedError:
+            # multiprocessing queues on macOS
+            pending_messages = 0
+
+        return {
+            "datagrams"       : sum(statistics[0::STATISTICS_FIELDS]),
+            "bytes"           : sum(statistics[1::STATISTICS_FIELDS]),
+            "pending_messages": pending_messages,
+            "pending_replies" : 0,
+            "rate_limited"    : sum(statistics[3::STATISTICS_FIELDS]),
+            "commands"        : commands,
+            "handler_times"   : mergeHistograms(
+                handler_times[first:first + HISTOGRAM_BUCKETS]
+                for first in range(0, len(handler_times), HISTOGRAM_BUCKETS))
+        }
+
+        ### end def getServerStatistics() ###
+
+    def forwardMessages(self):
+        """
+        This function runs in the forwarder thread (only with a sink).
+        It sleeps in the queue until a message arrives, and finishes when
+        closeClient() sets forwarder_stop. (No sentinel is queued: a worker
+        that exits while writing to the queue can leave its write lock held,
+        see runWorker().)
+        """
+        while True:
+            try:
+                message = self.ui_queue.get(timeout = FORWARD_TIMEOUT)
+            except queue.Empty:
+                if self.forwarder_stop.is_set() == True:
+                    break
+                continue
+
+            self.sink.write(message)
+
+        ### end def forwardMessages() ###
+
+    def start(self):
+        """
+        Function to start the worker processes.
+        """
+        for index in range(self.num_workers):
+            stop_recv, stop_send = CONTEXT.Pipe(duplex = False)
+
+            worker = CONTEXT.Process(
+                target = runWorker,
+                args   = (index,
+                          self.server_IP_address,
+                          self.server_port,
+                          self.shared_mode,
+                          self.ui_queue,
+                          self.end_requested,
+                          self.statistics,
+                          self.handler_times,
+                          self.command_names,
+                          self.command_counts,
+                          stop_recv,
+                          self.rate_limit,
+                          self.recv_buffer_size,
+                          self.discard_messages),
+                daemon = True)
+
+            worker.start()
+            self.workers.append(worker)
+            self.stop_connections.append(stop_send)
+
+        if (self.sink is not None) and (self.discard_messages == False):
+            self.forwarder.start()
+
+        ### end def start() ###
+
+    def is_alive(self):
+        """
+        Function to check if any worker process is still running.
+        """
+        return any(worker.is_alive() for worker in self.workers)
+
+        ### end def is_alive() ###
+
+    def join(self):
+        """
+        Function to wait until every worker process finishes.
+        """
+        for worker in self.workers:
+            worker.join()
+
+        ### end def join() ###
+
+    def closeClient(self):
+        """
+        Function to stop every worker process.
+        The workers are woken up immediately through their stop pipes.
+        """
+        for stop_connection in self.stop_connections:
+            try:
+                stop_connection.send_bytes(b"\0")
+            except OSError:
+                # The worker has already finished
+                pass
+
+            stop_connection.close()
+
+        # Stop the forwarder once every worker has finished
+        if self.forwarder.is_alive() == True:
+            self.join()
+            self.forwarder_stop.set()
+            self.forwarder.join()
+
+        ### end def closeClient() ###
+
+# end of file #
@@ -12,8 +12,27 @@
 
 from   tkinter import messagebox
 import tkinter as tk
+from   scrollback_text import scrollbackText
+from   server_statistics import histogramPercentile, rateMeter
 from   styles  import *
 import udp_server_class as udp_s
+import udp_server_pool  as udp_sp
+
+# ---------------------------------------------------------------------------- #
+# CLIENT MESSAGES REFRESH PARAMETERS
+
+UI_REFRESH_PERIOD = 50   # Milliseconds between two client messages refreshes
+UI_BATCH_SIZE     = 500  # Max client messages inserted in each refresh
+
+MAX_SCROLLBACK_LINES = 5000  # Max client messages kept on output_text
+
+STATS_REFRESH_PERIOD = 1000  # Milliseconds between two statistics refreshes
+
+# ---------------------------------------------------------------------------- #
+# RATE LIMIT PARAMETERS
+
+RATE_LIMIT = 0     # Requests per second of each client (0 means no limit)
+RATE_BURST = None  # Max burst of requests of each client (RATE_LIMIT if None)
 
 # ---------------------------------------------------------------------------- #
 # FUNCTIONS
@@ -22,27 +41,55 @@ def button_clicked():
     """
     Function to be executed when the serverAddress_button is pressed.
     """
+    global server
+
     value = serverPort_entry.get()
+    workers = workers_entry.get()
+
+    port_valid = ((value.isdigit()) and
+                  (int(value) > 1024) and
+                  (int(value) < 65535))
 
-    if ((value.isdigit()) and (int(value) > 1024) and (int(value) < 65535)):
+    workers_valid = ((workers.isdigit()) and
+                     (int(workers) >= 1) and
+                     (int(workers) <= udp_sp.MAX_WORKERS) and
+                     (int(workers) == 1 or udp_sp.REUSEPORT_AVAILABLE))
+
+    if (port_valid == True) and (workers_valid == True):
         
+        # Create UDP Server (a thread, or a pool of worker processes)
+        if int(workers) == 1:
+            server = udp_s.udpServer()
+        else:
+            server = udp_sp.udpServerPool(num_workers = int(workers))
+
+        server.setDisplayMode(get_display_mode())
+        server.setRateLimit(RATE_LIMIT, RATE_BURST)
+
         # Set UDP Server port
         server.setServerPort(new_port = int(value))
 
-        # Start UDP Server thread
+        # Start UDP Server thread (or worker processes)
         server.start()
+
+        # Start refreshing output_text with the client messages
+        window.after(UI_REFRESH_PERIOD, show_client_messages)
+
+        # Start refreshing the statistics panel (less often)
+        window.after(STATS_REFRESH_PERIOD, show_statistics)
         
-        # Disable serverPort_entry
-        serverPort_entry.config(
-            highlightbackground = FRAME_BG_COLOR,
-            highlightcolor = FRAME_BG_COLOR,
-            highlightthickness = 1,
-            state = "disabled")
+        # Disable serverPort_entry and workers_entry
+        for entry in (serverPort_entry, workers_entry):
+            entry.config(
+                highlightbackground = FRAME_BG_COLOR,
+                highlightcolor = FRAME_BG_COLOR,
+                highlightthickness = 1,
+                state = "disabled")
         
         # Disable serverAddress_button
         serverAddress_button.config(bg = "LIGHT GRAY", state = "disabled")
 
-    else:
+    elif port_valid == False:
         # Delete all content to try again
         serverPort_entry.delete(0, tk.END)
         # Sends a warning to the user
@@ -57,8 +104,42 @@ def button_clicked():
             highlightcolor = "RED",
             highlightthickness = 2)
 
+    else: # workers_valid == False
+        # Delete all content to try again
+        workers_entry.delete(0, tk.END)
+        # Sends a warning to the user
+        if udp_sp.REUSEPORT_AVAILABLE == True:
+            messagebox.showerror(
+                "Error",
+                ("Invalid number of workers. It must be " +
+                 "a number between 1 and " + str(udp_sp.MAX_WORKERS)))
+        else:
+            messagebox.showerror(
+                "Error",
+                "Several workers need SO_REUSEPORT (not available)")
+
+        # Highlight workers_entry
+        workers_entry.config(
+            highlightbackground = "RED",
+            highlightcolor = "RED",
+            highlightthickness = 2)
+
     ### end def button_clicked() ###
 
+def get_display_mode():
+    """
+    Function to get the display mode selected with the checkbuttons.
+    """
+    display_mode = "normal"
+
+    for key in checkbuttons.keys():
+        if checkbuttons[key].get() == True:
+            display_mode = key.replace("check_", "")  # "check_count" -> "count"
+
+    return display_mode
+
+    ### end def get_display_mode() ###
+
 def deselect_others(selected):
     """
     Checkbutton lower exclusion function.
@@ -68,8 +149,100 @@ def deselect_others(selected):
         if key != selected:
             checkbuttons[key].set(False)
 
+    # Update the display mode of the server (if it has been created)
+    if server is not None:
+        server.setDisplayMode(get_display_mode())
+
     ### def deselect_others() end ###
 
+def show_client_messages():
+    """
+    Function to insert in output_text the client messages queued by the
+    server. All of them are inserted in a single widget operation.
+    """
+    global reported_drops
+
+    lines = server.getClientMessages(UI_BATCH_SIZE)
+
+    # Collapse the messages dropped since the last refresh in one line
+    dropped_messages = server.dropped_messages
+    if dropped_messages != reported_drops:
+        lines.append("[" + str(dropped_messages - reported_drops) +
+                     " client messages not displayed]")
+        reported_drops = dropped_messages
+
+    if lines:
+        output_text.appendText("\n".join(lines))
+
+    if server.end_requested.is_set():
+        # A client has sent "end"
+        window.quit()
+    else:
+        window.after(UI_REFRESH_PERIOD, show_client_messages)
+
+    ### end def show_client_messages() ###
+
+def format_statistics(statistics, datagram_rate, byte_rate):
+    """
+    Function to build the text of the statistics panel from the dictionary
+    returned by server.getServerStatistics() and the current rates.
+    """
+    lines = [
+        f"Datagrams/s: {datagram_rate:.0f}   Bytes/s: {byte_rate:.0f}   " +
+        "Rate limited: " + str(statistics["rate_limited"]),
+
+        "Queue depth: " + str(statistics["pending_messages"]) +
+        " messages to display, " + str(statistics["pending_replies"]) +
+        " replies to send"]
+
+    # Most frequent commands first
+    commands = sorted(
+        statistics["commands"].items(),
+        key = lambda item: item[1],
+        reverse = True)
+
+    if commands:
+        lines.append("Commands: " + ", ".join(
+            command + " " + str(count) for command, count in commands))
+
+    # Handler time percentiles (upper bound of the histogram bucket)
+    percentiles = [
+        (name, histogramPercentile(statistics["handler_times"], fraction))
+        for name, fraction in (("p50", 0.50), ("p99", 0.99))]
+
+    if percentiles[0][1] is not None:
+        lines.append("Handler time: " + ", ".join(
+            name + " < " + str(bound) + " us" for name, bound in percentiles))
+
+    return "\n".join(lines)
+
+    ### end def format_statistics() ###
+
+def show_statistics():
+    """
+    Function to refresh the statistics panel. It only reads counters of
+    the server, so the reception is not slowed down.
+    """
+    statistics = server.getServerStatistics()
+
+    datagram_rate = datagram_meter.update(statistics["datagrams"])
+    byte_rate = byte_meter.update(statistics["bytes"])
+
+    text = format_statistics(statistics, datagram_rate, byte_rate)
+
+    # Reception statistics of each worker
+    text += "\n" + "   ".join(
+        "Worker " + str(index + 1) + ": " + str(datagrams) + " datagrams, " +
+        str(num_bytes) + " bytes"
+        for index, (datagrams, num_bytes, dropped, limited)
+        in enumerate(server.getWorkerStatistics()))
+
+    statistics_label.config(text = text)
+
+    window.after(STATS_REFRESH_PERIOD, show_statistics)
+
+    ### end def show_statistics() ###
+
 # ---------------------------------------------------------------------------- #
 # TKINTER
 
@@ -178,6 +351,30 @@ if __name__ == "__main__":
         row    = 1,
         sticky = 'W')
 
+    # Label and entry for the number of workers (SO_REUSEPORT processes)
+    tk.Label(
+        connection_frame,
+        bg   = FRAME_BG_COLOR,
+        fg   = LABEL_FG_COLOR,
+        text = "Workers:"
+        ).grid(
+            column = 0,
+            row    = 2,
+            sticky = 'E')
+
+    workers_entry = tk.Entry(
+        connection_frame,
+        bg    = ENTRY_BG_COLOR,
+        fg    = ENTRY_FG_COLOR,
+        width = 10)
+
+    workers_entry.grid(
+        column = 1,
+        row    = 2,
+        sticky = 'W')
+
+    workers_entry.insert(0, "1")
+
     # Button to establish connection
     serverAddress_button = tk.Button(
         connection_frame,
@@ -189,7 +386,7 @@ if __name__ == "__main__":
     serverAddress_button.grid(
         column     =  0,
         columnspan =  2,
-        row        =  2,
+        row        =  3,
         pady       = 10)
 
     #-----------------------------------------------------#
@@ -309,11 +506,12 @@ if __name__ == "__main__":
         pady       = 5,
         sticky     = "EW")
 
-    # Create a text box that accepts multiple lines
-    output_text = tk.Text(
+    # Create a text box that accepts multiple lines (bounded scrollback)
+    output_text = scrollbackText(
         output_frame,
-        height = 10,
-        width  = 65)
+        height    = 10,
+        max_lines = MAX_SCROLLBACK_LINES,
+        width     = 65)
 
     output_text.grid(
         column     = 0,
@@ -332,15 +530,54 @@ if __name__ == "__main__":
     output_text.config(yscrollcommand = scrollbar.set)
     scrollbar.config(command = output_text.yview)
 
+    #-----------------------------------------------------#
+    #     FRAME FOR THE SERVER STATISTICS                 #
+    #-----------------------------------------------------#
+
+    # Informative label of the section
+    tk.Label(
+        window,
+        bg   = BACKGROUND_COLOR,
+        fg   = SECTION_FG_COLOR,
+        font = SECTION_FONT,
+        text = "\nServer statistics"
+        ).grid(
+            column     = 0,
+            columnspan = 2,
+            padx       = 15,
+            row        = 5,
+            sticky     = 'W')
+
+    # Label for the statistics panel (see show_statistics)
+    statistics_label = tk.Label(
+        window,
+        bg      = BACKGROUND_COLOR,
+        fg      = "GRAY",
+        font    = TEXT_FONT,
+        justify = "left",
+        text    = "")
+
+    statistics_label.grid(
+        column     = 0,
+        columnspan = 2,
+        padx       = 15,
+        pady       = 5,
+        row        = 6,
+        sticky     = 'W')
+
     # ------------------------------------------------------------------------ #
     # CREATE UDP SERVER
 
-    server = udp_s.udpServer(checkbuttons,output_text, window)
-    
-    # ------------------------------------------------------------------------ #
-    # START UDP SERVER
+    # The server is created with the button_clicked function, with the
+    # number of workers selected (a thread, or a pool of processes).
+    server = None
+
+    # Number of dropped client messages already reported on output_text
+    reported_drops = 0
 
-    # server.start() # -> The server is started with the button_clicked function.
+    # Rates of the statistics panel
+    datagram_meter = rateMeter()
+    byte_meter = rateMeter()
 
     # ------------------------------------------------------------------------ #
     # WINDOW LOOP START
@@ -351,10 +588,11 @@ if __name__ == "__main__":
     # ------------------------------------------------------------------------ #
     # WAIT UNTIL SERVER FINISHES
 
-    server.closeClient()
+    if server is not None:
+        server.closeClient()
 
-     # Join thread if has been started
-    if server.is_alive() == True: 
-        server.join()
+        # Join thread (or worker processes) if has been started
+        if server.is_alive() == True:
+            server.join()
 
 # end of file #
\ No newline at end of file
@@ -0,0 +1,121 @@
+"""
+@file     binary_codec.py
+
+@author   Marcos Belda Martinez' <mbelmar@etsinf.upv.es>
+@date     October, 2024
+@section  EOII-GIIROB
+@brief    Compact binary serialization of numeric lists (a type header and
+          the packed values), a safe and fast replacement of pickle for
+          the "request binary serialized message" replies.
+"""
+
+# ---------------------------------------------------------------------------- #
+# NEEDED IMPORTS
+
+from   array import array
+import struct
+import sys
+
+# ---------------------------------------------------------------------------- #
+# CODEC PARAMETERS
+
+# Header: marker and typecode of the values (array module typecodes).
+# The marker is not the first byte of a pickle (0x80), JSON or text reply.
+CODEC_MARKER = 0xB7
+CODEC_HEADER = struct.Struct("!BB")
+
+# Integer typecodes, smallest first, with the range of values they hold
+INTEGER_TYPECODES = (
+    ("b", -(1 << 7),  (1 << 7)  - 1),
+    ("h", -(1 << 15), (1 << 15) - 1),
+    ("i", -(1 << 31), (1 << 31) - 1),
+    ("q", -(1 << 63), (1 << 63) - 1))
+
+# Every typecode that can be decoded (floats are sent as doubles)
+TYPECODES = frozenset(
+    [typecode for typecode, _, _ in INTEGER_TYPECODES] + ["d"])
+
+# Values are sent in little endian byte order
+BYTESWAP_NEEDED = (sys.byteorder == "big")
+
+# Command of the replies serialized with this codec
+BINARY_COMMAND = "request binary serialized message"
+
+# ---------------------------------------------------------------------------- #
+# FUNCTIONS
+
+def integerTypecode(low, high):
+    """
+    Function to choose the smallest integer typecode able to hold the
+    values between low and high.
+    """
+    for typecode, minimum, maximum in INTEGER_TYPECODES:
+        if (low >= minimum) and (high <= maximum):
+            return typecode
+
+    # array() will raise OverflowError
+    return "q"
+
+    ### end def integerTypecode() ###
+
+def encode(values):
+    """
+    Function to serialize a list of numbers into bytes. Integers are packed
+    with the smallest typecode and any other list of numbers as doubles.
+    Raises ValueError if the values can not be encoded.
+    """
+    try:
+        # The type of every value is checked by array() (in C)
+        typecode = integerTypecode(min(values, default = 0),
+                                   max(values, default = 0))
+        packed = array(typecode, values)
+
+    except OverflowError:
+        raise ValueError("integer out of the 64 bits range")
+
+    except TypeError:
+        # Not only integers, send doubles
+        try:
+            packed = array("d", values)
+        except TypeError:
+            raise ValueError(
+                "only lists of integers or floats can be encoded")
+
+    if BYTESWAP_NEEDED:
+        packed.byteswap()
+
+    return (CODEC_HEADER.pack(CODEC_MARKER, ord(packed.typecode)) +
+            packed.tobytes())
+
+    ### end def encode() ###
+
+def decode(data):
+    """
+    Function to deserialize bytes built by encode() into a list of numbers.
+    Only numbers are ever built, so it is safe with untrusted data.
+    Raises ValueError if data is not a valid message.
+    """
+    if len(data) < CODEC_HEADER.size:
+        raise ValueError("binary message too short")
+
+    marker, typecode = CODEC_HEADER.unpack_from(data)
+    typecode = chr(typecode)
+
+    if (marker != CODEC_MARKER) or (typecode not in TYPECODES):
+        raise ValueError("not a binary serialized message")
+
+    packed = array(typecode)
+
+    if (len(data) - CODEC_HEADER.size) % packed.itemsize != 0:
+        raise ValueError("truncated binary message")
+
+    packed.frombytes(memoryview(data)[CODEC_HEADER.size:])
+
+    if BYTESWAP_NEEDED:
+        packed.byteswap()
+
+    return packed.tolist()
+
+    ### end def decode() ###
+
+# end of file #
@@ -0,0 +1,75 @@
+"""
+@file     binary_codec_benchmark.py
+
+@author   Marcos Belda Martinez' <mbelmar@etsinf.upv.es>
+@date     October, 2024
+@section  EOII-GIIROB
+@brief    Microbenchmark comparing the encode and decode cost (and size) of
+          the binary codec, pickle and JSON with lists of numbers.
+"""
+
+# ---------------------------------------------------------------------------- #
+# NEEDED IMPORTS
+
+import binary_codec
+import json
+import pickle
+import timeit
+
+# ---------------------------------------------------------------------------- #
+# BENCHMARK PARAMETERS
+
+REPETITIONS = 5  # Timing repetitions (best is kept)
+
+# Payloads: the reply of the servers and bigger lists
+PAYLOADS = {
+    "[1, 2, 3, 4, 5]" : [1, 2, 3, 4, 5],
+    "1000 integers"   : list(range(-500, 500)),
+    "1000 floats"     : [index / 7 for index in range(1000)]
+}
+
+# (encode, decode) functions of each serializer
+SERIALIZERS = {
+    "pickle" : (pickle.dumps, pickle.loads),
+    "json"   : (lambda values: json.dumps(values).encode(), json.loads),
+    "binary" : (binary_codec.encode, binary_codec.decode)
+}
+
+# ---------------------------------------------------------------------------- #
+# FUNCTIONS
+
+def bestTime(function, argument, number):
+    """
+    Function to get the best time (in microseconds) of a single call.
+    """
+    timer = timeit.Timer(lambda: function(argument))
+    return min(timer.repeat(REPETITIONS, number)) / number * 1e6
+
+    ### end def bestTime() ###
+
+# ---------------------------------------------------------------------------- #
+# BENCHMARK
+
+if __name__ == '__main__':
+    """
+    Time every serializer with every payload and check that the values
+    survive the round trip.
+    """
+    print("payload            serializer   size (B)   encode (us)   decode (us)")
+
+    for name, values in PAYLOADS.items():
+        number = max(100, 100000 // len(values))
+
+        for serializer, (encode, decode) in SERIALIZERS.items():
+            data = encode(values)
+
+            # Every serializer must give back the same values
+            assert decode(data) == values
+
+            encode_time = bestTime(encode, values, number)
+            decode_time = bestTime(decode, data, number)
+
+            print(f"{name:<18} {serializer:<12} {len(data):>8}"
+                  f"   {encode_time:>11.2f}   {decode_time:>11.2f}")
+
+# end of file #
@@ -0,0 +1,200 @@
+"""
+@file     udp_fragmentation.py
+
+@author   Marcos Belda Martinez' <mbelmar@etsinf.upv.es>
+@date     October, 2024
+@section  EOII-GIIROB
+@brief    Fragmentation of large messages into MTU-sized datagrams (with a
+          sequence header) and their reassembly, so they are neither
+          truncated by the receivers nor fragmented by IP.
+"""
+
+# ---------------------------------------------------------------------------- #
+# NEEDED IMPORTS
+
+from   collections import OrderedDict
+import struct
+from   time import monotonic
+
+# ---------------------------------------------------------------------------- #
+# FRAGMENTATION PARAMETERS
+
+# Header: marker, message ID, fragment index and number of fragments.
+# Messages that fit in a datagram are sent without header; none of the
+# other messages (text, request frames, pickle, binary) starts with 0x02.
+FRAGMENT_MARKER = 0x02
+FRAGMENT_HEADER = struct.Struct("!BIHH")
+
+MAX_MESSAGE_ID = 0xFFFFFFFF
+
+# Fragment (header included) size that fits in an Ethernet MTU
+# (1500 bytes - 20 of IP - 8 of UDP, with some margin for IP options)
+FRAGMENT_SIZE = 1400
+
+MAX_FRAGMENTS        = 1024             # Max fragments of a message
+REASSEMBLY_TIMEOUT   = 2.0              # Seconds to receive every fragment
+MAX_REASSEMBLY_BYTES = 4 * 1024 * 1024  # Max bytes waiting to be reassembled
+MAX_PENDING_MESSAGES = 256              # Max messages waiting to be completed
+
+# Bytes counted for each fragment slot of a message (a list entry), so a
+# message announcing many fragments counts even if few of them arrive
+SLOT_BYTES = 8
+
+# Fields of each message being reassembled (a list, updated in place)
+DEADLINE  = 0
+FRAGMENTS = 1
+MISSING   = 2
+NUM_BYTES = 3
+
+# ---------------------------------------------------------------------------- #
+# FUNCTIONS
+
+def isFragment(datagram):
+    """
+    Function to check if a datagram is a fragment of a larger message.
+    """
+    return ((len(datagram) >= FRAGMENT_HEADER.size) and
+            (datagram[0] == FRAGMENT_MARKER))
+
+    ### end def isFragment() ###
+
+def fragmentMessage(message_id, message, fragment_size = FRAGMENT_SIZE):
+    """
+    Function to split a message (bytes) into datagrams of at most
+    fragment_size bytes. A message that already fits is returned as the
+    only datagram, without header.
+    Raises ValueError if the message needs more than MAX_FRAGMENTS.
+    """
+    if len(message) <= fragment_size:
+        return [message]
+
+    payload_size = fragment_size - FRAGMENT_HEADER.size
+    num_fragments = -(-len(message) // payload_size)
+
+    if num_fragments > MAX_FRAGMENTS:
+        raise ValueError("message too large to be fragmented")
+
+    view = memoryview(message)
+    message_id &= MAX_MESSAGE_ID
+
+    return [FRAGMENT_HEADER.pack(FRAGMENT_MARKER, message_id, index,
+                                 num_fragments) +
+            view[index * payload_size:(index + 1) * payload_size]
+            for index in range(num_fragments)]
+
+    ### end def fragmentMessage() ###
+
+# ---------------------------------------------------------------------------- #
+# CREATING REASSEMBLY BUFFER CLASS
+
+class reassemblyBuffer:
+
+    def __init__(self, max_bytes = MAX_REASSEMBLY_BYTES,
+                 timeout = REASSEMBLY_TIMEOUT,
+                 max_messages = MAX_PENDING_MESSAGES):
+        """
+        Function to initialize Reassembly Buffer Class variables.
+        Messages have timeout seconds to be completed and at most max_bytes
+        of fragments (and their slots) and max_messages messages are kept
+        (the oldest messages are dropped first).
+        """
+        self.max_bytes = max_bytes
+        self.max_messages = max_messages
+        self.timeout = timeout
+
+        # Incomplete messages by (source address, message ID), oldest first
+        self.messages = OrderedDict()
+        self.num_bytes = 0
+
+        # Statistics
+        self.completed_messages = 0
+        self.expired_messages = 0
+        self.dropped_messages = 0
+        self.invalid_fragments = 0
+
+        ### end def __init__() ###
+
+    def addFragment(self, datagram, source_address):
+        """
+        Function to store a fragment received from source_address.
+        Returns the whole message (bytes) when its last fragment arrives,
+        otherwise None.
+        """
+        now = monotonic()
+        self.expireMessages(now)
+
+        _, message_id, index, num_fragments = FRAGMENT_HEADER.unpack_from(
+            datagram)
+
+        # Check the header before anything is stored
+        if ((num_fragments == 0) or (num_fragments > MAX_FRAGMENTS) or
+                (index >= num_fragments)):
+            self.invalid_fragments += 1
+            return None
+
+        key = (source_address, message_id)
+        message = self.messages.get(key)
+
+        if message is None:
+            slot_bytes = SLOT_BYTES * num_fragments
+            message = [now + self.timeout, [None] * num_fragments,
+                       num_fragments, slot_bytes]
+            self.messages[key] = message
+            self.num_bytes += slot_bytes
+
+        fragments = message[FRAGMENTS]
+
+        if num_fragments != len(fragments):
+            self.invalid_fragments += 1
+            return None
+
+        if fragments[index] is None:
+            payload = datagram[FRAGMENT_HEADER.size:]
+            fragments[index] = payload
+            message[MISSING] -= 1
+            message[NUM_BYTES] += len(payload)
+            self.num_bytes += len(payload)
+
+        if message[MISSING] == 0:
+            del self.messages[key]
+            self.num_bytes -= message[NUM_BYTES]
+            self.completed_messages += 1
+
+            return b"".join(fragments)
+
+        # Keep the buffer bounded, dropping the oldest messages
+        while ((self.num_bytes > self.max_bytes) or
+               (len(self.messages) > self.max_messages)):
+            self.dropMessage()
+            self.dropped_messages += 1
+
+        return None
+
+        ### end def addFragment() ###
+
+    def expireMessages(self, now):
+        """
+        Function to drop the messages whose timeout has expired. Messages
+        are kept in arrival order, so only the oldest ones are checked.
+        """
+        while self.messages:
+            message = next(iter(self.messages.values()))
+
+            if message[DEADLINE] > now:
+                break
+
+            self.dropMessage()
+            self.expired_messages += 1
+
+        ### end def expireMessages() ###
+
+    def dropMessage(self):
+        """
+        Function to drop the oldest incomplete message.
+        """
+        _, message = self.messages.popitem(last = False)
+        self.num_bytes -= message[NUM_BYTES]
+
+        ### end def dropMessage() ###
+
+# end of file #
@@ -0,0 +1,475 @@
+"""
+@file     udp_reliability.py
+
+@author   Marcos Belda Martinez' <mbelmar@etsinf.upv.es>
+@date     November, 2024
+@section  EOII-GIIROB
+@brief    Lightweight reliable delivery over UDP: sequence numbers, selective
+          ACKs (SACK), retransmission timeout estimated from the RTT
+          (RFC 6298) and a send window, so a sender can go fast and still
+          detect and recover lost datagrams.
+"""
+
+# ---------------------------------------------------------------------------- #
+# NEEDED IMPORTS
+
+from   collections import OrderedDict
+import random
+import struct
+from   time import monotonic
+
+# ---------------------------------------------------------------------------- #
+# RELIABILITY PARAMETERS
+
+# Data header: marker, session ID (random per sender, so a restarted sender
+# is not taken for duplicates) and sequence number.
+DATA_MARKER = 0x03
+DATA_HEADER = struct.Struct("!BII")
+
+# ACK header: marker, session ID, cumulative ACK (every sequence number
+# below it has been received) and number of SACK blocks, followed by the
+# blocks, [start, end) ranges received above the cumulative ACK.
+ACK_MARKER      = 0x04
+ACK_HEADER      = struct.Struct("!BIIB")
+SACK_BLOCK      = struct.Struct("!II")
+MAX_SACK_BLOCKS = 4
+
+# Sequence numbers wrap around after 2^32 datagrams, so they are compared
+# with serial number arithmetic (RFC 1982), see sequenceDistance()
+MAX_SEQUENCE  = 0xFFFFFFFF
+HALF_SEQUENCE = 1 << 31
+
+SEND_WINDOW    = 256   # Max datagrams sent after the oldest not acknowledged
+RECEIVE_WINDOW = 1024  # Max datagrams kept out of order by a receiver
+
+INITIAL_RTO = 1.0   # Seconds before the first RTT sample (RFC 6298)
+MIN_RTO     = 0.2   # Lower bound of the RTO (the one of Linux TCP)
+MAX_RTO     = 60.0  # Upper bound of the RTO (after backing off)
+
+# Later datagrams acknowledged (SACK) before a missing one is retransmitted
+# without waiting for its RTO (fast retransmit)
+DUPLICATE_THRESHOLD = 3
+
+# Fields of each datagram in flight (a list, updated in place)
+DATAGRAM      = 0
+SENT_TIME     = 1
+DEADLINE      = 2
+RETRANSMITTED = 3
+
+# ---------------------------------------------------------------------------- #
+# FUNCTIONS
+
+def isData(datagram):
+    """
+    Function to check if a datagram is a data datagram of a reliable sender.
+    """
+    return ((len(datagram) >= DATA_HEADER.size) and
+            (datagram[0] == DATA_MARKER))
+
+    ### end def isData() ###
+
+def isAck(datagram):
+    """
+    Function to check if a datagram is an ACK of a reliable receiver.
+    """
+    return ((len(datagram) >= ACK_HEADER.size) and
+            (datagram[0] == ACK_MARKER))
+
+    ### end def isAck() ###
+
+def sequenceDistance(sequence, base):
+    """
+    Function to get how many sequence numbers sequence is ahead of base,
+    modulo 2^32. Distances of HALF_SEQUENCE or more mean that sequence
+    is behind base (RFC 1982).
+    """
+    return (sequence - base) & MAX_SEQUENCE
+
+    ### end def sequenceDistance() ###
+
+def isBefore(sequence, base):
+    """
+    Function to check if sequence comes before base (wraparound included).
+    """
+    return 0 < sequenceDistance(base, sequence) < HALF_SEQUENCE
+
+    ### end def isBefore() ###
+
+def inBlock(sequence, start, end):
+    """
+    Function to check if sequence is in the [start, end) range.
+    """
+    return sequenceDistance(sequence, start) < sequenceDistance(end, start)
+
+    ### end def inBlock() ###
+
+# ---------------------------------------------------------------------------- #
+# CREATING RTT ESTIMATOR CLASS
+
+class rttEstimator:
+
+    def __init__(self):
+        """
+        Function to initialize RTT Estimator Class variables.
+        The retransmission timeout (RTO) is computed as in RFC 6298.
+        """
+        self.srtt = None    # Smoothed RTT
+        self.rttvar = None  # RTT variation
+        self.rto = INITIAL_RTO
+
+        ### end def __init__() ###
+
+    def addSample(self, rtt):
+        """
+        Function to update the estimation with an RTT sample (seconds)
+        of a datagram that has not been retransmitted (Karn's algorithm).
+        """
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+
+        self.rto = min(max(self.srtt + 4 * self.rttvar, MIN_RTO), MAX_RTO)
+
+        ### end def addSample() ###
+
+    def backOff(self):
+        """
+        Function to double the RTO after a timeout.
+        """
+        self.rto = min(2 * self.rto, MAX_RTO)
+
+        ### end def backOff() ###
+
+# ---------------------------------------------------------------------------- #
+# CREATING RELIABLE SENDER CLASS
+
+class reliableSender:
+
+    def __init__(self, udp_socket, server_address, window = SEND_WINDOW):
+        """
+        Function to initialize Reliable Sender Class variables.
+        Datagrams are sent through udp_socket to server_address, and kept
+        until they are acknowledged (up to window of them).
+        The ACKs received must be passed to handleAck().
+        """
+        self.udp_socket = udp_socket
+        self.server_address = server_address
+        self.window = window
+
+        self.session_id = random.getrandbits(32)
+        self.next_sequence = 0
+
+        # Datagrams sent and not acknowledged yet (sequence -> fields)
+        self.in_flight = OrderedDict()
+
+        self.rtt = rttEstimator()
+
+        # The RTO is doubled once per timeout, not once per datagram expired
+        self.next_back_off = 0.0
+
+        # Statistics
+        self.datagrams_sent = 0
+        self.retransmissions = 0
+        self.acknowledged = 0
+
+        ### end def __init__() ###
+
+    @property
+    def can_send(self):
+        """
+        True if there is room in the send window: the datagrams sent after
+        the oldest one not acknowledged (so the receiver never has to keep
+        more than window of them out of order).
+        """
+        if not self.in_flight:
+            return True
+
+        oldest = next(iter(self.in_flight))
+
+        return sequenceDistance(self.next_sequence, oldest) < self.window
+
+        ### end def can_send() ###
+
+    def send(self, payload):
+        """
+        Function to send a payload (bytes). The caller must check can_send
+        first. Returns its sequence number.
+        """
+        sequence = self.next_sequence
+        self.next_sequence = (sequence + 1) & MAX_SEQUENCE
+
+        datagram = DATA_HEADER.pack(DATA_MARKER, self.session_id, sequence)
+        datagram += payload
+
+        now = monotonic()
+        self.in_flight[sequence] = [datagram, now, now + self.rtt.rto, False]
+        self.transmit(datagram)
+        self.datagrams_sent += 1
+
+        return sequence
+
+        ### end def send() ###
+
+    def transmit(self, datagram):
+        """
+        Function to send a datagram (lost ones are recovered by the RTO).
+        """
+        try:
+            self.udp_socket.sendto(datagram, self.server_address)
+        except (BlockingIOError, ConnectionRefusedError):
+            pass
+
+        ### end def transmit() ###
+
+    def handleAck(self, datagram):
+        """
+        Function to process an ACK: acknowledged datagrams leave the window,
+        the RTT is sampled, and datagrams reported missing by the SACK
+        blocks are retransmitted (fast retransmit).
+        Returns the number of datagrams acknowledged.
+        """
+        marker, session_id, cumulative, num_blocks = (
+            ACK_HEADER.unpack_from(datagram))
+
+        if ((session_id != self.session_id) or
+                (num_blocks > MAX_SACK_BLOCKS) or
+                (len(datagram) < ACK_HEADER.size +
+                                 num_blocks * SACK_BLOCK.size)):
+            # ACK of a previous session (or corrupted)
+            return 0
+
+        blocks = [SACK_BLOCK.unpack_from(datagram, offset)
+                  for offset in range(ACK_HEADER.size,
+                                      ACK_HEADER.size +
+                                      num_blocks * SACK_BLOCK.size,
+                                      SACK_BLOCK.size)]
+
+        now = monotonic()
+        acknowledged = []
+
+        # Last sequence number acknowledged by the SACK blocks
+        highest_sacked = (cumulative - 1) & MAX_SEQUENCE
+
+        for start, end in blocks:
+            if isBefore(highest_sacked, end):
+                highest_sacked = (end - 1) & MAX_SEQUENCE
+
+        # Every datagram before the cumulative ACK has been received, and the
+        # ones in the SACK blocks (in flight is in sending order, so only the
+        # datagrams up to the highest block are checked: the lost ones and
+        # the ones still travelling)
+        for sequence in self.in_flight:
+            if isBefore(sequence, cumulative):
+                acknowledged.append(sequence)
+
+            elif isBefore(highest_sacked, sequence):
+                break
+
+            else:
+                for start, end in blocks:
+                    if inBlock(sequence, start, end):
+                        acknowledged.append(sequence)
+                        break
+
+        for sequence in acknowledged:
+            fields = self.in_flight.pop(sequence)
+
+            # Karn's algorithm: no samples from retransmitted datagrams
+            if fields[RETRANSMITTED] == False:
+                self.rtt.addSample(now - fields[SENT_TIME])
+
+        num_acknowledged = len(acknowledged)
+        self.acknowledged += num_acknowledged
+
+        # Datagrams older than DUPLICATE_THRESHOLD acknowledged ones are lost
+        if blocks:
+            for sequence, fields in self.in_flight.items():
+                ahead = sequenceDistance(highest_sacked, sequence)
+
+                if (ahead < DUPLICATE_THRESHOLD) or (ahead >= HALF_SEQUENCE):
+                    break
+
+                if fields[RETRANSMITTED] == False:
+                    self.retransmit(sequence, fields, now)
+
+        return num_acknowledged
+
+        ### end def handleAck() ###
+
+    def retransmit(self, sequence, fields, now):
+        """
+        Function to send a datagram in flight again.
+        """
+        fields[RETRANSMITTED] = True
+        fields[DEADLINE] = now + self.rtt.rto
+        self.transmit(fields[DATAGRAM])
+        self.retransmissions += 1
+
+        ### end def retransmit() ###
+
+    def retransmitExpired(self):
+        """
+        Function to retransmit the datagrams whose RTO has expired.
+        The RTO is doubled once per timeout (exponential back off), the
+        datagrams that expire within the same RTO count as one timeout.
+        Returns the number of datagrams retransmitted.
+        """
+        now = monotonic()
+        expired = [(sequence, fields)
+                   for sequence, fields in self.in_flight.items()
+                   if fields[DEADLINE] <= now]
+
+        if expired and (now >= self.next_back_off):
+            self.rtt.backOff()
+            self.next_back_off = now + self.rtt.rto
+
+        for sequence, fields in expired:
+            self.retransmit(sequence, fields, now)
+
+        return len(expired)
+
+        ### end def retransmitExpired() ###
+
+    def nextDeadline(self):
+        """
+        Function to get the time (monotonic) of the next retransmission,
+        or None if nothing is in flight.
+        """
+        if not self.in_flight:
+            return None
+
+        return min(fields[DEADLINE] for fields in self.in_flight.values())
+
+        ### end def nextDeadline() ###
+
+# ---------------------------------------------------------------------------- #
+# CREATING RELIABLE RECEIVER CLASS
+
+class reliableReceiver:
+
+    def __init__(self, window = RECEIVE_WINDOW):
+        """
+        Function to initialize Reliable Receiver Class variables
+        (one per sender). Payloads are delivered once and in order.
+        Datagrams more than window ahead of the next expected one are
+        dropped (it must not be smaller than the send window).
+        """
+        self.window = window
+        self.session_id = None
+
+        # Every sequence number before next_sequence has been delivered
+        self.next_sequence = 0
+
+        # Payloads received out of order (sequence -> payload)
+        self.out_of_order = {}
+
+        # The same, as [start, end) ranges merged on arrival, so building
+        # an ACK does not have to go through every payload
+        self.ranges = {}      # start -> end
+        self.range_ends = {}  # end -> start
+
+        # Statistics
+        self.delivered = 0
+        self.duplicates = 0
+
+        ### end def __init__() ###
+
+    def handleData(self, datagram):
+        """
+        Function to process a data datagram.
+        Returns the payloads that can be delivered now (in order) and
+        the ACK to send back to the sender.
+        """
+        marker, session_id, sequence = DATA_HEADER.unpack_from(datagram)
+
+        if session_id != self.session_id:
+            # A new sender (or a restarted one), start again
+            self.session_id = session_id
+            self.next_sequence = 0
+            self.out_of_order.clear()
+            self.ranges.clear()
+            self.range_ends.clear()
+
+        offset = sequenceDistance(sequence, self.next_sequence)
+
+        if (offset >= HALF_SEQUENCE) or (sequence in self.out_of_order):
+            # Already delivered (before next_sequence) or already kept
+            self.duplicates += 1
+
+        elif offset < self.window:
+            self.out_of_order[sequence] = datagram[DATA_HEADER.size:]
+            self.addToRanges(sequence)
+
+        # Deliver the payloads that are now in order
+        payloads = []
+        end = self.ranges.pop(self.next_sequence, None)
+
+        if end is not None:
+            del self.range_ends[end]
+
+            for offset in range(sequenceDistance(end, self.next_sequence)):
+                next_sequence = (self.next_sequence + offset) & MAX_SEQUENCE
+                payloads.append(self.out_of_order.pop(next_sequence))
+
+            self.next_sequence = end
+
+        self.delivered += len(payloads)
+
+        return (payloads, self.buildAck(sequence))
+
+        ### end def handleData() ###
+
+    def addToRanges(self, sequence):
+        """
+        Function to add a sequence number to the ranges received out of
+        order, merging it with the ranges next to it.
+        """
+        start = sequence
+        end = (sequence + 1) & MAX_SEQUENCE
+
+        if end in self.ranges:
+            # Range right after it
+            end = self.ranges.pop(end)
+            del self.range_ends[end]
+
+        if start in self.range_ends:
+            # Range right before it
+            start = self.range_ends.pop(start)
+            del self.ranges[start]
+
+        self.ranges[start] = end
+        self.range_ends[end] = start
+
+        ### end def addToRanges() ###
+
+    def buildAck(self, last_sequence):
+        """
+        Function to build the ACK: cumulative ACK and up to MAX_SACK_BLOCKS
+        ranges received out of order, the one of last_sequence first.
+        """
+        blocks = sorted(
+            self.ranges.items(),
+            key = lambda block: sequenceDistance(block[0], self.next_sequence))
+
+        # The most recent block first (RFC 2018), then the lowest ones
+        for index, (start, end) in enumerate(blocks):
+            if inBlock(last_sequence, start, end):
+                blocks.insert(0, blocks.pop(index))
+                break
+
+        blocks = blocks[:MAX_SACK_BLOCKS]
+
+        ack = ACK_HEADER.pack(ACK_MARKER, self.session_id, self.next_sequence,
+                              len(blocks))
+
+        for start, end in blocks:
+            ack += SACK_BLOCK.pack(start, end)
+
+        return ack
+
+        ### end def buildAck() ###
+
+# end of file #
@@ -0,0 +1,260 @@
+"""
+@file     udp_server_core.py
+
+@author   Marcos Belda Martinez' <mbelmar@etsinf.upv.es>
+@date     October, 2024
+@section  EOII-GIIROB
+@brief    Reception loop shared by every UDP Server of the project (T1, P3
+          and the P7 sensor sinks): non-blocking socket and selector,
+          reusable reception buffer, batch draining, replies sent when the
+          socket is writable, pluggable handler and statistics hooks.
+"""
+
+# ---------------------------------------------------------------------------- #
+# NEEDED IMPORTS
+
+from   collections import deque
+import selectors
+import socket
+
+# ---------------------------------------------------------------------------- #
+# RECEPTION PARAMETERS
+
+BUFFER_SIZE      = 4096     # Max data buffer size of a datagram
+MAX_BATCH_SIZE   = 256      # Max datagrams drained per selector wake up
+RECV_BUFFER_SIZE = 1 << 20  # Default kernel receive buffer (SO_RCVBUF)
+
+# ---------------------------------------------------------------------------- #
+# CREATING UDP SERVER LOOP CLASS
+
+class udpServerLoop:
+
+    def __init__(self, handler = None, buffer_size = BUFFER_SIZE):
+        """
+        Function to initialize UDP Server Loop Class variables.
+        handler is called as handler(data, client_address) for each datagram
+        (data is bytes) and returns None, the reply, or a list of datagrams
+        to send (e.g. the fragments of a large reply). It can call stop().
+        """
+        self.handler = handler
+
+        # Control parameters
+        self.server_on = False
+
+        # Create a UDP socket (non-blocking, the selector decides when to read)
+        self.udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.udp_socket.setblocking(False)
+        self.setReceiveBufferSize(RECV_BUFFER_SIZE)
+
+        # Preallocated reception buffer (reused for every datagram)
+        self.recv_buffer = bytearray(buffer_size)
+        self.recv_view = memoryview(self.recv_buffer)
+
+        # Replies waiting to be sent, as (message, client_address) tuples
+        self.pending_replies = deque()
+        self.waiting_writable = False
+
+        # Reception statistics
+        self.datagrams_received = 0
+        self.bytes_received = 0
+        self.replies_sent = 0
+        self.replies_failed = 0
+
+        # Functions called after each batch of datagrams, see addBatchHook()
+        self.batch_hooks = []
+
+        # Socket pair used by stop() to wake up the selector
+        self.wakeup_recv, self.wakeup_send = socket.socketpair()
+        self.wakeup_recv.setblocking(False)
+
+        # Selector (epoll on linux) waiting for datagrams or wake up requests
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.udp_socket, selectors.EVENT_READ, "udp")
+        self.selector.register(self.wakeup_recv, selectors.EVENT_READ, "wakeup")
+
+        ### end def __init__() ###
+
+    def setHandler(self, handler):
+        """
+        Function to set the handler of the datagrams (see __init__()).
+        """
+        self.handler = handler
+
+        ### end def setHandler() ###
+
+    def setReceiveBufferSize(self, new_size):
+        """
+        Function to set the kernel receive buffer size (SO_RCVBUF).
+        A bigger buffer absorbs bursts of datagrams without dropping them.
+        """
+        self.udp_socket.setsockopt(
+            socket.SOL_SOCKET,
+            socket.SO_RCVBUF,
+            new_size)
+
+        ### end def setReceiveBufferSize() ###
+
+    def addBatchHook(self, hook):
+        """
+        Function to add a function called as hook() after each batch of
+        datagrams (e.g. to publish the statistics), not once per datagram.
+        """
+        self.batch_hooks.append(hook)
+
+        ### end def addBatchHook() ###
+
+    def addWakeupSource(self, fileobj):
+        """
+        Function to stop the loop also when fileobj (e.g. a pipe shared with
+        another process) becomes readable.
+        """
+        self.selector.register(fileobj, selectors.EVENT_READ, "wakeup")
+
+        ### end def addWakeupSource() ###
+
+    def bind(self, server_address):
+        """
+        Function to bind the socket to the (IP address, port) of the server.
+        """
+        self.udp_socket.bind(server_address)
+
+        ### end def bind() ###
+
+    def serveForever(self):
+        """
+        Function to serve datagrams until stop() is called (by the handler
+        or another thread). The thread sleeps inside the selector until a
+        datagram arrives, so no CPU is used while idle. The sockets are
+        closed on exit.
+        """
+        self.server_on = True
+
+        try:
+            while self.server_on == True:
+
+                # Wait (without timeout) for a socket to be ready --------------
+                for key, events in self.selector.select():
+
+                    if key.data == "wakeup":
+                        # stop() has been called
+                        self.server_on = False
+
+                    elif self.server_on == True:
+                        if events & selectors.EVENT_READ:
+                            self.drainMessages()
+
+                        if events & selectors.EVENT_WRITE:
+                            self.flushReplies()
+        finally:
+            self.closeSockets()
+
+        ### end def serveForever() ###
+
+    def drainMessages(self):
+        """
+        Function to read every pending datagram (up to MAX_BATCH_SIZE),
+        and then send all the replies together.
+        """
+        handler = self.handler
+        pending_replies = self.pending_replies
+
+        for _ in range(MAX_BATCH_SIZE):
+
+            # Receive a message from client into the reusable buffer -----------
+            try:
+                nbytes, client_address = self.udp_socket.recvfrom_into(
+                    self.recv_buffer)
+            except BlockingIOError:
+                # Kernel receive queue is empty
+                break
+            except ConnectionResetError:
+                # ICMP error caused by a previous reply, keep reading
+                continue
+
+            self.datagrams_received += 1
+            self.bytes_received += nbytes
+
+            reply = handler(bytes(self.recv_view[:nbytes]), client_address)
+
+            if reply is None:
+                pass
+
+            elif isinstance(reply, list):
+                # Several datagrams (e.g. the fragments of a large reply)
+                for datagram in reply:
+                    pending_replies.append((datagram, client_address))
+
+            else:
+                pending_replies.append((reply, client_address))
+
+            if self.server_on == False:
+                break
+
+        # Send the replies of the whole batch ----------------------------------
+        self.flushReplies()
+
+        for hook in self.batch_hooks:
+            hook()
+
+        ### end def drainMessages() ###
+
+    def flushReplies(self):
+        """
+        Function to send the pending replies. If the kernel send buffer is
+        full, the rest are kept until the selector reports the socket as
+        writable again.
+        """
+        while self.pending_replies:
+            reply, client_address = self.pending_replies[0]
+
+            try:
+                self.udp_socket.sendto(reply, client_address)
+                self.replies_sent += 1
+            except BlockingIOError:
+                # Send buffer is full, wait until the socket is writable
+                if self.waiting_writable == False:
+                    self.waiting_writable = True
+                    self.selector.modify(
+                        self.udp_socket,
+                        selectors.EVENT_READ | selectors.EVENT_WRITE,
+                        "udp")
+                return
+            except OSError:
+                # The client is unreachable, drop the reply
+                self.replies_failed += 1
+
+            self.pending_replies.popleft()
+
+        if self.waiting_writable == True:
+            self.waiting_writable = False
+            self.selector.modify(self.udp_socket, selectors.EVENT_READ, "udp")
+
+        ### end def flushReplies() ###
+
+    def closeSockets(self):
+        """
+        Function to unregister and close every socket of the server.
+        """
+        self.selector.close()
+        self.udp_socket.close()
+        self.wakeup_recv.close()
+        self.wakeup_send.close()
+
+        ### end def closeSockets() ###
+
+    def stop(self):
+        """
+        Function to stop serveForever(), from the handler or another thread.
+        The loop is woken up immediately, no timeout has to expire.
+        """
+        self.server_on = False
+
+        try:
+            self.wakeup_send.send(b"\0")
+        except OSError:
+            # The loop has already finished and closed the sockets
+            pass
+
+        ### end def stop() ###
+
+# end of file #